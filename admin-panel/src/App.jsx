@@ -7,6 +7,7 @@ import Keys from './components/Keys'
 import Login from './components/Login'
 import AdminManagement from './components/AdminManagement'
 import Settings from './components/Settings'
+import { subscribeEvents, debounce } from './events'
 
 function App() {
   const [activeView, setActiveView] = useState({ type: 'credentials', platform: 'netflix' })
@@ -53,6 +54,14 @@ function App() {
     }
   }, [authenticated, currentPlatform])
 
+  // Keep the sidebar counts live: refetch stats shortly after redemptions
+  // and credential changes instead of polling
+  useEffect(() => {
+    if (!authenticated) return
+    const refresh = debounce(() => fetchStats(), 1000)
+    return subscribeEvents(refresh)
+  }, [authenticated])
+
   const fetchStats = async () => {
     try {
       const response = await fetch('/api/stats')
@@ -1,10 +1,11 @@
 import React, { useState, useEffect } from 'react'
-import { MdAdd, MdUploadFile, MdEdit, MdDelete } from 'react-icons/md'
+import { MdAdd, MdUploadFile, MdEdit, MdDelete, MdDownload } from 'react-icons/md'
 import { SiNetflix, SiCrunchyroll } from 'react-icons/si'
 import { GiBoxingGlove } from 'react-icons/gi'
 import { FaStar, FaTv, FaGamepad, FaXbox } from 'react-icons/fa'
 import { MdSportsKabaddi } from 'react-icons/md'
 import ClaimedCredentials from './ClaimedCredentials'
+import { resultOf } from '../jobs'
 import './Credentials.css'
 import './LoadingSpinner.css' // Import the CSS for the loading spinner
 
@@ -18,6 +19,7 @@ function Credentials({ platform, refreshStats }) {
   const [formData, setFormData] = useState({ email: '', password: '', status: 'active' })
   const [uploadFile, setUploadFile] = useState(null)
   const [isLoading, setIsLoading] = useState(false) // State for loading spinner
+  const [jobProgress, setJobProgress] = useState(null) // Progress of a running background job
 
   useEffect(() => {
     fetchCredentials()
@@ -116,7 +118,7 @@ function Credentials({ platform, refreshStats }) {
       const response = await fetch(`/api/credentials/${platform}/delete-all`, {
         method: 'DELETE'
       })
-      const data = await response.json()
+      const data = await resultOf(await response.json(), setJobProgress)
       if (data.success) {
         alert(data.message)
         fetchCredentials()
@@ -125,6 +127,7 @@ function Credentials({ platform, refreshStats }) {
     } catch (error) {
       alert('Error deleting all credentials: ' + error.message)
     } finally {
+      setJobProgress(null)
       setIsLoading(false) // Hide loading spinner
     }
   }
@@ -142,7 +145,7 @@ function Credentials({ platform, refreshStats }) {
         method: 'POST',
         body: formData
       })
-      const data = await response.json()
+      const data = await resultOf(await response.json(), setJobProgress)
       if (data.success) {
         alert(data.message)
         fetchCredentials()
@@ -153,6 +156,7 @@ function Credentials({ platform, refreshStats }) {
     } catch (error) {
       alert('Error uploading credentials: ' + error.message)
     } finally {
+      setJobProgress(null)
       setIsLoading(false) // Hide loading spinner
     }
   }
@@ -212,6 +216,7 @@ function Credentials({ platform, refreshStats }) {
         <div className="header-actions">
           <button className="btn btn-success" onClick={openAddModal}><MdAdd /> Add Credential</button>
           <button className="btn btn-primary" onClick={() => setShowUploadModal(true)}><MdUploadFile /> Upload from File</button>
+          <a className="btn btn-primary" href={`/api/export/credentials?platform=${platform}`}><MdDownload /> Export CSV</a>
           <button className="btn btn-danger" onClick={handleDeleteAll}><MdDelete /> Delete All</button>
         </div>
       </div>
@@ -219,6 +224,9 @@ function Credentials({ platform, refreshStats }) {
       {isLoading && (
         <div className="loading-wrapper">
           <div className="spinner"></div>
+          {jobProgress && jobProgress.total > 0 && (
+            <p>{jobProgress.progress} / {jobProgress.total}</p>
+          )}
         </div>
       )}
 
@@ -1,20 +1,61 @@
 import { useState, useEffect } from 'react';
 import './History.css';
-import { FiUser, FiClock, FiKey, FiMail } from 'react-icons/fi';
+import { FiUser, FiClock, FiKey, FiMail, FiDownload } from 'react-icons/fi';
 import { SiNetflix, SiCrunchyroll } from 'react-icons/si';
 import { GiWrestling } from 'react-icons/gi';
 import { MdLocalMovies } from 'react-icons/md';
+import { subscribeEvents, debounce } from '../events';
 
 function History() {
   const [redemptionHistory, setRedemptionHistory] = useState([]);
   const [claimHistory, setClaimHistory] = useState([]);
+  const [redemptionCursor, setRedemptionCursor] = useState(null);
+  const [claimCursor, setClaimCursor] = useState(null);
   const [activeTab, setActiveTab] = useState('redemptions');
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
 
   useEffect(() => {
     fetchHistory();
   }, []);
 
+  // New redemptions arrive complete in the event and are prepended; claims
+  // (credential updates) refetch the first page of claim history
+  useEffect(() => {
+    const refreshClaims = debounce(fetchLatestClaims, 1000);
+    const refreshAll = debounce(fetchHistory, 1000);
+
+    return subscribeEvents((event) => {
+      if (event.type === 'redemption') {
+        setRedemptionHistory(prev => [{
+          user_id: event.user_id,
+          username: event.username || 'N/A',
+          full_name: event.full_name || 'N/A',
+          redeemed_at: event.redeemed_at,
+          key_code: event.key_code,
+          platform: event.platform
+        }, ...prev]);
+      } else if (event.type === 'credentials' && event.op === 'UPDATE') {
+        refreshClaims();
+      } else if (event.type === 'resync') {
+        refreshAll();
+      }
+    });
+  }, []);
+
+  const fetchLatestClaims = async () => {
+    try {
+      const res = await fetch('/api/claim-history', { credentials: 'include' });
+      if (res.ok) {
+        const data = await res.json();
+        setClaimHistory(data.history || []);
+        setClaimCursor(data.next_cursor || null);
+      }
+    } catch (error) {
+      console.error('Error refreshing claim history:', error);
+    }
+  };
+
   const fetchHistory = async () => {
     setLoading(true);
     try {
@@ -26,11 +67,13 @@ function History() {
       if (redemptionRes.ok) {
         const redemptionData = await redemptionRes.json();
         setRedemptionHistory(redemptionData.history || []);
+        setRedemptionCursor(redemptionData.next_cursor || null);
       }
 
       if (claimRes.ok) {
         const claimData = await claimRes.json();
         setClaimHistory(claimData.history || []);
+        setClaimCursor(claimData.next_cursor || null);
       }
     } catch (error) {
       console.error('Error fetching history:', error);
@@ -39,6 +82,40 @@ function History() {
     }
   };
 
+  const loadMore = async () => {
+    const isRedemptions = activeTab === 'redemptions';
+    const cursor = isRedemptions ? redemptionCursor : claimCursor;
+    if (!cursor) return;
+
+    setLoadingMore(true);
+    try {
+      const endpoint = isRedemptions ? '/api/redemption-history' : '/api/claim-history';
+      const res = await fetch(`${endpoint}?cursor=${encodeURIComponent(cursor)}`, { credentials: 'include' });
+      if (res.ok) {
+        const data = await res.json();
+        if (isRedemptions) {
+          setRedemptionHistory(prev => [...prev, ...(data.history || [])]);
+          setRedemptionCursor(data.next_cursor || null);
+        } else {
+          setClaimHistory(prev => [...prev, ...(data.history || [])]);
+          setClaimCursor(data.next_cursor || null);
+        }
+      }
+    } catch (error) {
+      console.error('Error fetching more history:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  const renderLoadMore = (cursor) => cursor && (
+    <div style={{ textAlign: 'center', marginTop: '1rem' }}>
+      <button className="tab-button" onClick={loadMore} disabled={loadingMore}>
+        {loadingMore ? 'Loading...' : 'Load more'}
+      </button>
+    </div>
+  );
+
   const getPlatformIcon = (platform) => {
     const iconMap = {
       'Netflix': <SiNetflix className="platform-icon" />,
@@ -75,14 +152,17 @@ function History() {
             className={`tab-button ${activeTab === 'redemptions' ? 'active' : ''}`}
             onClick={() => setActiveTab('redemptions')}
           >
-            <FiKey /> Key Redemptions ({redemptionHistory.length})
+            <FiKey /> Key Redemptions ({redemptionHistory.length}{redemptionCursor ? '+' : ''})
           </button>
           <button
             className={`tab-button ${activeTab === 'claims' ? 'active' : ''}`}
             onClick={() => setActiveTab('claims')}
           >
-            <FiMail /> Credential Claims ({claimHistory.length})
+            <FiMail /> Credential Claims ({claimHistory.length}{claimCursor ? '+' : ''})
           </button>
+          <a className="tab-button" href="/api/export/redemptions?gzip=1">
+            <FiDownload /> Export Redemptions
+          </a>
         </div>
       </div>
 
@@ -126,6 +206,7 @@ function History() {
                       ))}
                     </tbody>
                   </table>
+                  {renderLoadMore(redemptionCursor)}
                 </div>
               )}
             </div>
@@ -167,6 +248,7 @@ function History() {
                       ))}
                     </tbody>
                   </table>
+                  {renderLoadMore(claimCursor)}
                 </div>
               )}
             </div>
@@ -1,15 +1,16 @@
 import React, { useState, useEffect } from 'react'
-import { MdBarChart, MdDelete, MdAdd } from 'react-icons/md'
+import { MdBarChart, MdDelete, MdAdd, MdDownload } from 'react-icons/md'
 import { SiNetflix, SiCrunchyroll } from 'react-icons/si'
 import { GiBoxingGlove } from 'react-icons/gi'
 import { FaStar, FaTv, FaGamepad, FaXbox } from 'react-icons/fa'
 import { MdSportsKabaddi } from 'react-icons/md'
+import { resultOf } from '../jobs'
 import './Keys.css'
 
 function Keys({ platform }) {
   const [keys, setKeys] = useState([])
   const [showGenerateModal, setShowGenerateModal] = useState(false)
-  const [generateFormData, setGenerateFormData] = useState({ uses: 1, account_text: '' })
+  const [generateFormData, setGenerateFormData] = useState({ uses: 1, count: 1, account_text: '' })
   const [loading, setLoading] = useState(true)
 
   useEffect(() => {
@@ -60,12 +61,13 @@ function Keys({ platform }) {
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify(generateFormData)
       })
-      const data = await response.json()
+      const data = await resultOf(await response.json())
       if (data.success) {
-        alert(`Key generated successfully!\nKey Code: ${data.key_code}`)
+        // Bulk generation runs as a job and reports a count instead of one code
+        alert(data.key_code ? `Key generated successfully!\nKey Code: ${data.key_code}` : data.message)
         fetchKeys()
         setShowGenerateModal(false)
-        setGenerateFormData({ uses: 1, account_text: '' })
+        setGenerateFormData({ uses: 1, count: 1, account_text: '' })
       }
     } catch (error) {
       alert('Error generating key: ' + error.message)
@@ -96,7 +98,7 @@ function Keys({ platform }) {
       const response = await fetch(`/api/keys/${platform}/delete-all`, {
         method: 'DELETE'
       })
-      const data = await response.json()
+      const data = await resultOf(await response.json())
       if (data.success) {
         alert(data.message)
         fetchKeys()
@@ -112,6 +114,7 @@ function Keys({ platform }) {
         <h1><PlatformIcon className="title-icon" /> {platform.charAt(0).toUpperCase() + platform.slice(1)} Keys</h1>
         <div style={{ display: 'flex', gap: '10px' }}>
           <button className="btn btn-primary" onClick={() => setShowGenerateModal(true)}><MdAdd /> Generate Key</button>
+          <a className="btn btn-primary" href={`/api/export/keys?platform=${platform}`}><MdDownload /> Export CSV</a>
           <button className="btn btn-danger" onClick={handleDeleteAll}><MdDelete /> Delete All Keys</button>
         </div>
       </div>
@@ -210,6 +213,17 @@ function Keys({ platform }) {
                   required
                 />
               </div>
+              <div className="form-group">
+                <label>Number of Keys</label>
+                <input
+                  type="number"
+                  min="1"
+                  max="100000"
+                  value={generateFormData.count}
+                  onChange={e => setGenerateFormData({ ...generateFormData, count: e.target.value })}
+                  required
+                />
+              </div>
               <div className="form-group">
                 <label>Account Description (Optional)</label>
                 <input
@@ -226,7 +240,7 @@ function Keys({ platform }) {
                   className="btn btn-secondary" 
                   onClick={() => {
                     setShowGenerateModal(false)
-                    setGenerateFormData({ uses: 1, account_text: '' })
+                    setGenerateFormData({ uses: 1, count: 1, account_text: '' })
                   }}
                 >
                   Cancel
@@ -0,0 +1,71 @@
+// One shared EventSource on /api/events for every component that wants live
+// updates. Handlers receive the parsed event ({ type, ... }); a 'resync'
+// event means events may have been missed and the view should refetch.
+const EVENT_TYPES = ['redemption', 'credentials', 'resync']
+// Retry delay after the server refuses or closes the stream for good
+const RECONNECT_DELAY = 30000
+
+const handlers = new Set()
+let source = null
+let reconnectTimer = null
+let hadError = false
+
+function dispatch(event) {
+  handlers.forEach(handler => handler(event))
+}
+
+function connect() {
+  source = new EventSource('/api/events', { withCredentials: true })
+
+  EVENT_TYPES.forEach(type => {
+    source.addEventListener(type, message => {
+      try {
+        dispatch(JSON.parse(message.data))
+      } catch (error) {
+        console.error('Bad event payload:', error)
+      }
+    })
+  })
+
+  source.onopen = () => {
+    if (hadError) dispatch({ type: 'resync' })
+    hadError = false
+  }
+
+  source.onerror = () => {
+    hadError = true
+    // The browser retries dropped streams itself, but gives up on error
+    // responses (e.g. 503 when the server is at its stream limit)
+    if (source.readyState === EventSource.CLOSED) {
+      source = null
+      reconnectTimer = setTimeout(() => {
+        reconnectTimer = null
+        if (handlers.size) connect()
+      }, RECONNECT_DELAY)
+    }
+  }
+}
+
+export function subscribeEvents(handler) {
+  handlers.add(handler)
+  if (!source && !reconnectTimer) connect()
+
+  return () => {
+    handlers.delete(handler)
+    if (handlers.size) return
+    if (source) source.close()
+    if (reconnectTimer) clearTimeout(reconnectTimer)
+    source = null
+    reconnectTimer = null
+    hadError = false
+  }
+}
+
+// Call fn at most once per `wait` ms, after the last of a burst of calls
+export function debounce(fn, wait) {
+  let timer = null
+  return (...args) => {
+    clearTimeout(timer)
+    timer = setTimeout(() => fn(...args), wait)
+  }
+}
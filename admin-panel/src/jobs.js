@@ -0,0 +1,26 @@
+// Poll a background job until it finishes. Resolves with the job on success,
+// rejects with its error message on failure.
+export async function waitForJob(jobId, onProgress, interval = 1000) {
+  while (true) {
+    const response = await fetch(`/api/jobs/${jobId}`, { credentials: 'include' })
+    const data = await response.json()
+    if (!data.success) {
+      throw new Error(data.message || 'Failed to fetch job status')
+    }
+
+    const job = data.job
+    if (onProgress) onProgress(job)
+    if (job.status === 'succeeded') return job
+    if (job.status === 'failed') throw new Error(job.error || 'Job failed')
+
+    await new Promise(resolve => setTimeout(resolve, interval))
+  }
+}
+
+// Run the response of an endpoint that may return a job ID: wait for the job
+// and return its result, or return the response body as-is.
+export async function resultOf(data, onProgress) {
+  if (!data.success || !data.job_id) return data
+  const job = await waitForJob(data.job_id, onProgress)
+  return { success: true, ...job.result }
+}
@@ -1,18 +1,38 @@
-from flask import Flask, request, jsonify, send_from_directory, session, redirect, url_for
+from flask import (Flask, request, jsonify, session, redirect, url_for,
+                   Response, g, stream_with_context, make_response)
 from flask_cors import CORS
 import os
+import time
+import json
+import queue
+import base64
+import hashlib
 from datetime import datetime, timedelta
 from functools import wraps
 import secrets
-import string
-from db_setup import get_db_connection, init_db_pool, db_pool
+from db_setup import get_db_connection, init_db_pool
+import query_registry
+import metrics
+import exports
+import jobs
+import events
+import resource_versions
+import compression
+import static_assets
+from json_provider import get_provider_class
+from key_codes import generate_key_code
+from db_backends import insert_many
 from db_helpers import (
     get_platforms, get_platform_by_name, get_credentials_by_platform,
     add_credential as db_add_credential, update_credential as db_update_credential,
-    delete_credential as db_delete_credential, get_keys_by_platform, add_key
+    delete_credential as db_delete_credential, get_keys_by_platform, add_key,
+    get_claim_history as db_get_claim_history,
+    get_redemption_history as db_get_redemption_history
 )
 
-app = Flask(__name__, static_folder='admin-panel/dist', static_url_path='')
+# The panel bundle is served from memory by static_assets, not Flask's static route
+app = Flask(__name__, static_folder=None)
+app.json = get_provider_class()(app)
 CORS(app)
 
 # Generate or load persistent secret key
@@ -46,15 +66,30 @@ def get_platform_title(platform):
     }
     return platform_map.get(platform.lower(), platform.capitalize())
 
-def generate_key_code(platform):
-    """Generate a unique key code using cryptographically secure random"""
-    prefix = platform.upper()
-    alphabet = string.ascii_uppercase + string.digits
-    parts = [
-        ''.join(secrets.choice(alphabet) for _ in range(4))
-        for _ in range(3)
-    ]
-    return f"{prefix}-{'-'.join(parts)}"
+REQUEST_DURATION = metrics.REGISTRY.histogram(
+    'http_request_duration_seconds',
+    'Time spent handling admin panel API requests, by route',
+    ['method', 'route', 'status'])
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    metrics.start_exporter()
+    jobs.start_worker()
+    resource_versions.start_compactor()
+
+@app.after_request
+def record_request_duration(response):
+    start = g.pop('request_start', None)
+    if start is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUEST_DURATION.observe(time.perf_counter() - start, method=request.method,
+                                 route=route, status=str(response.status_code))
+    return response
+
+@app.after_request
+def compress_response(response):
+    return compression.compress_response(response, request.headers.get('Accept-Encoding'))
 
 def login_required(f):
     @wraps(f)
@@ -64,9 +99,55 @@ def login_required(f):
         return f(*args, **kwargs)
     return decorated_function
 
+def versioned(resources):
+    """Tag a read endpoint with an ETag from resource version counters and
+    answer If-None-Match revalidations with 304 without running the view"""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            names = resources(**kwargs)
+            if not names:
+                return f(*args, **kwargs)
+            try:
+                version, last_modified = resource_versions.get_version(names)
+            except Exception:
+                # Serve uncached rather than fail if the counters are unavailable
+                return f(*args, **kwargs)
+
+            # Read before the data, so a concurrent write can only make the
+            # tag older than the body (one extra refetch), never newer
+            etag = hashlib.sha1(f"{version}:{request.full_path}".encode()).hexdigest()[:20]
+            if request.if_none_match.contains_weak(etag):
+                response = Response(status=304)
+            else:
+                response = make_response(f(*args, **kwargs))
+                if response.status_code != 200:
+                    return response
+            response.set_etag(etag, weak=True)
+            if last_modified:
+                response.last_modified = last_modified
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
+
+def platform_resources(*kinds):
+    """Version counters of a platform-scoped endpoint (<platform> or ?platform=, else all)"""
+    def resources(platform=None):
+        platform = (platform or request.args.get('platform') or '').lower()
+        if platform and platform not in PLATFORMS:
+            return None
+        platforms = [platform] if platform else PLATFORMS
+        return [name for kind in kinds
+                for name in resource_versions.resource_names(kind, platforms)]
+    return resources
+
+PANEL = static_assets.StaticBundle()
+PANEL.manifest()
+
 @app.route('/')
 def serve():
-    return send_from_directory(app.static_folder, 'index.html')
+    return PANEL.response('index.html', request)
 
 @app.route('/api/login', methods=['POST'])
 def login():
@@ -271,6 +352,7 @@ def set_telegram_id():
 
 @app.route('/api/stats')
 @login_required
+@versioned(platform_resources('keys', 'credentials'))
 def get_stats():
     try:
         stats = {}
@@ -281,14 +363,7 @@ def get_stats():
             cur = conn.cursor()
 
             for platform in PLATFORMS:
-                cur.execute(f"""
-                    SELECT 
-                        COUNT(*) as total,
-                        COUNT(*) FILTER (WHERE status = 'active') as active,
-                        COUNT(*) FILTER (WHERE status = 'claimed') as claimed,
-                        COUNT(*) FILTER (WHERE status = 'inactive') as inactive
-                    FROM {platform}_credentials
-                """)
+                query_registry.execute(cur, 'credential_status_counts', platform=platform)
                 result = cur.fetchone()
 
                 stats[platform] = {
@@ -298,13 +373,10 @@ def get_stats():
                     'inactive': result[3] if result else 0
                 }
 
-                cur.execute(f"SELECT COUNT(*) FROM {platform}_keys")
-                platform_total_keys = cur.fetchone()[0]
-                total_keys += platform_total_keys
-
-                cur.execute(f"SELECT COUNT(*) FROM {platform}_keys WHERE status = 'active'")
-                platform_active_keys = cur.fetchone()[0]
-                active_keys += platform_active_keys
+                query_registry.execute(cur, 'key_status_counts', platform=platform)
+                key_counts = cur.fetchone()
+                total_keys += key_counts[0]
+                active_keys += key_counts[1]
 
             cur.close()
 
@@ -318,8 +390,27 @@ def get_stats():
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+@app.route('/api/query-stats')
+@login_required
+def get_query_stats():
+    """Get call counts and cumulative time for registered queries"""
+    return jsonify({'success': True, 'queries': query_registry.get_query_stats()})
+
+@app.route('/api/metrics')
+def get_metrics():
+    """Expose collected metrics in the Prometheus text format"""
+    metrics_token = os.getenv('METRICS_TOKEN')
+    if metrics_token:
+        if request.headers.get('Authorization') != f"Bearer {metrics_token}":
+            return jsonify({'success': False, 'message': 'Not authenticated'}), 401
+    elif 'logged_in' not in session:
+        return jsonify({'success': False, 'message': 'Not authenticated'}), 401
+
+    return Response(metrics.render_all(), content_type=metrics.CONTENT_TYPE)
+
 @app.route('/api/credentials/<platform>', methods=['GET'])
 @login_required
+@versioned(platform_resources('credentials'))
 def get_credentials(platform):
     if platform not in PLATFORMS:
         return jsonify({'success': False, 'message': 'Invalid platform'}), 400
@@ -335,20 +426,19 @@ def get_credentials(platform):
         rows = cur.fetchall()
         cur.close()
 
-        credentials = []
-        for row in rows:
-            credentials.append({
-                'id': row[0],
-                'email': row[1],
-                'password': row[2],
-                'status': row[3],
-                'created_at': row[4].isoformat() if row[4] else None,
-                'updated_at': row[5].isoformat() if row[5] else None,
-                'claimed_by': row[6],
-                'claimed_by_username': row[7],
-                'claimed_by_name': row[8],
-                'claimed_at': row[9].isoformat() if row[9] else None
-            })
+        # Timestamps are serialized to ISO 8601 by the JSON provider
+        credentials = [{
+            'id': row[0],
+            'email': row[1],
+            'password': row[2],
+            'status': row[3],
+            'created_at': row[4],
+            'updated_at': row[5],
+            'claimed_by': row[6],
+            'claimed_by_username': row[7],
+            'claimed_by_name': row[8],
+            'claimed_at': row[9]
+        } for row in rows]
 
     return jsonify({'success': True, 'credentials': credentials})
 
@@ -373,6 +463,65 @@ def add_credential(platform):
         return jsonify({'success': True, 'message': 'Credential added successfully'})
     return jsonify({'success': False, 'message': 'Failed to add credential'}), 500
 
+def parse_credential_line(line):
+    """Parse an 'email:password[ | extra]' upload line into (email, password), or None"""
+    # Split by ':' to get email and password part
+    parts = line.split(':', 1)  # Only split on first ':'
+    if len(parts) < 2:
+        return None
+
+    email = parts[0].strip()
+    # Extract password - get everything before '|' or whitespace+pipe
+    password_part = parts[1].strip()
+
+    # Remove everything after pipe symbol or extra data
+    if ' |' in password_part:
+        password = password_part.split(' |')[0].strip()
+    elif '|' in password_part:
+        password = password_part.split('|')[0].strip()
+    else:
+        password = password_part.strip()
+
+    if email and password and '@' in email:
+        return email, password
+    return None
+
+UPLOAD_BATCH_SIZE = 1000
+
+@jobs.job('upload_credentials')
+def run_upload_credentials(ctx, params):
+    """Insert uploaded credentials in batches, always with 'active' status"""
+    platform = params['platform']
+    lines = [line.strip() for line in params['content'].strip().split('\n')]
+    lines = [line for line in lines if line]
+    ctx.progress(0, len(lines), force=True)
+
+    added_count = 0
+    skipped_count = 0
+    for start in range(0, len(lines), UPLOAD_BATCH_SIZE):
+        rows = []
+        for line in lines[start:start + UPLOAD_BATCH_SIZE]:
+            parsed = parse_credential_line(line)
+            if parsed:
+                rows.append((parsed[0], parsed[1], 'active'))
+            else:
+                skipped_count += 1
+
+        if rows:
+            with get_db_connection() as conn:
+                cur = conn.cursor()
+                insert_many(cur, f"""
+                    INSERT INTO {platform}_credentials (email, password, status) VALUES %s
+                """, rows)
+                cur.close()
+            added_count += len(rows)
+        ctx.progress(min(start + UPLOAD_BATCH_SIZE, len(lines)))
+
+    message = f'Successfully added {added_count} credentials'
+    if skipped_count > 0:
+        message += f' ({skipped_count} skipped due to invalid format)'
+    return {'message': message, 'added': added_count, 'skipped': skipped_count}
+
 @app.route('/api/credentials/<platform>/upload', methods=['POST'])
 @login_required
 def upload_credentials(platform):
@@ -387,52 +536,10 @@ def upload_credentials(platform):
         if file.filename == '':
             return jsonify({'success': False, 'message': 'No file selected'}), 400
 
-        platform_title = get_platform_title(platform)
-
         content = file.read().decode('utf-8')
-        lines = content.strip().split('\n')
-
-        added_count = 0
-        skipped_count = 0
-        for line in lines:
-            line = line.strip()
-            if not line:
-                continue
-
-            # Split by ':' to get email and password part
-            parts = line.split(':', 1)  # Only split on first ':'
-            if len(parts) >= 2:
-                email = parts[0].strip()
-                # Extract password - get everything before '|' or whitespace+pipe
-                password_part = parts[1].strip()
-                
-                # Remove everything after pipe symbol or extra data
-                if ' |' in password_part:
-                    password = password_part.split(' |')[0].strip()
-                elif '|' in password_part:
-                    password = password_part.split('|')[0].strip()
-                else:
-                    password = password_part.strip()
-
-                # Always set status as active
-                status = 'active'
-
-                if email and password and '@' in email:
-                    cred_id = db_add_credential(platform_title, email, password, status)
-                    if cred_id:
-                        added_count += 1
-                    else:
-                        skipped_count += 1
-                else:
-                    skipped_count += 1
-            else:
-                skipped_count += 1
-
-        message = f'Successfully added {added_count} credentials'
-        if skipped_count > 0:
-            message += f' ({skipped_count} skipped due to invalid format)'
-
-        return jsonify({'success': True, 'message': message, 'added': added_count, 'skipped': skipped_count})
+        job_id = jobs.submit('upload_credentials', {'platform': platform, 'content': content},
+                             created_by=session.get('username'))
+        return jsonify({'success': True, 'message': 'Upload queued', 'job_id': job_id}), 202
     
     except Exception as e:
         logger.error(f"Error uploading credentials: {e}")
@@ -491,6 +598,7 @@ def edit_credential(platform, cred_id):
 
 @app.route('/api/credentials/<platform>/claimed', methods=['GET'])
 @login_required
+@versioned(platform_resources('credentials'))
 def get_claimed_credentials(platform):
     if platform not in PLATFORMS:
         return jsonify({'success': False, 'message': 'Invalid platform'}), 400
@@ -515,25 +623,54 @@ def get_claimed_credentials(platform):
                     'claimed_by': row[2],
                     'claimed_by_username': row[3] if row[3] else 'N/A',
                     'claimed_by_name': row[4] if row[4] else 'N/A',
-                    'claimed_at': row[5].isoformat() if row[5] else None
+                    'claimed_at': row[5]
                 })
 
         return jsonify({'success': True, 'claimed': claimed})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+DELETE_BATCH_SIZE = 10000
+
+@jobs.job('delete_all')
+def run_delete_all(ctx, params):
+    """Delete every row of a platform's keys or credentials table in batches"""
+    table = f"{params['platform']}_{params['table']}"
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT COUNT(*) FROM {table}")
+        total = cur.fetchone()[0]
+        cur.close()
+    ctx.progress(0, total, force=True)
+
+    # Short transactions keep the bot's reads and writes on this table unblocked
+    deleted = 0
+    while True:
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute(f"""
+                DELETE FROM {table}
+                WHERE id IN (SELECT id FROM {table} LIMIT %s)
+            """, (DELETE_BATCH_SIZE,))
+            count = cur.rowcount
+            cur.close()
+        if count <= 0:
+            break
+        deleted += count
+        ctx.progress(deleted)
+
+    return {'message': f"All {params['platform']} {params['table']} deleted successfully",
+            'deleted': deleted}
+
 @app.route('/api/credentials/<platform>/delete-all', methods=['DELETE'])
 @login_required
 def delete_all_credentials(platform):
     if platform not in PLATFORMS:
         return jsonify({'success': False, 'message': 'Invalid platform'}), 400
 
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        cur.execute(f"DELETE FROM {platform}_credentials")
-        cur.close()
-
-    return jsonify({'success': True, 'message': f'All {platform} credentials deleted successfully'})
+    job_id = jobs.submit('delete_all', {'platform': platform, 'table': 'credentials'},
+                         created_by=session.get('username'))
+    return jsonify({'success': True, 'message': f'Deleting all {platform} credentials', 'job_id': job_id}), 202
 
 @app.route('/api/keys/<platform>/delete-all', methods=['DELETE'])
 @login_required
@@ -541,15 +678,13 @@ def delete_all_keys(platform):
     if platform not in PLATFORMS:
         return jsonify({'success': False, 'message': 'Invalid platform'}), 400
 
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        cur.execute(f"DELETE FROM {platform}_keys")
-        cur.close()
-
-    return jsonify({'success': True, 'message': f'All {platform} keys deleted successfully'})
+    job_id = jobs.submit('delete_all', {'platform': platform, 'table': 'keys'},
+                         created_by=session.get('username'))
+    return jsonify({'success': True, 'message': f'Deleting all {platform} keys', 'job_id': job_id}), 202
 
 @app.route('/api/keys/<platform>', methods=['GET'])
 @login_required
+@versioned(platform_resources('keys'))
 def get_keys(platform):
     if platform not in PLATFORMS:
         return jsonify({'success': False, 'message': 'Invalid platform'}), 400
@@ -568,25 +703,53 @@ def get_keys(platform):
             rows = cur.fetchall()
             cur.close()
 
-            keys = []
-            for row in rows:
-                keys.append({
-                    'id': row[0],
-                    'key_code': row[1],
-                    'uses': row[2],
-                    'remaining_uses': row[3],
-                    'account_text': row[4] if row[4] else '',
-                    'status': row[5],
-                    'created_at': row[6].isoformat() if row[6] else None,
-                    'redeemed_at': row[7].isoformat() if row[7] else None,
-                    'giveaway_generated': row[8] if row[8] else False,
-                    'giveaway_winner': row[9] if row[9] else None
-                })
+            # Timestamps are serialized to ISO 8601 by the JSON provider
+            keys = [{
+                'id': row[0],
+                'key_code': row[1],
+                'uses': row[2],
+                'remaining_uses': row[3],
+                'account_text': row[4] if row[4] else '',
+                'status': row[5],
+                'created_at': row[6],
+                'redeemed_at': row[7],
+                'giveaway_generated': row[8] if row[8] else False,
+                'giveaway_winner': row[9] if row[9] else None
+            } for row in rows]
 
         return jsonify({'success': True, 'keys': keys})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e), 'keys': []}), 500
 
+MAX_BULK_KEYS = 100000
+KEY_BATCH_SIZE = 1000
+
+@jobs.job('generate_keys')
+def run_generate_keys(ctx, params):
+    """Generate keys in batches, retrying codes that collide with existing ones"""
+    platform, count = params['platform'], params['count']
+    uses, account_text = params['uses'], params['account_text']
+    ctx.progress(0, count, force=True)
+
+    key_codes = []
+    while len(key_codes) < count:
+        batch = {generate_key_code(platform)
+                 for _ in range(min(KEY_BATCH_SIZE, count - len(key_codes)))}
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            inserted = insert_many(cur, f"""
+                INSERT INTO {platform}_keys (key_code, uses, remaining_uses, account_text)
+                VALUES %s
+                ON CONFLICT (key_code) DO NOTHING
+                RETURNING key_code
+            """, [(code, uses, uses, account_text) for code in batch], fetch=True)
+            cur.close()
+        key_codes.extend(row[0] for row in inserted)
+        ctx.progress(len(key_codes))
+
+    # The codes themselves are in the platform's key list and /api/export/keys
+    return {'message': f'Generated {len(key_codes)} keys', 'generated': len(key_codes)}
+
 @app.route('/api/keys/<platform>', methods=['POST'])
 @login_required
 def generate_key(platform):
@@ -604,6 +767,19 @@ def generate_key(platform):
     except ValueError:
         return jsonify({'success': False, 'message': 'Invalid uses value'}), 400
 
+    try:
+        count = int(data.get('count', 1))
+        if count < 1 or count > MAX_BULK_KEYS:
+            return jsonify({'success': False, 'message': f'Count must be between 1 and {MAX_BULK_KEYS}'}), 400
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid count value'}), 400
+
+    if count > 1:
+        job_id = jobs.submit('generate_keys', {
+            'platform': platform, 'count': count, 'uses': uses, 'account_text': account_text
+        }, created_by=session.get('username'))
+        return jsonify({'success': True, 'message': f'Generating {count} keys', 'job_id': job_id}), 202
+
     platform_title = get_platform_title(platform)
 
     max_attempts = 5
@@ -636,88 +812,242 @@ def delete_key(platform, key_id):
 
     return jsonify({'success': False, 'message': 'Failed to delete key'}), 500
 
+HISTORY_PAGE_SIZE = 100
+HISTORY_MAX_PAGE_SIZE = 500
+
+def encode_history_cursor(position):
+    """Encode a keyset position as an opaque pagination cursor"""
+    if position is None:
+        return None
+    values = [v.isoformat() if isinstance(v, datetime) else v for v in position]
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+def decode_history_cursor(cursor, size):
+    """Decode a pagination cursor back into a keyset position of `size` values"""
+    padded = cursor + '=' * (-len(cursor) % 4)
+    values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    if not isinstance(values, list) or len(values) != size or not isinstance(values[-1], int):
+        raise ValueError('Invalid cursor')
+    return (datetime.fromisoformat(values[0]),) + tuple(values[1:])
+
+def parse_user_id(value):
+    """Parse an optional Telegram user ID query parameter"""
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError('user_id must be an integer')
+
+def parse_history_args(cursor_size):
+    """Parse limit, cursor, platform and user_id query parameters of history endpoints"""
+    try:
+        limit = int(request.args.get('limit', HISTORY_PAGE_SIZE))
+    except ValueError:
+        raise ValueError('limit must be an integer')
+    limit = max(1, min(limit, HISTORY_MAX_PAGE_SIZE))
+
+    after = None
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            after = decode_history_cursor(cursor, cursor_size)
+        except (ValueError, TypeError):
+            raise ValueError('Invalid cursor')
+
+    platform = request.args.get('platform')
+    if platform:
+        platform = platform.lower()
+        if platform not in PLATFORMS:
+            raise ValueError('Invalid platform')
+
+    user_id = parse_user_id(request.args.get('user_id'))
+    return limit, after, platform, user_id
+
 @app.route('/api/redemption-history', methods=['GET'])
 @login_required
+@versioned(platform_resources('redemptions'))
 def get_redemption_history():
-    """Get history of all key redemptions with user details"""
+    """Get a page of key redemptions with user details"""
     try:
-        with get_db_connection() as conn:
-            cur = conn.cursor()
-            cur.execute("""
-                SELECT 
-                    user_id,
-                    username,
-                    full_name,
-                    redeemed_at,
-                    key_code,
-                    platform
-                FROM key_redemptions
-                ORDER BY redeemed_at DESC
-                LIMIT 100
-            """)
-            redemptions = cur.fetchall()
-            cur.close()
-
-            history = []
-            for r in redemptions:
-                history.append({
-                    'user_id': r[0],
-                    'username': r[1] if r[1] else 'N/A',
-                    'full_name': r[2] if r[2] else 'N/A',
-                    'redeemed_at': r[3].isoformat() if r[3] else None,
-                    'key_code': r[4],
-                    'platform': r[5]
-                })
+        limit, after, platform, user_id = parse_history_args(2)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
 
-            return jsonify({'success': True, 'history': history})
+    try:
+        history, next_position = db_get_redemption_history(limit, after, platform, user_id)
+        return jsonify({
+            'success': True,
+            'history': history,
+            'next_cursor': encode_history_cursor(next_position)
+        })
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
 @app.route('/api/claim-history', methods=['GET'])
 @login_required
+@versioned(platform_resources('credentials'))
 def get_claim_history():
-    """Get history of all credential claims with user details"""
+    """Get a page of credential claims across all platforms with user details"""
     try:
-        history = []
+        limit, after, platform, user_id = parse_history_args(3)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
 
-        with get_db_connection() as conn:
-            cur = conn.cursor()
+    try:
+        history, next_position = db_get_claim_history(limit, after, platform, user_id)
+        return jsonify({
+            'success': True,
+            'history': history,
+            'next_cursor': encode_history_cursor(next_position)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
 
-            for platform in PLATFORMS:
-                cur.execute(f"""
-                    SELECT 
-                        claimed_by as user_id,
-                        claimed_by_username,
-                        claimed_by_name,
-                        claimed_at,
-                        email
-                    FROM {platform}_credentials
-                    WHERE status = 'claimed' AND claimed_by IS NOT NULL
-                    ORDER BY claimed_at DESC
-                    LIMIT 100
-                """)
-                claims = cur.fetchall()
-
-                for c in claims:
-                    history.append({
-                        'user_id': c[0],
-                        'username': c[1] if c[1] else 'N/A',
-                        'full_name': c[2] if c[2] else 'N/A',
-                        'claimed_at': c[3].isoformat() if c[3] else None,
-                        'email': c[4],
-                        'platform': platform
-                })
+def export_response(resource, columns, rows, scope):
+    """Stream an export as a CSV/NDJSON attachment (?format=csv|ndjson, ?gzip=1)"""
+    fmt = request.args.get('format', 'csv').lower()
+    compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+
+    filename = f"{resource}-{scope}-{datetime.now().strftime('%Y%m%d-%H%M%S')}.{fmt}"
+    mimetype = exports.FORMATS[fmt]
+    if compress:
+        filename += '.gz'
+        mimetype = 'application/gzip'
+
+    response = Response(stream_with_context(exports.stream_export(columns, rows, fmt, compress)),
+                        mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response.headers['Cache-Control'] = 'no-store'
+    return response
+
+def validate_export_format():
+    """Get an error response if ?format= is not a supported export format"""
+    fmt = request.args.get('format', 'csv').lower()
+    if fmt not in exports.FORMATS:
+        return jsonify({'success': False, 'message': 'format must be csv or ndjson'}), 400
+    return None
+
+@app.route('/api/export/keys', methods=['GET'])
+@login_required
+def export_keys():
+    """Stream all keys of one platform (?platform=) or all platforms"""
+    error = validate_export_format()
+    if error:
+        return error
+    try:
+        platforms = exports.resolve_platforms(request.args.get('platform'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    scope = platforms[0] if len(platforms) == 1 else 'all'
+    return export_response('keys', exports.KEY_COLUMNS, exports.iter_keys(platforms), scope)
 
-            return jsonify({'success': True, 'history': history})
+@app.route('/api/export/credentials', methods=['GET'])
+@login_required
+def export_credentials():
+    """Stream all credentials of one platform (?platform=) or all platforms"""
+    error = validate_export_format()
+    if error:
+        return error
+    try:
+        platforms = exports.resolve_platforms(request.args.get('platform'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    scope = platforms[0] if len(platforms) == 1 else 'all'
+    return export_response('credentials', exports.CREDENTIAL_COLUMNS,
+                           exports.iter_credentials(platforms), scope)
+
+@app.route('/api/export/redemptions', methods=['GET'])
+@login_required
+def export_redemptions():
+    """Stream key redemptions, optionally filtered by platform, user_id and since/until dates"""
+    error = validate_export_format()
+    if error:
+        return error
+    try:
+        platform = request.args.get('platform')
+        if platform and platform != 'all':
+            platform = exports.resolve_platforms(platform)[0]
+        else:
+            platform = None
+        since = request.args.get('since')
+        until = request.args.get('until')
+        since = datetime.fromisoformat(since) if since else None
+        until = datetime.fromisoformat(until) if until else None
+        user_id = parse_user_id(request.args.get('user_id'))
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+
+    rows = exports.iter_redemptions(platform, user_id, since, until)
+    return export_response('redemptions', exports.REDEMPTION_COLUMNS, rows, platform or 'all')
+
+@app.route('/api/jobs', methods=['GET'])
+@login_required
+def get_recent_jobs():
+    """Get the most recent background jobs"""
+    try:
+        return jsonify({'success': True, 'jobs': jobs.list_jobs()})
+    except Exception as e:
+        return jsonify({'success': False, 'message': str(e)}), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+@login_required
+def get_job_status(job_id):
+    """Get the status, progress and result of a background job"""
+    try:
+        job = jobs.get_job(job_id)
+        if not job:
+            return jsonify({'success': False, 'message': 'Job not found'}), 404
+        return jsonify({'success': True, 'job': job})
     except Exception as e:
         return jsonify({'success': False, 'message': str(e)}), 500
 
+# Streams are capped per process (events.stream_capacity) and closed after a
+# while; EventSource reconnects on its own
+EVENTS_STREAM_SECONDS = int(os.getenv('EVENTS_STREAM_SECONDS', '300'))
+EVENTS_KEEPALIVE_SECONDS = 15
+
+def format_sse(event):
+    """Format an event dict as a Server-Sent Events frame"""
+    return f"event: {event.get('type', 'message')}\ndata: {json.dumps(event)}\n\n"
+
+@app.route('/api/events', methods=['GET'])
+@login_required
+def stream_events():
+    """Stream redemption and credential change events (text/event-stream)"""
+    client = events.BROKER.subscribe()
+    if client is None:
+        events.STREAMS_REJECTED.inc()
+        return jsonify({'success': False, 'message': 'Too many event streams'}), 503
+    events.STREAMS_OPENED.inc()
+
+    def generate():
+        try:
+            yield "retry: 5000\n\n"
+            deadline = time.monotonic() + EVENTS_STREAM_SECONDS
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    event = client.get(timeout=min(EVENTS_KEEPALIVE_SECONDS, remaining))
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            events.BROKER.unsubscribe(client)
+
+    response = Response(stream_with_context(generate()), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/<path:path>')
 def catch_all(path):
-    if path and os.path.exists(os.path.join(app.static_folder, path)):
-        return send_from_directory(app.static_folder, path)
-    else:
-        return send_from_directory(app.static_folder, 'index.html')
+    return PANEL.response(path, request)
 
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=5000, debug=False)
\ No newline at end of file
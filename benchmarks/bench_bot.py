@@ -0,0 +1,309 @@
+#!/usr/bin/env python
+"""
+End-to-end load test of the bot's redemption flow.
+
+Starts a fake Telegram Bot API server on a local port (every method answers
+after --api-latency ms; --retry-after makes that fraction of calls fail with
+429 Too Many Requests / RetryAfter), seeds one key and one credential per
+synthetic user, and builds the real Application from start.build_application
+pointed at the fake server. Each of --users synthetic users then sends
+/start, /redeem <key> and a "My Stats" callback query through the
+registered handlers, with --concurrency users in flight at once. With
+--flood N every user then sends N more /start updates back to back, which
+the per-user rate limiter (bot/rate_limit.py) should drop.
+
+Reports flows per second, throughput and p50/p95/p99 latency per step,
+handler errors, updates dropped by the rate limiter, user rows written by
+the write-behind user registry, Bot API calls (and injected 429s), and
+database pool saturation sampled every 5 ms. Runs against BACKEND=sqlite without a
+PostgreSQL server.
+
+Usage: BACKEND=sqlite python benchmarks/bench_bot.py [--users N]
+           [--concurrency N] [--api-latency MS] [--retry-after FRACTION]
+           [--platform NAME] [--steps start,redeem,stats] [--flood N]
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import logging
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from telegram import Update
+
+import start
+from db_setup import get_db_connection, init_database
+from db_backends import get_backend, insert_many
+from key_codes import generate_key_code
+import user_registry
+
+TOKEN = '123456:LOADTEST'
+BOT_USER = {'id': 123456, 'is_bot': True, 'first_name': 'Load Bot', 'username': 'load_bot',
+            'can_join_groups': True, 'can_read_all_group_messages': False,
+            'supports_inline_queries': False}
+STEPS = ('start', 'redeem', 'stats')
+
+
+class FakeBotAPI(ThreadingHTTPServer):
+    """Bot API server answering every method with a plausible result"""
+
+    daemon_threads = True
+
+    def __init__(self, latency, retry_after, retry_seconds):
+        super().__init__(('127.0.0.1', 0), FakeBotAPIHandler)
+        self.latency = latency
+        self.retry_after = retry_after
+        self.retry_seconds = retry_seconds
+        self.calls = {}
+        self.throttled = 0
+        self.lock = threading.Lock()
+        self.message_id = 0
+
+    def result_for(self, method):
+        if method == 'getMe':
+            return BOT_USER
+        if method == 'getChatMember':
+            return {'status': 'member', 'user': {'id': 1, 'is_bot': False, 'first_name': 'Load'}}
+        if method.startswith(('send', 'edit')):
+            with self.lock:
+                self.message_id += 1
+                message_id = self.message_id
+            return {'message_id': message_id, 'date': int(time.time()),
+                    'chat': {'id': 1, 'type': 'private'}, 'from': BOT_USER}
+        return True
+
+
+class FakeBotAPIHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are separate writes; don't let Nagle hold the body back
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        server = self.server
+        method = self.path.rsplit('/', 1)[-1]
+        if server.latency:
+            time.sleep(server.latency)
+
+        with server.lock:
+            server.calls[method] = server.calls.get(method, 0) + 1
+        if method != 'getMe' and random.random() < server.retry_after:
+            with server.lock:
+                server.throttled += 1
+            status, body = 429, {'ok': False, 'error_code': 429,
+                                 'description': f"Too Many Requests: retry after {server.retry_seconds}",
+                                 'parameters': {'retry_after': server.retry_seconds}}
+        else:
+            status, body = 200, {'ok': True, 'result': server.result_for(method)}
+
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class PoolSampler(threading.Thread):
+    """Samples the storage backend's connections in use from outside the event loop"""
+
+    def __init__(self, interval=0.005):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self.limit = None
+        self.stop = threading.Event()
+
+    def run(self):
+        backend = get_backend()
+        while not self.stop.wait(self.interval):
+            in_use, self.limit = backend.usage()
+            self.samples.append(in_use)
+
+
+def seed(platform, users, run_id):
+    """Insert one key and one active credential per synthetic user"""
+    codes = [generate_key_code(platform) for _ in range(users)]
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        insert_many(cur, f"""
+            INSERT INTO {platform}_keys (key_code, uses, remaining_uses, account_text) VALUES %s
+        """, [(code, 1, 1, 'Load test account') for code in codes])
+        insert_many(cur, f"""
+            INSERT INTO {platform}_credentials (email, password, status) VALUES %s
+        """, [(f"load{run_id}-{i}@example.com", f"pw-{i}", 'active') for i in range(users)])
+        cur.close()
+    return codes
+
+
+def user_payload(user_id):
+    return {'id': user_id, 'is_bot': False, 'first_name': 'Load', 'last_name': str(user_id),
+            'username': f"load{user_id}"}
+
+
+def command_update(update_id, user_id, text):
+    command = text.split(' ', 1)[0]
+    return {'update_id': update_id, 'message': {
+        'message_id': update_id, 'date': int(time.time()),
+        'chat': {'id': user_id, 'type': 'private'}, 'from': user_payload(user_id), 'text': text,
+        'entities': [{'type': 'bot_command', 'offset': 0, 'length': len(command)}]}}
+
+
+def callback_update(update_id, user_id, data):
+    return {'update_id': update_id, 'callback_query': {
+        'id': str(update_id), 'from': user_payload(user_id), 'chat_instance': str(user_id),
+        'data': data, 'message': {
+            'message_id': update_id, 'date': int(time.time()),
+            'chat': {'id': user_id, 'type': 'private'}, 'from': BOT_USER, 'text': 'menu'}}}
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def run_load(application, codes, args):
+    steps = [s.strip() for s in args.steps.split(',')]
+    latencies = {step: [] for step in steps}
+    errors = {step: 0 for step in steps}
+    pending = {}
+    next_update_id = iter(range(1, 10 ** 9))
+
+    async def count_error(update, context):
+        if isinstance(update, Update) and update.update_id in pending:
+            errors[pending[update.update_id]] += 1
+
+    application.add_error_handler(count_error)
+
+    async def send(step, payload):
+        update = Update.de_json(payload, application.bot)
+        pending[update.update_id] = step
+        begin = time.perf_counter()
+        await application.process_update(update)
+        latencies[step].append(time.perf_counter() - begin)
+        pending.pop(update.update_id, None)
+
+    # Fresh user IDs per run so redemption cooldowns from earlier runs never apply
+    base_user = 5_000_000_000 + random.randrange(10 ** 12)
+    queue = asyncio.Queue()
+    for i, code in enumerate(codes):
+        queue.put_nowait((base_user + i, code))
+
+    async def user_worker():
+        while True:
+            try:
+                user_id, code = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            for step in steps:
+                if step == 'start':
+                    payload = command_update(next(next_update_id), user_id, '/start')
+                elif step == 'redeem':
+                    payload = command_update(next(next_update_id), user_id, f"/redeem {code}")
+                else:
+                    payload = callback_update(next(next_update_id), user_id, 'user_my_stats')
+                await send(step, payload)
+            for _ in range(args.flood):
+                update = Update.de_json(command_update(next(next_update_id), user_id, '/start'),
+                                        application.bot)
+                await application.process_update(update)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(user_worker() for _ in range(args.concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+async def main_async(args):
+    server = FakeBotAPI(args.api_latency / 1000, args.retry_after, args.retry_seconds)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/bot"
+
+    init_database()
+    run_id = f"{int(time.time()) % 100000:05d}"
+    codes = seed(args.platform, args.users, run_id)
+
+    application = start.build_application(TOKEN, base_url=base_url)
+    from rate_limit import UPDATES_DROPPED
+    await application.initialize()
+    user_registry.USERS.start()
+    sampler = PoolSampler()
+    sampler.start()
+    try:
+        latencies, errors, elapsed = await run_load(application, codes, args)
+    finally:
+        sampler.stop.set()
+        # Let the admin notification tasks scheduled by redemptions finish
+        await asyncio.sleep(0.1)
+        await application.shutdown()
+        server.shutdown()
+
+    print(f"{args.users} users, concurrency {args.concurrency}, Bot API latency {args.api_latency:g} ms, "
+          f"429 rate {args.retry_after:g}, backend {get_backend().name}")
+    print(f"{args.users / elapsed:.1f} flows/s over {elapsed:.1f} s\n")
+    print(f"{'step':<10}{'count':>8}{'per s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for step, values in latencies.items():
+        print(f"{step:<10}{len(values):>8}{len(values) / elapsed:>9.1f}"
+              f"{percentile(values, 50) * 1e3:>9.1f}{percentile(values, 95) * 1e3:>9.1f}"
+              f"{percentile(values, 99) * 1e3:>9.1f}{errors[step]:>8}")
+
+    dropped = {key[0]: value for key, value in UPDATES_DROPPED.snapshot()}
+    print(f"\nRate limiter: {sum(dropped.values())} updates dropped"
+          + ''.join(f", {limit} {count}" for limit, count in sorted(dropped.items())))
+
+    user_registry.USERS.flush()
+    flushes = sum(value for key, value in user_registry.FLUSHES.snapshot() if key == ['ok'])
+    written = sum(value for _, value in user_registry.FLUSHED_USERS.snapshot())
+    print(f"User registry: {written} user rows in {flushes} batched upserts")
+
+    calls = sum(server.calls.values())
+    print(f"Bot API: {calls} calls ({calls / elapsed:.1f}/s), {server.throttled} answered 429; "
+          + ', '.join(f"{method} {count}" for method, count in sorted(server.calls.items())))
+
+    samples = sampler.samples or [0]
+    peak = max(samples)
+    mean = sum(samples) / len(samples)
+    if sampler.limit:
+        saturated = sum(1 for s in samples if s >= sampler.limit) / len(samples)
+        print(f"DB pool: peak {peak}/{sampler.limit} in use, mean {mean:.2f}, "
+              f"saturated {saturated:.1%} of {len(samples)} samples")
+    else:
+        print(f"DB connections: peak {peak} in use, mean {mean:.2f} over {len(samples)} samples")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=500, help='synthetic users (one key each)')
+    parser.add_argument('--concurrency', type=int, default=50, help='users in flight at once')
+    parser.add_argument('--api-latency', type=float, default=30, help='fake Bot API latency in ms')
+    parser.add_argument('--retry-after', type=float, default=0.0,
+                        help='fraction of Bot API calls answered with 429 RetryAfter')
+    parser.add_argument('--retry-seconds', type=int, default=1, help='retry_after of injected 429s')
+    parser.add_argument('--platform', default='netflix', help='platform of the seeded keys')
+    parser.add_argument('--steps', default=','.join(STEPS), help='comma separated steps per user')
+    parser.add_argument('--flood', type=int, default=0, help='extra /start updates per user after its steps')
+    parser.add_argument('--verbose', action='store_true', help='keep the bot\'s logging')
+    args = parser.parse_args()
+    unknown = set(s.strip() for s in args.steps.split(',')) - set(STEPS)
+    if unknown:
+        parser.error(f"unknown steps: {', '.join(sorted(unknown))}")
+
+    if not args.verbose:
+        # Injected 429s would otherwise log an error per update
+        logging.disable(logging.ERROR)
+    asyncio.run(main_async(args))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,290 @@
+#!/usr/bin/env python
+"""
+Micro-benchmarks of the db_helpers hot paths at several data sizes.
+
+For every --sizes N a fresh database is seeded with N keys and N credentials
+on --platform (half the keys used), N key_redemptions spread over N/10 users
+with their user_stats, and 1% of the users banned. Then each function is
+called --repeat times with seeded arguments (get_keys_by_platform and
+get_credentials_by_platform return every row, so they run --list-repeat
+times and are skipped above --list-max-rows):
+
+    get_key_by_code, get_key_by_code_miss (scans every platform table),
+    get_keys_by_platform, get_credentials_by_platform, redeem_key,
+    get_user_stats, is_user_banned
+
+Each size runs in its own process on its own SQLite file (BACKEND=sqlite),
+so nothing but a Python install is needed. `--backend postgres` uses
+BENCH_DATABASE_URL instead and TRUNCATES the platform's key and credential
+tables, key_redemptions, users, user_stats and banned_users there. It
+refuses to run without --truncate, or when BENCH_DATABASE_URL names the
+same database as the app's DATABASE_URL.
+
+Results are written as JSON (--output) keyed by size and function, with the
+commit they were measured on; --compare reports the change in median
+time against an earlier file and exits non-zero when one regressed by more than
+--threshold percent.
+
+Usage: python benchmarks/bench_data_layer.py [--sizes 1000,100000,1000000]
+           [--repeat N] [--output results.json] [--compare baseline.json]
+       BENCH_DATABASE_URL=postgresql://.../scratch python benchmarks/bench_data_layer.py
+           --backend postgres --truncate
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform as platform_info
+import subprocess
+import tempfile
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Seeded user IDs start here so they never collide with real Telegram IDs
+USER_BASE = 9_000_000_000
+SEED_CHUNK = 50000
+
+
+def key_code(i):
+    return f"BENCH-{i:08d}"
+
+
+def seed(platform, rows):
+    """Fill the database with `rows` keys, credentials and redemptions"""
+    from db_setup import get_db_connection, init_database
+    from db_backends import BACKEND, insert_many
+
+    init_database()
+    users = max(rows // 10, 1)
+    used = rows // 2
+    start = datetime.now() - timedelta(seconds=rows)
+
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        if BACKEND == 'postgres':
+            cur.execute(f"TRUNCATE {platform}_keys, {platform}_credentials, key_redemptions, "
+                        f"users, user_stats, banned_users")
+
+        for offset in range(0, rows, SEED_CHUNK):
+            chunk = range(offset, min(offset + SEED_CHUNK, rows))
+            insert_many(cur, f"""
+                INSERT INTO {platform}_keys (key_code, uses, remaining_uses, account_text, status)
+                VALUES %s
+            """, [(key_code(i), 1, 0 if i < used else 1, 'Bench account', 'used' if i < used else 'active')
+                  for i in chunk], page_size=500)
+            insert_many(cur, f"""
+                INSERT INTO {platform}_credentials (email, password, status) VALUES %s
+            """, [(f"bench{i}@example.com", f"pw-{i}", 'active') for i in chunk], page_size=500)
+            insert_many(cur, """
+                INSERT INTO key_redemptions (platform, key_code, user_id, username, full_name, redeemed_at)
+                VALUES %s
+            """, [(platform, key_code(i % max(used, 1)), USER_BASE + i % users, f"bench{i % users}",
+                   'Bench User', start + timedelta(seconds=i)) for i in chunk], page_size=500)
+
+        for offset in range(0, users, SEED_CHUNK):
+            chunk = range(offset, min(offset + SEED_CHUNK, users))
+            insert_many(cur, "INSERT INTO users (user_id, username) VALUES %s",
+                        [(USER_BASE + u, f"bench{u}") for u in chunk], page_size=500)
+            rows_per_user = [rows // users + (1 if u < rows % users else 0) for u in chunk]
+            insert_many(cur, """
+                INSERT INTO user_stats (user_id, total_redemptions, platform_counts,
+                                        first_redeemed_at, last_redeemed_at)
+                VALUES %s
+            """, [(USER_BASE + u, count, json.dumps({platform: count}), start, datetime.now())
+                  for u, count in zip(chunk, rows_per_user)], page_size=500)
+            insert_many(cur, "INSERT INTO banned_users (user_identifier) VALUES %s",
+                        [(str(USER_BASE + u),) for u in chunk if u % 100 == 0], page_size=500)
+        cur.close()
+    return users, used
+
+
+def time_calls(func, args_list):
+    """Call func once per args tuple, the first as a warm-up, and summarize the times"""
+    func(*args_list[0])
+    times = []
+    for args in args_list[1:]:
+        begin = time.perf_counter()
+        func(*args)
+        times.append(time.perf_counter() - begin)
+    times.sort()
+    return {
+        'calls': len(times),
+        'mean_ms': round(sum(times) / len(times) * 1e3, 4),
+        'p50_ms': round(times[len(times) // 2] * 1e3, 4),
+        'p95_ms': round(times[min(len(times) - 1, int(len(times) * 0.95))] * 1e3, 4),
+        'min_ms': round(times[0] * 1e3, 4),
+    }
+
+
+def run_size(args):
+    """Seed one database and time every function on it (child process)"""
+    import db_helpers
+
+    rows = args.size
+    seed_start = time.perf_counter()
+    users, used = seed(args.platform, rows)
+    seed_seconds = time.perf_counter() - seed_start
+
+    rng = random.Random(42)
+    calls = args.repeat + 1
+    with db_helpers.get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT id FROM {args.platform}_keys WHERE status = 'active' ORDER BY id LIMIT %s",
+                    (calls,))
+        active_ids = [row[0] for row in cur.fetchall()]
+        cur.close()
+
+    def user():
+        return USER_BASE + rng.randrange(users)
+
+    results = {
+        'get_key_by_code': time_calls(db_helpers.get_key_by_code,
+                                      [(key_code(rng.randrange(rows)),) for _ in range(calls)]),
+        'get_key_by_code_miss': time_calls(db_helpers.get_key_by_code,
+                                           [(f"MISS-{i:08d}",) for i in range(calls)]),
+        'get_user_stats': time_calls(db_helpers.get_user_stats, [(user(),) for _ in range(calls)]),
+        'is_user_banned': time_calls(db_helpers.is_user_banned,
+                                     [(user(), f"bench{rng.randrange(users)}") for _ in range(calls)]),
+    }
+    for name, func in (('get_keys_by_platform', db_helpers.get_keys_by_platform),
+                       ('get_credentials_by_platform', db_helpers.get_credentials_by_platform)):
+        if rows > args.list_max_rows:
+            results[name] = {'skipped': f"more than --list-max-rows {args.list_max_rows}"}
+        else:
+            results[name] = time_calls(func, [(args.platform,)] * (args.list_repeat + 1))
+    # Last, as it changes the data: each call redeems a different active key
+    results['redeem_key'] = time_calls(
+        lambda key_id, user_id: db_helpers.redeem_key(args.platform, key_id, user_id, 'bench', 'Bench User'),
+        [(key_id, user()) for key_id in active_ids])
+
+    return {'rows': rows, 'users': users, 'seed_seconds': round(seed_seconds, 2), 'functions': results}
+
+
+def same_database(url, other):
+    """Check whether two connection URLs name the same database"""
+    from psycopg2.extensions import parse_dsn
+
+    def target(dsn):
+        params = parse_dsn(dsn)
+        return (params.get('host') or 'localhost', str(params.get('port') or 5432), params.get('dbname'))
+    return target(url) == target(other)
+
+
+def bench_database_url(args):
+    """Get the scratch database of --backend postgres, refusing the app's own"""
+    url = os.getenv('BENCH_DATABASE_URL')
+    if not url:
+        raise SystemExit("--backend postgres needs BENCH_DATABASE_URL pointing at a scratch database")
+    app_url = os.getenv('DATABASE_URL')
+    if app_url and same_database(url, app_url):
+        raise SystemExit("BENCH_DATABASE_URL is the app's DATABASE_URL; refusing to truncate it")
+    if not args.truncate:
+        raise SystemExit("--backend postgres truncates tables of BENCH_DATABASE_URL; pass --truncate to confirm")
+    return url
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline_path, threshold):
+    """Print the change in median time against a baseline; returns the regressions"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    print(f"\nChange in median time vs {baseline_path} ({baseline.get('commit') or 'unknown commit'}):")
+    regressions = []
+    for size, entry in results['sizes'].items():
+        old_entry = baseline.get('sizes', {}).get(size)
+        if not old_entry:
+            continue
+        for name, stats in entry['functions'].items():
+            old = old_entry['functions'].get(name, {})
+            if 'p50_ms' not in stats or not old.get('p50_ms'):
+                continue
+            change = (stats['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100
+            flag = ''
+            if change > threshold:
+                flag = '  REGRESSION'
+                regressions.append((size, name, change))
+            print(f"{size:>9}  {name:<30}{old['p50_ms']:>10.3f} -> {stats['p50_ms']:>10.3f} ms"
+                  f"{change:>+8.1f}%{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='1000,100000,1000000', help='comma separated row counts')
+    parser.add_argument('--repeat', type=int, default=200, help='calls per point-lookup function')
+    parser.add_argument('--list-repeat', type=int, default=3, help='calls per full-list function')
+    parser.add_argument('--list-max-rows', type=int, default=100000,
+                        help='skip the full-list functions above this size')
+    parser.add_argument('--platform', default='netflix', help='platform the rows are seeded on')
+    parser.add_argument('--backend', choices=('sqlite', 'postgres'), default='sqlite',
+                        help='postgres TRUNCATES tables of BENCH_DATABASE_URL (see above)')
+    parser.add_argument('--truncate', action='store_true',
+                        help='confirm that --backend postgres may truncate BENCH_DATABASE_URL')
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--threshold', type=float, default=20, help='regression threshold in percent')
+    parser.add_argument('--size', type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.size is not None:
+        # Child process: the last line of output is the result
+        print(json.dumps(run_size(args)))
+        return
+
+    database_url = bench_database_url(args) if args.backend == 'postgres' else None
+
+    results = {
+        'commit': git_commit(),
+        'backend': args.backend,
+        'platform': args.platform,
+        'repeat': args.repeat,
+        'python': platform_info.python_version(),
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'sizes': {},
+    }
+    print(f"{'rows':>9}  {'function':<30}{'calls':>7}{'mean ms':>10}{'p50 ms':>10}{'p95 ms':>10}")
+    with tempfile.TemporaryDirectory(prefix='bench-data-layer-') as tmp:
+        for size in (int(s) for s in args.sizes.split(',')):
+            env = dict(os.environ, BACKEND=args.backend,
+                       SQLITE_PATH=os.path.join(tmp, f"bench-{size}.sqlite3"))
+            if database_url:
+                env['DATABASE_URL'] = database_url
+            child = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), '--size', str(size),
+                 '--repeat', str(args.repeat), '--list-repeat', str(args.list_repeat),
+                 '--list-max-rows', str(args.list_max_rows), '--platform', args.platform],
+                cwd=ROOT, env=env, capture_output=True, text=True)
+            if child.returncode != 0:
+                sys.stderr.write(child.stderr)
+                raise SystemExit(f"Benchmark at {size} rows failed")
+            entry = json.loads(child.stdout.strip().splitlines()[-1])
+            results['sizes'][str(size)] = entry
+            for name, stats in entry['functions'].items():
+                if 'skipped' in stats:
+                    print(f"{size:>9}  {name:<30}{'skipped':>7}")
+                    continue
+                print(f"{size:>9}  {name:<30}{stats['calls']:>7}{stats['mean_ms']:>10.3f}"
+                      f"{stats['p50_ms']:>10.3f}{stats['p95_ms']:>10.3f}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+    if args.compare and compare(results, args.compare, args.threshold):
+        raise SystemExit(1)
+
+
+if __name__ == '__main__':
+    main()
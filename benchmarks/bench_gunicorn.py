@@ -0,0 +1,187 @@
+#!/usr/bin/env python
+"""
+Load test of the admin API under each gunicorn worker profile.
+
+For every profile, starts gunicorn with gunicorn_config.py on a local port,
+logs in, and has --concurrency client threads request /api/stats and
+/api/keys/<platform> over keep-alive connections for --duration seconds.
+--slow-clients holds that many /api/events streams open during the run to
+show how long-lived requests eat into the worker slots. Reports throughput,
+latency percentiles and errors per endpoint.
+
+Needs DATABASE_URL and an admin account (BENCH_USERNAME / BENCH_PASSWORD,
+falling back to ADMIN_USERNAME / ADMIN_PASSWORD as seeded by db_setup).
+
+Usage: python benchmarks/bench_gunicorn.py [--profiles gthread,sync,legacy]
+           [--concurrency N] [--duration S] [--slow-clients N] [--preload]
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import threading
+import subprocess
+import http.client
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ENDPOINTS = ['/api/stats', '/api/keys/{platform}']
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=2)
+            conn.request('GET', '/api/check-auth')
+            conn.getresponse().read()
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+def login(port, username, password):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    conn.request('POST', '/api/login', json.dumps({'username': username, 'password': password}),
+                  {'Content-Type': 'application/json'})
+    response = conn.getresponse()
+    response.read()
+    cookie = response.getheader('Set-Cookie')
+    if response.status != 200 or not cookie:
+        raise RuntimeError(f"Login failed with HTTP {response.status}; set BENCH_USERNAME/BENCH_PASSWORD")
+    return cookie.split(';', 1)[0]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def client(port, cookie, paths, stop, results, lock):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+    # Plain revalidation-free requests: no If-None-Match, so every call does the work
+    headers = {'Cookie': cookie, 'Accept-Encoding': 'gzip'}
+    local = {path: ([], 0) for path in paths}
+    i = 0
+    while not stop.is_set():
+        path = paths[i % len(paths)]
+        i += 1
+        start = time.perf_counter()
+        try:
+            conn.request('GET', path, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            ok = response.status == 200
+        except (OSError, http.client.HTTPException):
+            ok = False
+            conn.close()
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        latencies, errors = local[path]
+        if ok:
+            latencies.append(time.perf_counter() - start)
+        else:
+            local[path] = (latencies, errors + 1)
+    with lock:
+        for path, (latencies, errors) in local.items():
+            results[path][0].extend(latencies)
+            results[path][1] += errors
+
+
+def hold_stream(port, cookie, stop):
+    while not stop.is_set():
+        try:
+            conn = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+            conn.request('GET', '/api/events', headers={'Cookie': cookie})
+            response = conn.getresponse()
+            while not stop.is_set() and response.status == 200:
+                try:
+                    response.fp.readline()
+                except socket.timeout:
+                    continue
+            conn.close()
+            if response.status != 200:
+                stop.wait(1)
+        except OSError:
+            stop.wait(1)
+
+
+def run_profile(profile, args, credentials):
+    port = free_port()
+    env = dict(os.environ, GUNICORN_PROFILE=profile, PORT=str(port),
+               GUNICORN_PRELOAD='true' if args.preload else 'false',
+               EVENTS_MAX_CLIENTS=str(max(args.slow_clients, 1)))
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', os.path.join(ROOT, 'gunicorn_config.py'),
+         '--log-level', 'warning', '--access-logfile', '/dev/null', 'api_server:app'],
+        cwd=ROOT, env=env)
+    try:
+        if not wait_ready(port):
+            raise RuntimeError(f"gunicorn ({profile}) did not start")
+        cookie = login(port, *credentials)
+        paths = [p.format(platform=args.platform) for p in ENDPOINTS]
+
+        # Warm up pools and caches before measuring
+        warm = http.client.HTTPConnection('127.0.0.1', port, timeout=60)
+        for path in paths:
+            warm.request('GET', path, headers={'Cookie': cookie})
+            warm.getresponse().read()
+
+        stop = threading.Event()
+        holders = [threading.Thread(target=hold_stream, args=(port, cookie, stop), daemon=True)
+                   for _ in range(args.slow_clients)]
+        for t in holders:
+            t.start()
+
+        results = {path: [[], 0] for path in paths}
+        lock = threading.Lock()
+        clients = [threading.Thread(target=client, args=(port, cookie, paths, stop, results, lock))
+                   for _ in range(args.concurrency)]
+        started = time.perf_counter()
+        for t in clients:
+            t.start()
+        time.sleep(args.duration)
+        stop.set()
+        for t in clients:
+            t.join()
+        elapsed = time.perf_counter() - started
+        return results, elapsed
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--profiles', default='gthread,sync,legacy', help='comma separated profiles')
+    parser.add_argument('--concurrency', type=int, default=16, help='client threads')
+    parser.add_argument('--duration', type=float, default=15, help='seconds per profile')
+    parser.add_argument('--slow-clients', type=int, default=0, help='event streams held open during the run')
+    parser.add_argument('--platform', default='netflix', help='platform for /api/keys/<platform>')
+    parser.add_argument('--preload', action='store_true', help='run gunicorn with GUNICORN_PRELOAD=true')
+    args = parser.parse_args()
+
+    credentials = (os.getenv('BENCH_USERNAME', os.getenv('ADMIN_USERNAME', 'admin')),
+                   os.getenv('BENCH_PASSWORD', os.getenv('ADMIN_PASSWORD', 'changeme')))
+
+    print(f"{'profile':<10}{'endpoint':<22}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for profile in args.profiles.split(','):
+        results, elapsed = run_profile(profile.strip(), args, credentials)
+        for path, (latencies, errors) in results.items():
+            print(f"{profile:<10}{path:<22}{len(latencies) / elapsed:>9.1f}"
+                  f"{percentile(latencies, 50) * 1e3:>9.1f}{percentile(latencies, 95) * 1e3:>9.1f}"
+                  f"{percentile(latencies, 99) * 1e3:>9.1f}{errors:>8}")
+
+
+if __name__ == '__main__':
+    main()
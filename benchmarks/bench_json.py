@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""
+Benchmark for serializing and compressing a large /api/credentials response.
+
+Builds a credentials payload of --rows rows the way the endpoint does and
+times the previous path (per-field .isoformat() + Flask's default provider)
+against the providers in json_provider.py, then reports the bytes on the wire
+and compression time for identity, gzip and brotli encodings.
+
+Usage: python benchmarks/bench_json.py [--rows N] [--repeat N]
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import compression
+from json_provider import OrjsonProvider, StdlibJSONProvider, orjson
+
+
+def make_rows(count):
+    """Rows shaped like the /api/credentials SELECT"""
+    start = datetime(2025, 1, 1, 12, 0, 0, 123456)
+    rows = []
+    for i in range(count):
+        created = start + timedelta(seconds=i * 37)
+        claimed = i % 3 == 0
+        rows.append((
+            i + 1, f"user{i}@example.com", f"Pa55-{i:08d}", 'claimed' if claimed else 'active',
+            created, created,
+            str(6000000000 + i) if claimed else None,
+            f"tg_user_{i}" if claimed else None,
+            f"User Number {i}" if claimed else None,
+            created + timedelta(hours=2) if claimed else None,
+        ))
+    return rows
+
+
+def build_legacy(rows):
+    return {'success': True, 'credentials': [{
+        'id': row[0], 'email': row[1], 'password': row[2], 'status': row[3],
+        'created_at': row[4].isoformat() if row[4] else None,
+        'updated_at': row[5].isoformat() if row[5] else None,
+        'claimed_by': row[6], 'claimed_by_username': row[7], 'claimed_by_name': row[8],
+        'claimed_at': row[9].isoformat() if row[9] else None
+    } for row in rows]}
+
+
+def build_native(rows):
+    return {'success': True, 'credentials': [{
+        'id': row[0], 'email': row[1], 'password': row[2], 'status': row[3],
+        'created_at': row[4], 'updated_at': row[5],
+        'claimed_by': row[6], 'claimed_by_username': row[7], 'claimed_by_name': row[8],
+        'claimed_at': row[9]
+    } for row in rows]}
+
+
+def best_of(repeat, func):
+    best, result = None, None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=50000, help='credential rows in the payload')
+    parser.add_argument('--repeat', type=int, default=5, help='runs per measurement (best is kept)')
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    rows = make_rows(args.rows)
+
+    cases = [('default+isoformat', DefaultJSONProvider(app), build_legacy),
+             ('stdlib', StdlibJSONProvider(app), build_native)]
+    if orjson is not None:
+        cases.append(('orjson', OrjsonProvider(app), build_native))
+    else:
+        print("orjson is not installed; skipping the orjson provider\n")
+
+    print(f"{args.rows} rows")
+    print(f"{'provider':<20}{'build ms':>10}{'dumps ms':>10}{'total ms':>10}{'bytes':>12}")
+    body = None
+    with app.app_context():
+        for name, provider, build in cases:
+            build_time, payload = best_of(args.repeat, lambda: build(rows))
+            # The response path, as jsonify() uses it (compact separators)
+            dump_time, response = best_of(args.repeat, lambda: provider.response(payload))
+            body = response.get_data()
+            print(f"{name:<20}{build_time * 1e3:>10.1f}{dump_time * 1e3:>10.1f}"
+                  f"{(build_time + dump_time) * 1e3:>10.1f}{len(body):>12,}")
+
+    print(f"\n{'encoding':<20}{'compress ms':>12}{'bytes':>12}{'ratio':>8}")
+    print(f"{'identity':<20}{0:>12.1f}{len(body):>12,}{1:>8.1f}")
+    for encoding in ('gzip', 'br'):
+        if encoding == 'br' and compression.brotli is None:
+            print("brotli is not installed; skipping br")
+            continue
+        elapsed, data = best_of(args.repeat, lambda: compression.compress(body, encoding))
+        print(f"{encoding:<20}{elapsed * 1e3:>12.1f}{len(data):>12,}{len(body) / len(data):>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
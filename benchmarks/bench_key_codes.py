@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+"""
+Benchmark of rejecting invalid /redeem input before the database.
+
+Generates --count inputs of each kind a spammer or a typo produces and
+reports, per kind, how many key_codes.validate rejects and how fast:
+
+    garbage      free text and malformed codes
+    guess        well-formed PLATFORM-XXXX-XXXX-XXXX-XXXX codes with random characters
+    typo         a valid code with one character changed
+    swap         a valid code with two neighbouring characters swapped
+    legacy       well-formed pre-checksum codes (not rejectable; still looked up)
+
+With --db, the same number of get_key_by_code lookups of unknown codes is
+timed against the configured BACKEND for comparison, i.e. the cost each
+rejected input no longer pays.
+
+Usage: python benchmarks/bench_key_codes.py [--count N] [--db]
+"""
+import os
+import sys
+import time
+import random
+import string
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import key_codes
+from db_helpers import PLATFORMS
+
+rng = random.Random(42)
+
+
+def random_chars(count):
+    return ''.join(rng.choice(key_codes.ALPHABET) for _ in range(count))
+
+
+def garbage():
+    kind = rng.randrange(3)
+    if kind == 0:
+        return ''.join(rng.choice(string.ascii_letters + ' ') for _ in range(rng.randrange(3, 20))).upper()
+    if kind == 1:
+        return f"{rng.choice(PLATFORMS).upper()}-{random_chars(rng.randrange(3, 12))}"
+    return f"FREE-{random_chars(4)}-{random_chars(4)}-{random_chars(4)}"
+
+
+def guess():
+    return f"{rng.choice(PLATFORMS).upper()}-" + '-'.join(random_chars(4) for _ in range(4))
+
+
+def typo():
+    chars = list(key_codes.generate_key_code(rng.choice(PLATFORMS)))
+    positions = [i for i, c in enumerate(chars) if c != '-']
+    i = rng.choice(positions)
+    chars[i] = rng.choice([c for c in key_codes.ALPHABET if c != chars[i]])
+    return ''.join(chars)
+
+
+def swap():
+    while True:
+        chars = list(key_codes.generate_key_code(rng.choice(PLATFORMS)))
+        pairs = [i for i in range(len(chars) - 1)
+                 if '-' not in (chars[i], chars[i + 1]) and chars[i] != chars[i + 1]]
+        if pairs:
+            i = rng.choice(pairs)
+            chars[i], chars[i + 1] = chars[i + 1], chars[i]
+            return ''.join(chars)
+
+
+def legacy():
+    return f"{rng.choice(PLATFORMS).upper()}-" + '-'.join(random_chars(4) for _ in range(3))
+
+
+KINDS = {'garbage': garbage, 'guess': guess, 'typo': typo, 'swap': swap, 'legacy': legacy}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--count', type=int, default=100000, help='inputs per kind')
+    parser.add_argument('--db', action='store_true', help='also time database lookups of unknown codes')
+    args = parser.parse_args()
+
+    print(f"{'input':<10}{'rejected':>10}{'rate':>9}{'validations/s':>16}{'us each':>10}")
+    for name, make in KINDS.items():
+        inputs = [make() for _ in range(args.count)]
+        start = time.perf_counter()
+        rejected = sum(1 for code in inputs if key_codes.validate(code))
+        elapsed = time.perf_counter() - start
+        print(f"{name:<10}{rejected:>10}{rejected / len(inputs):>9.2%}"
+              f"{len(inputs) / elapsed:>16,.0f}{elapsed / len(inputs) * 1e6:>10.2f}")
+
+    if args.db:
+        from db_setup import init_database
+        from db_helpers import get_key_by_code
+        from db_backends import get_backend
+
+        init_database()
+        lookups = min(args.count, 2000)
+        inputs = [guess() for _ in range(lookups)]
+        get_key_by_code(inputs[0])
+        start = time.perf_counter()
+        for code in inputs:
+            get_key_by_code(code)
+        elapsed = time.perf_counter() - start
+        print(f"\nget_key_by_code of unknown codes ({get_backend().name}): "
+              f"{lookups / elapsed:,.0f} lookups/s, {elapsed / lookups * 1e6:.0f} us each")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+#!/usr/bin/env python
+"""
+Memory, speed and false positive rate of the redeemable-key filter.
+
+For each --error-rates target a key_filter.BloomFilter is sized the way
+KeyFilter.rebuild sizes it for --keys redeemable keys (GROWTH headroom),
+filled with that many generated codes, and probed with --probes codes that
+were never added (valid format and check character, as a guesser who read
+the format would send). Reports the bit array's size, build and lookup
+rates, and the measured false positive rate next to the configured one and
+the one expected at that fill. A Python set of the same codes is measured
+with tracemalloc for comparison.
+
+Needs no database: codes are generated in memory.
+
+Usage: python benchmarks/bench_key_filter.py [--keys 1000000]
+           [--probes 1000000] [--error-rates 0.01,0.001,0.0001]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from key_codes import ALPHABET, GROUPS, check_character
+from key_filter import GROWTH, MIN_CAPACITY, BloomFilter
+
+
+def make_codes(count, rng, platforms):
+    """Generate checked key codes quickly from a seeded generator"""
+    codes = []
+    for _ in range(count):
+        random_chars = ''.join(rng.choices(ALPHABET, k=GROUPS * 4 - 1))
+        body = f"{rng.choice(platforms)}-" + '-'.join(
+            random_chars[i:i + 4] for i in range(0, len(random_chars), 4))
+        codes.append(body + check_character(body))
+    return codes
+
+
+def set_memory(codes):
+    """Get the bytes a Python set of the codes takes, strings included"""
+    tracemalloc.start()
+    copies = {code.encode().decode() for code in codes}
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del copies
+    return size
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--keys', type=int, default=1000000, help='redeemable keys in the filter')
+    parser.add_argument('--probes', type=int, default=1000000, help='absent codes looked up')
+    parser.add_argument('--error-rates', default='0.01,0.001,0.0001',
+                        help='comma separated configured false positive rates')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    from db_helpers import PLATFORMS
+    platforms = [platform.upper() for platform in PLATFORMS]
+    rng = random.Random(args.seed)
+    started = time.perf_counter()
+    codes = make_codes(args.keys, rng, platforms)
+    present = set(codes)
+    probes = [code for code in make_codes(args.probes, rng, platforms) if code not in present]
+    print(f"Generated {len(codes)} keys and {len(probes)} absent codes in {time.perf_counter() - started:.1f} s")
+    print(f"Python set of the keys: {set_memory(codes) / 2 ** 20:.1f} MiB\n")
+
+    capacity = max(args.keys * GROWTH, MIN_CAPACITY)
+    print(f"{'target':>8}{'hashes':>8}{'MiB':>8}{'bits/key':>10}{'build/s':>11}{'lookup/s':>11}"
+          f"{'expected':>11}{'measured':>11}")
+    for error_rate in (float(r) for r in args.error_rates.split(',')):
+        bloom = BloomFilter(capacity, error_rate)
+        begin = time.perf_counter()
+        for code in codes:
+            bloom.add(code)
+        build_seconds = time.perf_counter() - begin
+
+        begin = time.perf_counter()
+        false_positives = sum(1 for code in probes if code in bloom)
+        lookup_seconds = time.perf_counter() - begin
+        missing = sum(1 for code in codes[:10000] if code not in bloom)
+        if missing:
+            raise SystemExit(f"{missing} added codes reported absent")
+
+        print(f"{error_rate:>8g}{bloom.hashes:>8}{bloom.memory_bytes() / 2 ** 20:>8.2f}"
+              f"{bloom.size / args.keys:>10.1f}{args.keys / build_seconds:>11.0f}"
+              f"{len(probes) / lookup_seconds:>11.0f}{bloom.expected_error_rate():>11.5f}"
+              f"{false_positives / len(probes):>11.5f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python
+"""
+Micro-benchmark for bot reply rendering cost per update.
+
+Compares building the main menu, help screen, redemption success text and the
+admin platform keyboard from scratch (the previous per-call approach) against
+the prebuilt templates in bot/messages.py.
+
+Usage: python benchmarks/bench_messages.py [--number N]
+"""
+import os
+import sys
+import timeit
+import argparse
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'bot'))
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, User
+
+import messages
+from db_helpers import get_platforms
+
+USER = User(id=123456789, first_name='Bench', is_bot=False, username='bench_user')
+
+
+def build_main_menu_legacy():
+    keyboard = [[InlineKeyboardButton("🎁 Redeem Key", callback_data="user_redeem_key")],
+                [InlineKeyboardButton("📊 My Stats", callback_data="user_my_stats")],
+                [InlineKeyboardButton("📢 Channel Portal", url="https://t.me/accountvaultportal"),
+                 InlineKeyboardButton("📢 Channel Main", url="https://t.me/+GaP9QSmVo4EyYzM0")],
+                [InlineKeyboardButton("📢 Channel Backup", url="https://t.me/+gdJVaBNwwyg5MDc0"),
+                 InlineKeyboardButton("📢 Channel Config", url="https://t.me/+gxVbPeU842ZkNmU0")],
+                [InlineKeyboardButton("📢 Join Channel", url="https://t.me/QuantXBox")],
+                [InlineKeyboardButton("❓ Help", callback_data="user_help")],
+                [InlineKeyboardButton("👨‍💻 Developer", callback_data="user_developer")]]
+    keyboard.insert(1, [InlineKeyboardButton("🎁 Join Giveaway", callback_data="user_join_giveaway")])
+    reply_markup = InlineKeyboardMarkup(keyboard)
+    text = ("🎮 <b>Premium Vault - Main Menu</b> 🎮\n\n"
+            f"👤 <b>User:</b> {USER.mention_html()}\n\n"
+            "✨ <b>What would you like to do?</b>\n\n"
+            "🔑 Redeem premium account keys\n"
+            "📊 Check your statistics\n"
+            "🎁 Participate in giveaways\n"
+            "❓ Get help and support\n\n"
+            "👇 Select an option below:")
+    return text, reply_markup
+
+
+def build_main_menu_template():
+    return messages.render_main_menu(USER.mention_html(), True)
+
+
+def build_help_legacy():
+    text = messages.HELP_TEXT[:]
+    return text, InlineKeyboardMarkup([[InlineKeyboardButton("🔙 Back to Main", callback_data="user_main")]])
+
+
+def build_help_template():
+    return messages.HELP_TEXT, messages.BACK_TO_USER_MAIN_KEYBOARD
+
+
+def build_success_legacy():
+    platform_name, account_text = 'Netflix', 'Premium Account'
+    text = ("🎉 <b>Key Redeemed Successfully!</b> 🎉\n\n"
+            f"🎁 <b>Platform:</b> {platform_name}\n"
+            f"✨ <b>Account Type:</b> {account_text}\n\n"
+            f"📧 <b>Email:</b> <code>user@example.com</code>\n"
+            f"🔑 <b>Password:</b> <code>hunter2</code>\n\n"
+            f"💡 <i>Tap to copy the credentials!</i>\n\n"
+            f"⚠️ <b>Important:</b>\n"
+            f"• Don't share these credentials\n"
+            f"• Change the password if needed\n"
+            f"• Enjoy your {platform_name} account!\n\n"
+            f"🎮 Thank you for using Premium Vault Bot!")
+    keyboard = [[InlineKeyboardButton("🔙 Back to Main", callback_data="user_main")]]
+    error_markup = InlineKeyboardMarkup(keyboard)
+    keyboard = [[InlineKeyboardButton("🔙 Back to Main", callback_data="user_main")]]
+    return text, InlineKeyboardMarkup(keyboard), error_markup
+
+
+def build_success_template():
+    text = messages.render_redeem_success('Netflix', 'Premium Account', 'user@example.com', 'hunter2')
+    return text, messages.BACK_TO_USER_MAIN_KEYBOARD
+
+
+def build_platform_keyboard_legacy():
+    keyboard = []
+    for platform in get_platforms():
+        keyboard.append([
+            InlineKeyboardButton(
+                f"{platform['emoji']} {platform['name']}",
+                callback_data=f"admin_gen_platform_{platform['name'].lower()}")
+        ])
+    keyboard.append([InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")])
+    return InlineKeyboardMarkup(keyboard)
+
+
+def build_platform_keyboard_template():
+    return messages.GENERATE_KEYS_PLATFORM_KEYBOARD
+
+
+CASES = [
+    ('main_menu', build_main_menu_legacy, build_main_menu_template),
+    ('help', build_help_legacy, build_help_template),
+    ('redeem_success', build_success_legacy, build_success_template),
+    ('admin_platform_keyboard', build_platform_keyboard_legacy, build_platform_keyboard_template),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=20000, help='renders per measurement')
+    args = parser.parse_args()
+
+    print(f"{'case':<26}{'legacy µs':>12}{'template µs':>14}{'speedup':>10}")
+    for name, legacy, template in CASES:
+        legacy_time = min(timeit.repeat(legacy, number=args.number, repeat=3)) / args.number
+        template_time = min(timeit.repeat(template, number=args.number, repeat=3)) / args.number
+        print(f"{name:<26}{legacy_time * 1e6:>12.2f}{template_time * 1e6:>14.2f}"
+              f"{legacy_time / template_time:>9.1f}x")
+
+
+if __name__ == '__main__':
+    main()
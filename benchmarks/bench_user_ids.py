@@ -0,0 +1,212 @@
+#!/usr/bin/env python
+"""
+Index sizes and lookup times of VARCHAR versus BIGINT user IDs.
+
+Seeds --users users and --redemptions redemptions (random 10-digit Telegram
+IDs) into two sets of scratch tables shaped like `users` and
+`key_redemptions`, with the same indexes: one set with the old VARCHAR(50)
+user_id, one with BIGINT. Reports each index's size and the time of the
+per-user lookups the bot makes (user by ID, cooldown, recent redemptions,
+key already redeemed), with the IDs passed as strings and ints respectively,
+as the data layer did before and does now.
+
+With BACKEND=postgres the VARCHAR tables are then converted with the same
+ALTER COLUMN ... TYPE BIGINT that user_ids.migrate_user_ids runs, and the
+migration time and the indexes' sizes after it are reported. SQLite cannot
+change a column's type, so there only the two layouts are compared (index
+sizes from the dbstat table). Scratch tables are dropped unless --keep.
+
+Usage: BACKEND=sqlite python benchmarks/bench_user_ids.py [--users N]
+           [--redemptions N] [--repeat N] [--keep]
+"""
+import os
+import sys
+import time
+import random
+import argparse
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from db_setup import get_db_connection
+from db_backends import BACKEND, insert_many
+from bench_data_layer import time_calls
+
+PREFIX = 'bench_uid'
+SEED_CHUNK = 50000
+LAYOUTS = {'varchar': 'VARCHAR(50)', 'bigint': 'BIGINT'}
+
+LOOKUPS = {
+    'user_by_id': "SELECT id FROM {t}_users WHERE user_id = %s",
+    'last_redemption': """
+        SELECT redeemed_at FROM {t}_redemptions WHERE user_id = %s
+        ORDER BY redeemed_at DESC LIMIT 1
+    """,
+    'recent_redemptions': """
+        SELECT key_code, platform, redeemed_at FROM {t}_redemptions WHERE user_id = %s
+        ORDER BY redeemed_at DESC LIMIT 5
+    """,
+    'key_redeemed_by_user': "SELECT COUNT(*) FROM {t}_redemptions WHERE key_code = %s AND user_id = %s",
+}
+
+
+def table(layout):
+    return f"{PREFIX}_{layout}"
+
+
+def create_tables(cur, layout):
+    t, column_type = table(layout), LAYOUTS[layout]
+    serial = 'SERIAL' if BACKEND == 'postgres' else 'INTEGER'
+    cur.execute(f"DROP TABLE IF EXISTS {t}_users")
+    cur.execute(f"DROP TABLE IF EXISTS {t}_redemptions")
+    cur.execute(f"""
+        CREATE TABLE {t}_users (
+            id {serial} PRIMARY KEY,
+            user_id {column_type} UNIQUE NOT NULL,
+            username VARCHAR(255)
+        )
+    """)
+    cur.execute(f"""
+        CREATE TABLE {t}_redemptions (
+            id {serial} PRIMARY KEY,
+            platform VARCHAR(50) NOT NULL,
+            key_code VARCHAR(100) NOT NULL,
+            user_id {column_type} NOT NULL,
+            redeemed_at TIMESTAMP NOT NULL
+        )
+    """)
+
+
+def create_indexes(cur, layout):
+    t = table(layout)
+    cur.execute(f"CREATE INDEX {t}_redemptions_user_time ON {t}_redemptions(user_id, redeemed_at DESC)")
+    cur.execute(f"CREATE INDEX {t}_redemptions_key_user ON {t}_redemptions(key_code, user_id)")
+
+
+def seed(cur, layout, user_ids, redemptions):
+    """Insert the users and redemptions, IDs as the layout's Python type"""
+    t = table(layout)
+    as_param = str if layout == 'varchar' else int
+    for offset in range(0, len(user_ids), SEED_CHUNK):
+        insert_many(cur, f"INSERT INTO {t}_users (user_id, username) VALUES %s",
+                    [(as_param(u), f"user{u}") for u in user_ids[offset:offset + SEED_CHUNK]],
+                    page_size=500)
+    for offset in range(0, len(redemptions), SEED_CHUNK):
+        insert_many(cur, f"""
+            INSERT INTO {t}_redemptions (platform, key_code, user_id, redeemed_at) VALUES %s
+        """, [(platform, code, as_param(u), at) for platform, code, u, at in redemptions[offset:offset + SEED_CHUNK]],
+            page_size=500)
+
+
+def index_sizes(cur, layout):
+    """Get {index: bytes} of the layout's scratch tables"""
+    t = table(layout)
+    if BACKEND == 'postgres':
+        cur.execute("""
+            SELECT indexrelid::regclass::text, pg_relation_size(indexrelid)
+            FROM pg_index WHERE indrelid IN (%s::regclass, %s::regclass)
+        """, (f"{t}_users", f"{t}_redemptions"))
+        sizes = dict(cur.fetchall())
+    else:
+        cur.execute("""
+            SELECT s.name, SUM(d.pgsize) FROM dbstat d
+            JOIN sqlite_schema s ON s.name = d.name
+            WHERE s.type = 'index' AND s.tbl_name IN (%s, %s)
+            GROUP BY s.name
+        """, (f"{t}_users", f"{t}_redemptions"))
+        sizes = dict(cur.fetchall())
+    # Strip the layout so the same index lines up across layouts
+    return {name.replace(f"{t}_", '').replace(t, ''): size for name, size in sizes.items()}
+
+
+def time_lookups(cur, layout, samples, as_param):
+    t = table(layout)
+    results = {}
+    for name, sql in LOOKUPS.items():
+        sql = sql.format(t=t)
+
+        def lookup(*params):
+            cur.execute(sql, params)
+            cur.fetchall()
+
+        if name == 'key_redeemed_by_user':
+            args = [(code, as_param(u)) for code, u in samples]
+        else:
+            args = [(as_param(u),) for _, u in samples]
+        results[name] = time_calls(lookup, args)
+    return results
+
+
+def print_sizes(title, sizes):
+    print(f"\n{title}")
+    for name, size in sorted(sizes.items()):
+        print(f"  {name:<40}{size / 2 ** 20:>10.2f} MiB")
+    print(f"  {'total':<40}{sum(sizes.values()) / 2 ** 20:>10.2f} MiB")
+
+
+def print_lookups(results_by_layout):
+    layouts = list(results_by_layout)
+    print(f"\n{'lookup':<24}" + ''.join(f"{layout + ' p50 ms':>18}" for layout in layouts))
+    for name in LOOKUPS:
+        print(f"{name:<24}" + ''.join(f"{results_by_layout[layout][name]['p50_ms']:>18.4f}"
+                                      for layout in layouts))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=100000)
+    parser.add_argument('--redemptions', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=2000, help='calls per lookup')
+    parser.add_argument('--keep', action='store_true', help='keep the scratch tables')
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    user_ids = rng.sample(range(1_000_000_000, 8_000_000_000), args.users)
+    start = datetime.now() - timedelta(seconds=args.redemptions)
+    redemptions = [('netflix', f"NETFLIX-{i:012d}", rng.choice(user_ids), start + timedelta(seconds=i))
+                   for i in range(args.redemptions)]
+    samples = [(code, u) for _, code, u, _ in rng.sample(redemptions, args.repeat + 1)]
+    print(f"{args.users} users, {args.redemptions} redemptions, backend {BACKEND}")
+
+    results = {}
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        for layout in LAYOUTS:
+            begin = time.perf_counter()
+            create_tables(cur, layout)
+            seed(cur, layout, user_ids, redemptions)
+            create_indexes(cur, layout)
+            conn.commit()
+            print(f"Seeded {layout} tables in {time.perf_counter() - begin:.1f}s")
+        if BACKEND == 'postgres':
+            cur.execute(f"ANALYZE {table('varchar')}_users, {table('varchar')}_redemptions, "
+                        f"{table('bigint')}_users, {table('bigint')}_redemptions")
+            conn.commit()
+
+        for layout in LAYOUTS:
+            print_sizes(f"{layout} indexes", index_sizes(cur, layout))
+            results[layout] = time_lookups(cur, layout, samples, str if layout == 'varchar' else int)
+
+        if BACKEND == 'postgres':
+            t = table('varchar')
+            begin = time.perf_counter()
+            for name in ('users', 'redemptions'):
+                cur.execute(f"ALTER TABLE {t}_{name} ALTER COLUMN user_id TYPE BIGINT USING user_id::bigint")
+            conn.commit()
+            print(f"\nMigrated the varchar tables to BIGINT in {time.perf_counter() - begin:.1f}s")
+            cur.execute(f"ANALYZE {t}_users, {t}_redemptions")
+            print_sizes("varchar indexes after the migration", index_sizes(cur, 'varchar'))
+            results['migrated'] = time_lookups(cur, 'varchar', samples, int)
+
+        print_lookups(results)
+
+        if not args.keep:
+            for layout in LAYOUTS:
+                cur.execute(f"DROP TABLE IF EXISTS {table(layout)}_users")
+                cur.execute(f"DROP TABLE IF EXISTS {table(layout)}_redemptions")
+        cur.close()
+
+
+if __name__ == '__main__':
+    main()
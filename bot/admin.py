@@ -1,17 +1,20 @@
 #!/usr/bin/env python
 import os
 import random
-import string
 import logging
 from datetime import datetime, timedelta
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
 from telegram.ext import ContextTypes, ConversationHandler
+import query_registry
+from key_codes import generate_key_code
 from db_helpers import (
     get_platforms, add_key, get_keys_by_platform, get_key_by_code,
     delete_keys_by_platform, is_user_banned as db_is_user_banned,
     ban_user as db_ban_user, get_db_connection, get_all_admin_telegram_ids,
     unban_user, is_user_banned, get_banned_users
 )
+from instrumentation import timed_handler
+import messages
 
 logger = logging.getLogger(__name__)
 
@@ -55,59 +58,11 @@ def ensure_data_files():
     """Compatibility function - no longer needed with PostgreSQL"""
     pass
 
-def generate_key_code(platform):
-    """Generate a unique key code"""
-    prefix = platform.upper()
-    parts = [
-        ''.join(random.choices(string.ascii_uppercase + string.digits, k=4))
-        for _ in range(3)
-    ]
-    return f"{prefix}-{'-'.join(parts)}"
-
+@timed_handler
 async def admin_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show admin main menu"""
-    user_id = update.effective_user.id
-
-    keyboard = [
-        [
-            InlineKeyboardButton("🔑 Generate Keys",
-                                 callback_data="admin_generate_keys")
-        ],
-        [
-            InlineKeyboardButton("🎫 Generate Credentials",
-                                 callback_data="admin_generate_credentials")
-        ],
-        [InlineKeyboardButton("📊 Bot Stats", callback_data="admin_bot_stats")],
-        [
-            InlineKeyboardButton("📋 List All Keys",
-                                 callback_data="admin_list_keys")
-        ],
-        [
-            InlineKeyboardButton("🗑️ Clear Expired Keys",
-                                 callback_data="admin_clear_expired")
-        ],
-        [
-            InlineKeyboardButton("🎁 Start Giveaway",
-                                 callback_data="admin_start_giveaway")
-        ],
-        [
-            InlineKeyboardButton("🛑 Stop Giveaway",
-                                 callback_data="admin_stop_giveaway")
-        ],
-        [
-            InlineKeyboardButton("❌ Revoke Key",
-                                 callback_data="admin_revoke_key")
-        ],
-        [InlineKeyboardButton("📢 Broadcast", callback_data="admin_broadcast")],
-        [InlineKeyboardButton("🚫 Ban User", callback_data="admin_ban_user")],
-        [InlineKeyboardButton("✅ Unban User", callback_data="admin_unban_user")],
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    welcome_text = ("🎮 <b>Admin Panel - Premium Vault Bot</b> 🎮\n\n"
-                    "👋 Welcome back, Admin!\n\n"
-                    "🔧 <b>What would you like to do?</b>\n\n"
-                    "Select an option from the menu below:")
+    reply_markup = messages.ADMIN_MAIN_KEYBOARD
+    welcome_text = messages.ADMIN_WELCOME_TEXT
 
     if update.callback_query:
         await update.callback_query.edit_message_text(
@@ -124,18 +79,7 @@ async def admin_generate_keys_platform(update: Update,
     query = update.callback_query
     await query.answer()
 
-    platforms = get_platforms()
-    keyboard = []
-    for platform in platforms:
-        keyboard.append([
-            InlineKeyboardButton(
-                f"{platform['emoji']} {platform['name']}",
-                callback_data=f"admin_gen_platform_{platform['name'].lower()}")
-        ])
-    keyboard.append(
-        [InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")])
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = messages.GENERATE_KEYS_PLATFORM_KEYBOARD
 
     await query.edit_message_text(
         text=
@@ -150,18 +94,7 @@ async def admin_generate_credentials_platform(
     query = update.callback_query
     await query.answer()
 
-    platforms = get_platforms()
-    keyboard = []
-    for platform in platforms:
-        keyboard.append([
-            InlineKeyboardButton(
-                f"{platform['emoji']} {platform['name']}",
-                callback_data=f"admin_cred_platform_{platform['name'].lower()}")
-        ])
-    keyboard.append(
-        [InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")])
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = messages.GENERATE_CREDENTIALS_PLATFORM_KEYBOARD
 
     await query.edit_message_text(
         text=
@@ -170,6 +103,7 @@ async def admin_generate_credentials_platform(
         parse_mode='HTML')
 
 
+@timed_handler
 async def handle_admin_callback(update: Update,
                                 context: ContextTypes.DEFAULT_TYPE):
     """Handle admin callback queries"""
@@ -197,10 +131,7 @@ async def handle_admin_callback(update: Update,
         context.user_data['cred_step'] = 'count'
         await query.answer()
 
-        keyboard = [[
-            InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")
-        ]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
 
         await query.edit_message_text(
             text=f"🎫 <b>Platform: {platform.capitalize()}</b>\n\n"
@@ -215,10 +146,7 @@ async def handle_admin_callback(update: Update,
         context.user_data['gen_step'] = 'count'
         await query.answer()
 
-        keyboard = [[
-            InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")
-        ]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
 
         await query.edit_message_text(
             text=f"🔢 <b>Platform: {platform.capitalize()}</b>\n\n"
@@ -265,20 +193,9 @@ async def handle_admin_callback(update: Update,
     elif data == "admin_revoke_key":
         context.user_data['revoke_step'] = 'platform'
         await query.answer()
-        platforms = get_platforms()
-        keyboard = []
-        for platform in platforms:
-            keyboard.append([
-                InlineKeyboardButton(
-                    f"{platform['emoji']} {platform['name']}",
-                    callback_data=f"admin_revoke_platform_{platform['name'].lower()}")
-            ])
-        keyboard.append(
-            [InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")])
-        reply_markup = InlineKeyboardMarkup(keyboard)
         await query.edit_message_text(
             text="❌ <b>Revoke Key</b>\n\nSelect the platform:",
-            reply_markup=reply_markup,
+            reply_markup=messages.REVOKE_PLATFORM_KEYBOARD,
             parse_mode='HTML')
 
     elif data.startswith("admin_revoke_platform_"):
@@ -435,17 +352,9 @@ async def show_bot_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
             platform = platform_data['name']
             emoji = platform_data['emoji']
 
-            cur.execute(f"SELECT COUNT(*) FROM {platform}_keys")
-            platform_total = cur.fetchone()[0]
-
-            cur.execute(f"SELECT COUNT(*) FROM {platform}_keys WHERE status = 'active'")
-            platform_active = cur.fetchone()[0]
-
-            cur.execute(f"SELECT COUNT(*) FROM {platform}_keys WHERE status = 'used'")
-            platform_used = cur.fetchone()[0]
-
-            cur.execute(f"SELECT COUNT(*) FROM {platform}_keys WHERE status = 'expired'")
-            platform_expired = cur.fetchone()[0]
+            query_registry.execute(cur, 'key_status_counts', platform=platform)
+            (platform_total, platform_active,
+             platform_used, platform_expired) = cur.fetchone()
 
             total_keys += platform_total
             active_keys += platform_active
@@ -462,7 +371,7 @@ async def show_bot_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
                 }
 
         # Get total users
-        cur.execute("SELECT COUNT(*) FROM users")
+        query_registry.execute(cur, 'total_users')
         total_users = cur.fetchone()[0]
 
         stats_text = ("📊 <b>Bot Statistics</b>\n\n"
@@ -479,10 +388,7 @@ async def show_bot_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         cur.close()
 
-    keyboard = [[
-        InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")
-    ]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
 
     await query.edit_message_text(text=stats_text,
                                   reply_markup=reply_markup,
@@ -494,18 +400,7 @@ async def list_all_keys(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
 
-    platforms = get_platforms()
-    keyboard = []
-    for platform in platforms:
-        keyboard.append([
-            InlineKeyboardButton(
-                f"{platform['emoji']} {platform['name']} Keys",
-                callback_data=f"admin_list_platform_{platform['name'].lower()}")
-        ])
-    keyboard.append(
-        [InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")])
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = messages.LIST_KEYS_PLATFORM_KEYBOARD
 
     await query.edit_message_text(
         text=
@@ -626,10 +521,7 @@ async def clear_expired_keys(update: Update,
             f"✅ Successfully removed {removed_count} expired keys!\n\n"
             f"📊 Remaining keys: {remaining_count}")
 
-    keyboard = [[
-        InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")
-    ]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
 
     await query.edit_message_text(text=text,
                                   reply_markup=reply_markup,
@@ -642,18 +534,7 @@ async def start_giveaway_platform(update: Update,
     query = update.callback_query
     await query.answer()
 
-    platforms = get_platforms()
-    keyboard = []
-    for platform in platforms:
-        keyboard.append([
-            InlineKeyboardButton(
-                f"{platform['emoji']} {platform['name']}",
-                callback_data=f"admin_giveaway_platform_{platform['name'].lower()}")
-        ])
-    keyboard.append(
-        [InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")])
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = messages.GIVEAWAY_PLATFORM_KEYBOARD
 
     await query.edit_message_text(
         text=
@@ -670,42 +551,7 @@ async def start_giveaway_duration(update: Update,
 
     platform = context.user_data.get('giveaway_platform', 'Unknown')
 
-    keyboard = [
-        [
-            InlineKeyboardButton("⏱️ 1 Minute",
-                                 callback_data="admin_giveaway_duration_1m")
-        ],
-        [
-            InlineKeyboardButton("⏱️ 5 Minutes",
-                                 callback_data="admin_giveaway_duration_5m")
-        ],
-        [
-            InlineKeyboardButton("⏱️ 30 Minutes",
-                                 callback_data="admin_giveaway_duration_30m")
-        ],
-        [
-            InlineKeyboardButton("⏱️ 1 Hour",
-                                 callback_data="admin_giveaway_duration_1h")
-        ],
-        [
-            InlineKeyboardButton("⏱️ 3 Hours",
-                                 callback_data="admin_giveaway_duration_3h")
-        ],
-        [
-            InlineKeyboardButton("⏱️ 6 Hours",
-                                 callback_data="admin_giveaway_duration_6h")
-        ],
-        [
-            InlineKeyboardButton("⏱️ 12 Hours",
-                                 callback_data="admin_giveaway_duration_12h")
-        ],
-        [
-            InlineKeyboardButton("⏱️ 24 Hours",
-                                 callback_data="admin_giveaway_duration_24h")
-        ],
-        [InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")]
-    ]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = messages.GIVEAWAY_DURATION_KEYBOARD
 
     await query.edit_message_text(
         text=
@@ -766,10 +612,7 @@ async def stop_giveaway(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         cur.close()
 
-    keyboard = [[
-        InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")
-    ]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
 
     await query.edit_message_text(text=text,
                                   reply_markup=reply_markup,
@@ -782,18 +625,7 @@ async def revoke_key_platform(update: Update,
     query = update.callback_query
     await query.answer()
 
-    platforms = get_platforms()
-    keyboard = []
-    for platform in platforms:
-        keyboard.append([
-            InlineKeyboardButton(
-                f"{platform['emoji']} {platform['name']}",
-                callback_data=f"admin_revoke_platform_{platform['name'].lower()}")
-        ])
-    keyboard.append(
-        [InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")])
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = messages.REVOKE_PLATFORM_KEYBOARD
 
     await query.edit_message_text(
         text="❌ <b>Revoke Keys</b>\n\nSelect the platform:",
@@ -873,10 +705,7 @@ async def revoke_key_execute(update: Update,
     text = (f"✅ <b>Keys Revoked</b>\n\n"
             f"Successfully revoked {count} {platform.capitalize()} key(s)!")
 
-    keyboard = [[
-        InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")
-    ]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
 
     await query.edit_message_text(text=text,
                                   reply_markup=reply_markup,
@@ -886,6 +715,7 @@ def get_project_root():
     """Get the project root directory (parent of bot folder)"""
     return os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+@timed_handler
 async def handle_admin_message(update: Update,
                                context: ContextTypes.DEFAULT_TYPE):
     """Handle admin text messages"""
@@ -901,10 +731,7 @@ async def handle_admin_message(update: Update,
             context.user_data['gen_count'] = count
             context.user_data['gen_step'] = 'uses'
 
-            keyboard = [[
-                InlineKeyboardButton("❌ Cancel", callback_data="admin_main")
-            ]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = messages.CANCEL_TO_ADMIN_MAIN_KEYBOARD
 
             await update.message.reply_text(
                 f"🎯 <b>Count: {count}</b>\n\n"
@@ -913,11 +740,7 @@ async def handle_admin_message(update: Update,
                 reply_markup=reply_markup,
                 parse_mode='HTML')
         except ValueError:
-            keyboard = [[
-                InlineKeyboardButton("🔙 Back to Main",
-                                     callback_data="admin_main")
-            ]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
             await update.message.reply_text("❌ Please send a valid number!",
                                             reply_markup=reply_markup,
                                             parse_mode='HTML')
@@ -928,10 +751,7 @@ async def handle_admin_message(update: Update,
             context.user_data['gen_uses'] = uses
             context.user_data['gen_step'] = 'account_text'
 
-            keyboard = [[
-                InlineKeyboardButton("❌ Cancel", callback_data="admin_main")
-            ]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = messages.CANCEL_TO_ADMIN_MAIN_KEYBOARD
 
             await update.message.reply_text(
                 f"✅ <b>Uses: {uses}</b>\n\n"
@@ -940,11 +760,7 @@ async def handle_admin_message(update: Update,
                 reply_markup=reply_markup,
                 parse_mode='HTML')
         except ValueError:
-            keyboard = [[
-                InlineKeyboardButton("🔙 Back to Main",
-                                     callback_data="admin_main")
-            ]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
             await update.message.reply_text("❌ Please send a valid number!",
                                             reply_markup=reply_markup,
                                             parse_mode='HTML')
@@ -958,8 +774,7 @@ async def handle_admin_message(update: Update,
         uses = context.user_data.get('gen_uses')
 
         if not platform or count is None or uses is None:
-            keyboard = [[InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
             await update.message.reply_text("❌ Error: Missing data. Please start over.", reply_markup=reply_markup, parse_mode='HTML')
             context.user_data.pop('gen_step', None)
             context.user_data.pop('gen_platform', None)
@@ -977,8 +792,7 @@ async def handle_admin_message(update: Update,
                 generated_keys.append(key_code)
         except Exception as e:
             logger.error(f"Error generating keys: {e}")
-            keyboard = [[InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
             await update.message.reply_text(f"❌ Error generating keys: {e}", reply_markup=reply_markup, parse_mode='HTML')
             context.user_data.pop('gen_step', None)
             context.user_data.pop('gen_platform', None)
@@ -995,10 +809,7 @@ async def handle_admin_message(update: Update,
         keys_text = "\n".join([f"<code>{k}</code>" for k in generated_keys])
 
         # Create keyboard for back button
-        keyboard = [[
-            InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")
-        ]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
 
         # Send platform image with keys
         project_root = get_project_root()
@@ -1084,11 +895,7 @@ async def handle_admin_message(update: Update,
             context.user_data.pop('giveaway_duration', None)
             context.user_data.pop('giveaway_platform', None)
 
-            keyboard = [[
-                InlineKeyboardButton("🔙 Back to Main",
-                                     callback_data="admin_main")
-            ]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
 
             await update.message.reply_text(
                 f"🎁 <b>Giveaway Started!</b>\n\n"
@@ -1100,11 +907,7 @@ async def handle_admin_message(update: Update,
                 reply_markup=reply_markup,
                 parse_mode='HTML')
         except ValueError:
-            keyboard = [[
-                InlineKeyboardButton("🔙 Back to Main",
-                                     callback_data="admin_main")
-            ]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
             await update.message.reply_text("❌ Please send a valid number!",
                                             reply_markup=reply_markup,
                                             parse_mode='HTML')
@@ -1128,11 +931,7 @@ async def handle_admin_message(update: Update,
             active_creds = [c for c in credentials if c['status'] == 'active']
 
             if not active_creds:
-                keyboard = [[
-                    InlineKeyboardButton("🔙 Back to Main",
-                                         callback_data="admin_main")
-                ]]
-                reply_markup = InlineKeyboardMarkup(keyboard)
+                reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
                 await update.message.reply_text(
                     f"❌ <b>No Active Credentials</b>\n\n"
                     f"There are no active credentials for {platform_title} in the database.\n\n"
@@ -1144,11 +943,7 @@ async def handle_admin_message(update: Update,
                 return
 
             if len(active_creds) < count:
-                keyboard = [[
-                    InlineKeyboardButton("🔙 Back to Main",
-                                         callback_data="admin_main")
-                ]]
-                reply_markup = InlineKeyboardMarkup(keyboard)
+                reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
                 await update.message.reply_text(
                     f"❌ <b>Insufficient Credentials</b>\n\n"
                     f"You requested {count} keys but only {len(active_creds)} active credentials are available.\n\n"
@@ -1169,11 +964,7 @@ async def handle_admin_message(update: Update,
                 add_key(key_code, platform_title, uses=1, account_text=account_text)
                 keys_generated.append(key_code)
 
-            keyboard = [[
-                InlineKeyboardButton("🔙 Back to Main",
-                                     callback_data="admin_main")
-            ]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
 
             keys_list = "\n".join([f"• <code>{k}</code>" for k in keys_generated])
 
@@ -1190,11 +981,7 @@ async def handle_admin_message(update: Update,
             context.user_data.pop('cred_platform', None)
 
         except ValueError:
-            keyboard = [[
-                InlineKeyboardButton("🔙 Back to Main",
-                                     callback_data="admin_main")
-            ]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
             await update.message.reply_text("❌ Please send a valid number!",
                                             reply_markup=reply_markup,
                                             parse_mode='HTML')
@@ -1218,11 +1005,7 @@ async def handle_admin_message(update: Update,
             available_creds = active_creds + claimed_creds + other_creds
 
             if count > len(available_creds):
-                keyboard = [[
-                    InlineKeyboardButton("🔙 Back to Main",
-                                         callback_data="admin_main")
-                ]]
-                reply_markup = InlineKeyboardMarkup(keyboard)
+                reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
                 await update.message.reply_text(
                     f"❌ <b>Not Enough Credentials</b>\n\n"
                     f"You requested {count} credentials but only {len(available_creds)} are available.\n\n"
@@ -1259,11 +1042,7 @@ async def handle_admin_message(update: Update,
             context.user_data.pop('cred_step', None)
             context.user_data.pop('cred_platform', None)
 
-            keyboard = [[
-                InlineKeyboardButton("🔙 Back to Main",
-                                     callback_data="admin_main")
-            ]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
 
             # Send platform image with credentials
             project_root = get_project_root()
@@ -1307,11 +1086,7 @@ async def handle_admin_message(update: Update,
                                                 reply_markup=reply_markup,
                                                 parse_mode='HTML')
         except ValueError:
-            keyboard = [[
-                InlineKeyboardButton("🔙 Back to Main",
-                                     callback_data="admin_main")
-            ]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
             await update.message.reply_text("❌ Please send a valid number!",
                                             reply_markup=reply_markup,
                                             parse_mode='HTML')
@@ -1346,10 +1121,7 @@ async def handle_admin_message(update: Update,
 
         context.user_data.pop('broadcast_step', None)
 
-        keyboard = [[
-            InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")
-        ]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
 
         await update.message.reply_text(
             f"📢 <b>Broadcast Complete</b>\n\n"
@@ -1369,11 +1141,7 @@ async def handle_admin_message(update: Update,
             try:
                 user_identifier = str(int(user_input))
             except ValueError:
-                keyboard = [[
-                    InlineKeyboardButton("🔙 Back to Main",
-                                         callback_data="admin_main")
-                ]]
-                reply_markup = InlineKeyboardMarkup(keyboard)
+                reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
                 await update.message.reply_text(
                     "❌ Invalid user ID or username!",
                     reply_markup=reply_markup,
@@ -1384,10 +1152,7 @@ async def handle_admin_message(update: Update,
             db_ban_user(user_identifier)
             context.user_data.pop('ban_step', None)
 
-            keyboard = [[
-                InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")
-            ]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
 
             await update.message.reply_text(
                 f"🚫 <b>User Banned</b>\n\n"
@@ -1395,10 +1160,7 @@ async def handle_admin_message(update: Update,
                 reply_markup=reply_markup,
                 parse_mode='HTML')
         else:
-            keyboard = [[
-                InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")
-            ]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
             await update.message.reply_text("❌ User is already banned!",
                                             reply_markup=reply_markup,
                                             parse_mode='HTML')
@@ -1414,11 +1176,7 @@ async def handle_admin_message(update: Update,
             try:
                 user_identifier = str(int(user_input))
             except ValueError:
-                keyboard = [[
-                    InlineKeyboardButton("🔙 Back to Main",
-                                         callback_data="admin_main")
-                ]]
-                reply_markup = InlineKeyboardMarkup(keyboard)
+                reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
                 await update.message.reply_text(
                     "❌ Invalid user ID or username!",
                     reply_markup=reply_markup,
@@ -1430,10 +1188,7 @@ async def handle_admin_message(update: Update,
             db_unban_user(user_identifier)
             context.user_data.pop('unban_step', None)
 
-            keyboard = [[
-                InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")
-            ]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
 
             await update.message.reply_text(
                 f"✅ <b>User Unbanned</b>\n\n"
@@ -1441,15 +1196,13 @@ async def handle_admin_message(update: Update,
                 reply_markup=reply_markup,
                 parse_mode='HTML')
         else:
-            keyboard = [[
-                InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")
-            ]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
+            reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
             await update.message.reply_text("❌ User is not banned!",
                                             reply_markup=reply_markup,
                                             parse_mode='HTML')
 
 
+@timed_handler
 async def check_and_process_giveaways(context: ContextTypes.DEFAULT_TYPE):
     """Background job to check for expired giveaways and select winners"""
     try:
@@ -1515,7 +1268,7 @@ async def check_and_process_giveaways(context: ContextTypes.DEFAULT_TYPE):
                     account_text = f"{platform} Giveaway Prize"
 
                     # Add key to database
-                    add_key(key_code, platform, 1, account_text, giveaway_generated=True, giveaway_winner=str(winner_id))
+                    add_key(key_code, platform, 1, account_text, giveaway_generated=True, giveaway_winner=winner_id)
 
                     logger.info(
                         f"Generated new key {key_code} for giveaway winner {winner_id}"
@@ -1596,17 +1349,14 @@ async def show_banned_users_list(update: Update, context: ContextTypes.DEFAULT_T
         cur.execute("""
             SELECT bu.user_identifier, u.username, u.user_id
             FROM banned_users bu
-            LEFT JOIN users u ON bu.user_identifier = u.user_id OR bu.user_identifier = CONCAT('@', u.username)
+            LEFT JOIN users u ON bu.user_identifier = u.user_id::text OR bu.user_identifier = CONCAT('@', u.username)
             ORDER BY bu.banned_at DESC
         """)
         banned_users = cur.fetchall()
         cur.close()
 
     if not banned_users:
-        keyboard = [[
-            InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")
-        ]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
+        reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
 
         await query.edit_message_text(
             text="✅ <b>No Banned Users</b>\n\n"
@@ -1625,7 +1375,7 @@ async def show_banned_users_list(update: Update, context: ContextTypes.DEFAULT_T
             if identifier.startswith('@'):
                 cur.execute("SELECT user_id, username FROM users WHERE username = %s", (identifier[1:],))
             else:
-                cur.execute("SELECT user_id, username FROM users WHERE user_id = %s", (identifier,))
+                cur.execute("SELECT user_id, username FROM users WHERE user_id = %s", (int(identifier),))
             user_info = cur.fetchone()
             cur.close()
 
@@ -1646,10 +1396,7 @@ async def show_banned_users_list(update: Update, context: ContextTypes.DEFAULT_T
     text += "Send their Chat ID or username\n"
     text += "Example: <code>123456789</code> or <code>@username</code>"
 
-    keyboard = [[
-        InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")
-    ]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = messages.BACK_TO_ADMIN_MAIN_KEYBOARD
 
     context.user_data['unban_step'] = 'user_id'
 
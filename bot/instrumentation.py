@@ -0,0 +1,65 @@
+"""
+Latency metrics for the Telegram bot.
+
+`timed_handler` wraps update handlers and jobs, and `InstrumentedRequest`
+times every outgoing Bot API call. Both record into the shared metrics
+registry, which the bot process exports for the /api/metrics scrape.
+"""
+import os
+import sys
+import time
+import functools
+
+from telegram.request import HTTPXRequest
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metrics import REGISTRY
+
+HANDLER_DURATION = REGISTRY.histogram(
+    'bot_handler_duration_seconds',
+    'Time spent in bot update handlers and jobs',
+    ['handler', 'outcome'])
+BOT_API_DURATION = REGISTRY.histogram(
+    'bot_api_request_duration_seconds',
+    'Time spent on outgoing Telegram Bot API calls',
+    ['method', 'outcome'])
+
+
+def timed_handler(func):
+    """Record how long an async handler takes and whether it raised"""
+    name = func.__name__
+
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        start = time.perf_counter()
+        outcome = 'ok'
+        try:
+            return await func(*args, **kwargs)
+        except Exception:
+            outcome = 'error'
+            raise
+        finally:
+            HANDLER_DURATION.observe(time.perf_counter() - start,
+                                     handler=name, outcome=outcome)
+
+    return wrapper
+
+
+class InstrumentedRequest(HTTPXRequest):
+    """HTTPX request backend that times each Bot API method call"""
+
+    async def do_request(self, url, method, request_data=None, **kwargs):
+        api_method = url.rsplit('/', 1)[-1]
+        start = time.perf_counter()
+        outcome = 'ok'
+        try:
+            code, payload = await super().do_request(url, method, request_data, **kwargs)
+            if code >= 400:
+                outcome = str(code)
+            return code, payload
+        except Exception:
+            outcome = 'error'
+            raise
+        finally:
+            BOT_API_DURATION.observe(time.perf_counter() - start,
+                                     method=api_method, outcome=outcome)
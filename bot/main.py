@@ -10,9 +10,18 @@ from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQu
 
 # Import admin and user modules
 from admin import (admin_start, handle_admin_callback, handle_admin_message,
-                   is_admin, ensure_data_files, check_and_process_giveaways)
+                   is_admin, ensure_data_files, check_and_process_giveaways,
+                   ADMIN_IDS)
 from users import (user_start, handle_user_callback, handle_user_message,
                    redeem_command, participate_command)
+from instrumentation import InstrumentedRequest
+import metrics
+import key_filter
+import notifications
+import rate_limit
+import user_registry
+import resource_versions
+from redemption_ledger import partition_maintenance_job
 
 # Bot token - load from environment variable or use the provided token
 import os
@@ -78,8 +87,20 @@ def main() -> None:
     # Ensure data files exist
     ensure_data_files()
 
-    # Create the Application
-    application = Application.builder().token(BOT_TOKEN).build()
+    # Create the Application (Bot API calls are timed for /api/metrics;
+    # buffered admin digests are sent before the bot stops)
+    application = Application.builder().token(BOT_TOKEN).request(
+        InstrumentedRequest()).post_stop(notifications.flush_pending).build()
+    metrics.start_exporter()
+    # Redeemable key codes are loaded into memory in the background
+    key_filter.FILTER.start()
+    # New and changed users are written in batches
+    user_registry.USERS.start()
+    # Version bumps of the admin panel's ETags are folded into counters
+    resource_versions.start_compactor()
+
+    # Floods are dropped per user before any handler runs
+    rate_limit.install(application, ADMIN_IDS)
 
     # Add command handlers
     application.add_handler(CommandHandler("start", start_command))
@@ -100,6 +121,8 @@ def main() -> None:
     job_queue = application.job_queue
     job_queue.run_repeating(check_and_process_giveaways, interval=30, first=10)
     logger.info("✅ Giveaway checker job scheduled (runs every 30 seconds)")
+    # Keep upcoming monthly key_redemptions partitions created
+    job_queue.run_repeating(partition_maintenance_job, interval=86400, first=60)
 
     # Start the bot
     logger.info("🎮 Premium Vault Bot is starting...")
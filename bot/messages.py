@@ -0,0 +1,229 @@
+"""
+Prebuilt bot message templates and keyboards.
+
+Static keyboards and message skeletons are built once at import time;
+InlineKeyboardMarkup objects are immutable, so the same instance is safe
+to send with every update. Render functions only fill in per-user fields.
+"""
+import os
+import sys
+
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from db_helpers import get_platforms
+
+# ==================== SHARED ====================
+
+BACK_TO_USER_MAIN_KEYBOARD = InlineKeyboardMarkup([[
+    InlineKeyboardButton("🔙 Back to Main", callback_data="user_main")
+]])
+
+BACK_TO_ADMIN_MAIN_KEYBOARD = InlineKeyboardMarkup([[
+    InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")
+]])
+
+CANCEL_TO_ADMIN_MAIN_KEYBOARD = InlineKeyboardMarkup([[
+    InlineKeyboardButton("❌ Cancel", callback_data="admin_main")
+]])
+
+BANNED_TEXT = ("🚫 <b>Access Denied</b>\n\n"
+               "❌ You have been banned from using this bot.")
+
+ACCESS_RESTRICTED_TEXT = ("⚠️ <b>Access Restricted</b>\n\n"
+                          "❌ You must join all required channels first!\n\n"
+                          "Use /start to see the channels and join them.")
+
+# ==================== USER ====================
+
+CHANNEL_JOIN_KEYBOARD = InlineKeyboardMarkup([
+    [
+        InlineKeyboardButton("🔗 Join Channel Portal",
+                             url="https://t.me/accountvaultportal")
+    ],
+    [
+        InlineKeyboardButton("🔗 Join Channel Main",
+                             url="https://t.me/+GaP9QSmVo4EyYzM0")
+    ],
+    [
+        InlineKeyboardButton("🔗 Join Channel Backup",
+                             url="https://t.me/+gdJVaBNwwyg5MDc0")
+    ],
+    [
+        InlineKeyboardButton("🔗 Join Channel Config",
+                             url="https://t.me/+gxVbPeU842ZkNmU0")
+    ],
+    [
+        InlineKeyboardButton("🔗 Join Channel",
+                             url="https://t.me/QuantXBox")
+    ],
+    [
+        InlineKeyboardButton("✅ I have joined all, continue",
+                             callback_data="user_verify_channels")
+    ]
+])
+
+WELCOME_TEXT = (
+    "🚀 <b>Welcome to Premium Vault!</b>\n\n"
+    "🎁 To access premium accounts, please join all our channels below.\n\n"
+    "✨ It only takes a moment - then enjoy unlimited access!")
+
+_MAIN_MENU_ROWS = [
+    [InlineKeyboardButton("🎁 Redeem Key", callback_data="user_redeem_key")],
+    [InlineKeyboardButton("📊 My Stats", callback_data="user_my_stats")],
+    [
+        InlineKeyboardButton("📢 Channel Portal",
+                             url="https://t.me/accountvaultportal"),
+        InlineKeyboardButton("📢 Channel Main",
+                             url="https://t.me/+GaP9QSmVo4EyYzM0")
+    ],
+    [
+        InlineKeyboardButton("📢 Channel Backup",
+                             url="https://t.me/+gdJVaBNwwyg5MDc0"),
+        InlineKeyboardButton("📢 Channel Config",
+                             url="https://t.me/+gxVbPeU842ZkNmU0")
+    ],
+    [InlineKeyboardButton("📢 Join Channel", url="https://t.me/QuantXBox")],
+    [InlineKeyboardButton("❓ Help", callback_data="user_help")],
+    [InlineKeyboardButton("👨‍💻 Developer", callback_data="user_developer")]
+]
+
+MAIN_MENU_KEYBOARD = InlineKeyboardMarkup(_MAIN_MENU_ROWS)
+
+# Same menu with the giveaway button below "Redeem Key"
+MAIN_MENU_GIVEAWAY_KEYBOARD = InlineKeyboardMarkup(
+    _MAIN_MENU_ROWS[:1] +
+    [[InlineKeyboardButton("🎁 Join Giveaway", callback_data="user_join_giveaway")]] +
+    _MAIN_MENU_ROWS[1:])
+
+_MAIN_MENU_TEXT_HEAD = "🎮 <b>Premium Vault - Main Menu</b> 🎮\n\n👤 <b>User:</b> "
+_MAIN_MENU_TEXT_TAIL = ("\n\n"
+                        "✨ <b>What would you like to do?</b>\n\n"
+                        "🔑 Redeem premium account keys\n"
+                        "📊 Check your statistics\n"
+                        "🎁 Participate in giveaways\n"
+                        "❓ Get help and support\n\n"
+                        "👇 Select an option below:")
+
+HELP_TEXT = ("❓ <b>Help & Information</b>\n\n"
+             "🎮 <b>How to use this bot:</b>\n\n"
+             "1️⃣ <b>Join All Channels</b>\n"
+             "   Make sure you're a member of all required channels\n\n"
+             "2️⃣ <b>Redeem Keys</b>\n"
+             "   Use the 'Redeem Key' button to enter your key code\n"
+             "   Format: PLATFORM-XXXX-XXXX-XXXX-XXXX\n\n"
+             "3️⃣ <b>Get Premium Accounts</b>\n"
+             "   Valid keys will give you premium account credentials\n\n"
+             "4️⃣ <b>Join Giveaways</b>\n"
+             "   Participate in giveaways for free keys!\n\n"
+             "💡 <b>Need more help?</b>\n"
+             "Contact our support team in the channels!\n\n"
+             "🎁 <b>Available Platforms:</b>\n"
+             "🎬 Netflix\n"
+             "🍜 Crunchyroll\n"
+             "🎵 Spotify\n"
+             "🤼 WWE\n"
+             "... and more!")
+
+REDEEM_PROMPT_TEXT = ("🎁 <b>Redeem Key</b>\n\n"
+                      "🔑 Please send your redemption key in the format:\n"
+                      "<code>PLATFORM-XXXX-XXXX-XXXX-XXXX</code>\n\n"
+                      "📝 Example: <code>NETFLIX-A2D8-FA2F-VV82-7K30</code>")
+
+REDEEM_USAGE_TEXT = ("🎁 <b>Redeem Key</b>\n\n"
+                     "🔑 Please use the command with your key:\n"
+                     "<code>/redeem PLATFORM-XXXX-XXXX-XXXX-XXXX</code>\n\n"
+                     "📝 Example: <code>/redeem NETFLIX-A2D8-FA2F-VV82-7K30</code>")
+
+INVALID_KEY_TEXT = ("❌ <b>Invalid Key</b>\n\n"
+                    "The key you entered is not valid.\n\n"
+                    "Please check and try again!")
+
+KEY_UNAVAILABLE_TEXT = ("❌ <b>Invalid Key</b>\n\n"
+                        "The key you entered is not valid or has already been used.\n\n"
+                        "Please check and try again!")
+
+_REDEEM_SUCCESS_TEMPLATE = (
+    "🎉 <b>Key Redeemed Successfully!</b> 🎉\n\n"
+    "🎁 <b>Platform:</b> {platform}\n"
+    "✨ <b>Account Type:</b> {account_text}\n\n"
+    "📧 <b>Email:</b> <code>{email}</code>\n"
+    "🔑 <b>Password:</b> <code>{password}</code>\n\n"
+    "💡 <i>Tap to copy the credentials!</i>\n\n"
+    "⚠️ <b>Important:</b>\n"
+    "• Don't share these credentials\n"
+    "• Change the password if needed\n"
+    "• Enjoy your {platform} account!\n\n"
+    "🎮 Thank you for using Premium Vault Bot!")
+
+
+def render_main_menu(user_mention_html, has_active_giveaway):
+    """Get the main menu text and keyboard for a user"""
+    keyboard = MAIN_MENU_GIVEAWAY_KEYBOARD if has_active_giveaway else MAIN_MENU_KEYBOARD
+    return _MAIN_MENU_TEXT_HEAD + user_mention_html + _MAIN_MENU_TEXT_TAIL, keyboard
+
+
+def render_redeem_success(platform, account_text, email, password):
+    """Get the redemption success text"""
+    return _REDEEM_SUCCESS_TEMPLATE.format(platform=platform,
+                                           account_text=account_text,
+                                           email=email,
+                                           password=password)
+
+
+# ==================== ADMIN ====================
+
+ADMIN_MAIN_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton("🔑 Generate Keys", callback_data="admin_generate_keys")],
+    [
+        InlineKeyboardButton("🎫 Generate Credentials",
+                             callback_data="admin_generate_credentials")
+    ],
+    [InlineKeyboardButton("📊 Bot Stats", callback_data="admin_bot_stats")],
+    [InlineKeyboardButton("📋 List All Keys", callback_data="admin_list_keys")],
+    [InlineKeyboardButton("🗑️ Clear Expired Keys", callback_data="admin_clear_expired")],
+    [InlineKeyboardButton("🎁 Start Giveaway", callback_data="admin_start_giveaway")],
+    [InlineKeyboardButton("🛑 Stop Giveaway", callback_data="admin_stop_giveaway")],
+    [InlineKeyboardButton("❌ Revoke Key", callback_data="admin_revoke_key")],
+    [InlineKeyboardButton("📢 Broadcast", callback_data="admin_broadcast")],
+    [InlineKeyboardButton("🚫 Ban User", callback_data="admin_ban_user")],
+    [InlineKeyboardButton("✅ Unban User", callback_data="admin_unban_user")],
+])
+
+ADMIN_WELCOME_TEXT = ("🎮 <b>Admin Panel - Premium Vault Bot</b> 🎮\n\n"
+                      "👋 Welcome back, Admin!\n\n"
+                      "🔧 <b>What would you like to do?</b>\n\n"
+                      "Select an option from the menu below:")
+
+
+def _build_platform_keyboard(callback_prefix, label_suffix=''):
+    """Build a one-platform-per-row selection keyboard with a back button"""
+    keyboard = [[
+        InlineKeyboardButton(
+            f"{platform['emoji']} {platform['name']}{label_suffix}",
+            callback_data=f"{callback_prefix}{platform['name'].lower()}")
+    ] for platform in get_platforms()]
+    keyboard.append(
+        [InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")])
+    return InlineKeyboardMarkup(keyboard)
+
+
+GENERATE_KEYS_PLATFORM_KEYBOARD = _build_platform_keyboard("admin_gen_platform_")
+GENERATE_CREDENTIALS_PLATFORM_KEYBOARD = _build_platform_keyboard("admin_cred_platform_")
+LIST_KEYS_PLATFORM_KEYBOARD = _build_platform_keyboard("admin_list_platform_", " Keys")
+GIVEAWAY_PLATFORM_KEYBOARD = _build_platform_keyboard("admin_giveaway_platform_")
+REVOKE_PLATFORM_KEYBOARD = _build_platform_keyboard("admin_revoke_platform_")
+
+GIVEAWAY_DURATION_KEYBOARD = InlineKeyboardMarkup([
+    [InlineKeyboardButton(label, callback_data=f"admin_giveaway_duration_{duration}")]
+    for label, duration in [
+        ("⏱️ 1 Minute", "1m"),
+        ("⏱️ 5 Minutes", "5m"),
+        ("⏱️ 30 Minutes", "30m"),
+        ("⏱️ 1 Hour", "1h"),
+        ("⏱️ 3 Hours", "3h"),
+        ("⏱️ 6 Hours", "6h"),
+        ("⏱️ 12 Hours", "12h"),
+        ("⏱️ 24 Hours", "24h"),
+    ]
+] + [[InlineKeyboardButton("🔙 Back to Main", callback_data="admin_main")]])
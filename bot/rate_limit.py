@@ -0,0 +1,120 @@
+"""
+Per-user rate limiting for the Telegram bot.
+
+A TypeHandler in group -1 runs before every registered handler and spends a
+token from the sender's bucket; when the bucket is empty the update is
+dropped with ApplicationHandlerStop, without a reply, database query or
+Bot API call. Updates that start expensive work (/start, /redeem,
+/participate, the channel verification button and a key sent after "Redeem
+Key", which check channel membership and query the database) also spend
+from a second, slower bucket.
+
+Buckets live in a bounded LRU (BOT_RATE_LIMIT_MAX_USERS users, each a
+two-item list of tokens and last refill time); the least recently seen user
+is evicted first, and comes back with a full bucket. Dropped updates are
+counted in `bot_updates_dropped_total{limit}`.
+"""
+import os
+import sys
+import time
+import logging
+from collections import OrderedDict
+
+from telegram import Update
+from telegram.ext import ApplicationHandlerStop, TypeHandler
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+RATE = float(os.getenv('BOT_RATE_LIMIT_PER_SECOND', '2'))
+BURST = float(os.getenv('BOT_RATE_LIMIT_BURST', '10'))
+EXPENSIVE_RATE = float(os.getenv('BOT_EXPENSIVE_LIMIT_PER_SECOND', '0.2'))
+EXPENSIVE_BURST = float(os.getenv('BOT_EXPENSIVE_LIMIT_BURST', '3'))
+MAX_USERS = int(os.getenv('BOT_RATE_LIMIT_MAX_USERS', '50000'))
+
+EXPENSIVE_COMMANDS = frozenset({'start', 'redeem', 'participate'})
+EXPENSIVE_CALLBACKS = frozenset({'user_verify_channels'})
+
+UPDATES_DROPPED = REGISTRY.counter(
+    'bot_updates_dropped_total',
+    'Updates dropped by the per-user rate limiter before any handler ran, by limit',
+    ['limit'])
+
+
+class TokenBuckets:
+    """Token bucket per user, kept for the most recently seen users only"""
+
+    def __init__(self, rate, burst, max_users=MAX_USERS):
+        self.rate = rate
+        self.burst = burst
+        self.max_users = max_users
+        self._buckets = OrderedDict()
+
+    def allow(self, user_id, now=None):
+        """Spend one of the user's tokens; returns False if there is none"""
+        if now is None:
+            now = time.monotonic()
+        buckets = self._buckets
+        bucket = buckets.get(user_id)
+        if bucket is None:
+            if len(buckets) >= self.max_users:
+                buckets.popitem(last=False)
+            bucket = buckets[user_id] = [self.burst, now]
+        else:
+            buckets.move_to_end(user_id)
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        if bucket[0] < 1:
+            return False
+        bucket[0] -= 1
+        return True
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+def is_expensive(update, context):
+    """Check whether an update starts channel checks or database work"""
+    message = update.message
+    if message and message.text:
+        text = message.text
+        if text.startswith('/'):
+            command = (text[1:].split(maxsplit=1) or [''])[0]
+            return command.split('@', 1)[0].lower() in EXPENSIVE_COMMANDS
+        # A key sent after pressing "Redeem Key"
+        return bool(context.user_data) and context.user_data.get('redeem_step') == 'key'
+    query = update.callback_query
+    return bool(query and query.data in EXPENSIVE_CALLBACKS)
+
+
+class RateLimiter:
+    """Drops a user's updates once they exceed the general or expensive limit"""
+
+    def __init__(self, exempt_ids=()):
+        self.exempt_ids = frozenset(exempt_ids)
+        self.general = TokenBuckets(RATE, BURST)
+        self.expensive = TokenBuckets(EXPENSIVE_RATE, EXPENSIVE_BURST)
+
+    async def check(self, update, context):
+        user = update.effective_user
+        if not user or user.id in self.exempt_ids:
+            return
+        now = time.monotonic()
+        if not self.general.allow(user.id, now):
+            limit = 'general'
+        elif is_expensive(update, context) and not self.expensive.allow(user.id, now):
+            limit = 'expensive'
+        else:
+            return
+        UPDATES_DROPPED.inc(limit=limit)
+        logger.debug(f"Dropped update {update.update_id} from {user.id} ({limit} limit)")
+        raise ApplicationHandlerStop
+
+
+def install(application, exempt_ids=()):
+    """Register the rate limiter ahead of every handler group of an Application"""
+    limiter = RateLimiter(exempt_ids)
+    application.add_handler(TypeHandler(Update, limiter.check), group=-1)
+    return limiter
@@ -8,11 +8,18 @@ import logging
 
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from db_helpers import (get_platforms, get_platform_by_name, get_key_by_code,
-                        redeem_key as db_redeem_key, get_or_create_user,
+                        redeem_key as db_redeem_key,
                         get_user_stats, is_user_banned as db_is_user_banned,
                         get_active_credential, claim_credential,
                         get_db_connection, notify_admins_key_redeemed,
-                        notify_admins_credential_claimed)
+                        notify_admins_credential_claimed,
+                        get_last_redemption_time, has_user_redeemed_key)
+from instrumentation import timed_handler
+from key_codes import validate as validate_key_code
+from key_filter import might_contain as key_may_be_redeemable
+from user_registry import record_user
+from metrics import REGISTRY
+import messages
 
 # ==================== CONFIGURATION ====================
 # Set to True to enable 10-minute cooldown between key redemptions
@@ -23,6 +30,11 @@ REDEMPTION_COOLDOWN_ENABLED = True
 # Setup logging
 logger = logging.getLogger(__name__)
 
+KEYS_REJECTED = REGISTRY.counter(
+    'bot_keys_rejected_total',
+    'Redeem attempts rejected by key code validation before any database lookup',
+    ['reason'])
+
 
 def get_project_root():
     """Get the project root directory (parent of bot folder)"""
@@ -47,7 +59,7 @@ def ensure_data_files():
 
 def is_banned(user_id, username):
     """Check if user is banned"""
-    return db_is_user_banned(str(user_id), username)
+    return db_is_user_banned(user_id, username)
 
 
 async def check_channel_membership(update: Update,
@@ -70,6 +82,7 @@ async def check_channel_membership(update: Update,
     return all_joined
 
 
+@timed_handler
 async def user_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show user welcome message"""
     user_id = update.effective_user.id
@@ -78,14 +91,11 @@ async def user_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # Check if user is banned
     if is_banned(user_id, username):
-        await update.message.reply_text(
-            "🚫 <b>Access Denied</b>\n\n"
-            "❌ You have been banned from using this bot.",
-            parse_mode='HTML')
+        await update.message.reply_text(messages.BANNED_TEXT, parse_mode='HTML')
         return
 
-    # Register user
-    get_or_create_user(str(user_id), username)
+    # Register user (written in the registry's next batch)
+    record_user(user_id, username)
 
     # Import is_admin from admin module
     from admin import is_admin
@@ -99,42 +109,8 @@ async def user_start(update: Update, context: ContextTypes.DEFAULT_TYPE):
     has_joined = await check_channel_membership(update, context)
 
     if not has_joined:
-        channel_buttons = [
-            [
-                InlineKeyboardButton("🔗 Join Channel Portal",
-                                     url="https://t.me/accountvaultportal")
-            ],
-            [
-                InlineKeyboardButton("🔗 Join Channel Main",
-                                     url="https://t.me/+GaP9QSmVo4EyYzM0")
-            ],
-            [
-                InlineKeyboardButton("🔗 Join Channel Backup",
-                                     url="https://t.me/+gdJVaBNwwyg5MDc0")
-            ],
-            [
-                InlineKeyboardButton("🔗 Join Channel Config",
-                                     url="https://t.me/+gxVbPeU842ZkNmU0")
-            ],
-            [
-                InlineKeyboardButton("🔗 Join Channel",
-                                     url="https://t.me/QuantXBox")
-            ],
-            [
-                InlineKeyboardButton("✅ I have joined all, continue",
-                                     callback_data="user_verify_channels")
-            ]
-        ]
-
-        reply_markup = InlineKeyboardMarkup(channel_buttons)
-
-        welcome_text = (
-            "🚀 <b>Welcome to Premium Vault!</b>\n\n"
-            "🎁 To access premium accounts, please join all our channels below.\n\n"
-            "✨ It only takes a moment - then enjoy unlimited access!")
-
-        await update.message.reply_text(text=welcome_text,
-                                        reply_markup=reply_markup,
+        await update.message.reply_text(text=messages.WELCOME_TEXT,
+                                        reply_markup=messages.CHANNEL_JOIN_KEYBOARD,
                                         parse_mode='HTML')
     else:
         await show_main_menu(update, context)
@@ -144,32 +120,6 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Show main menu to user"""
     user = update.effective_user
 
-    keyboard = [[
-        InlineKeyboardButton("🎁 Redeem Key", callback_data="user_redeem_key")
-    ], [InlineKeyboardButton("📊 My Stats", callback_data="user_my_stats")],
-                [
-                    InlineKeyboardButton(
-                        "📢 Channel Portal",
-                        url="https://t.me/accountvaultportal"),
-                    InlineKeyboardButton("📢 Channel Main",
-                                         url="https://t.me/+GaP9QSmVo4EyYzM0")
-                ],
-                [
-                    InlineKeyboardButton("📢 Channel Backup",
-                                         url="https://t.me/+gdJVaBNwwyg5MDc0"),
-                    InlineKeyboardButton("📢 Channel Config",
-                                         url="https://t.me/+gxVbPeU842ZkNmU0")
-                ],
-                [
-                    InlineKeyboardButton("📢 Join Channel",
-                                         url="https://t.me/QuantXBox")
-                ],
-                [InlineKeyboardButton("❓ Help", callback_data="user_help")],
-                [
-                    InlineKeyboardButton("👨‍💻 Developer",
-                                         callback_data="user_developer")
-                ]]
-
     # Check if there's an active giveaway
     with get_db_connection() as conn:
         cur = conn.cursor()
@@ -177,22 +127,8 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
         has_active_giveaway = cur.fetchone()[0] > 0
         cur.close()
 
-    if has_active_giveaway:
-        keyboard.insert(1, [
-            InlineKeyboardButton("🎁 Join Giveaway",
-                                 callback_data="user_join_giveaway")
-        ])
-
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    main_text = ("🎮 <b>Premium Vault - Main Menu</b> 🎮\n\n"
-                 f"👤 <b>User:</b> {user.mention_html()}\n\n"
-                 "✨ <b>What would you like to do?</b>\n\n"
-                 "🔑 Redeem premium account keys\n"
-                 "📊 Check your statistics\n"
-                 "🎁 Participate in giveaways\n"
-                 "❓ Get help and support\n\n"
-                 "👇 Select an option below:")
+    main_text, reply_markup = messages.render_main_menu(user.mention_html(),
+                                                        has_active_giveaway)
 
     if update.callback_query:
         await update.callback_query.edit_message_text(
@@ -203,6 +139,7 @@ async def show_main_menu(update: Update, context: ContextTypes.DEFAULT_TYPE):
                                         parse_mode='HTML')
 
 
+@timed_handler
 async def handle_user_callback(update: Update,
                                context: ContextTypes.DEFAULT_TYPE):
     """Handle user callback queries"""
@@ -218,6 +155,8 @@ async def handle_user_callback(update: Update,
         await query.answer("🚫 You have been banned!", show_alert=True)
         return
 
+    record_user(user_id, username)
+
     data = query.data
 
     if data == "user_verify_channels":
@@ -230,17 +169,9 @@ async def handle_user_callback(update: Update,
         await query.answer()
         context.user_data['redeem_step'] = 'key'
 
-        keyboard = [[
-            InlineKeyboardButton("🔙 Back to Main", callback_data="user_main")
-        ]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-
         await query.edit_message_text(
-            text="🎁 <b>Redeem Key</b>\n\n"
-            "🔑 Please send your redemption key in the format:\n"
-            "<code>PLATFORM-XXXX-XXXX-XXXX</code>\n\n"
-            "📝 Example: <code>NETFLIX-A2D8-FA2F-VV82</code>",
-            reply_markup=reply_markup,
+            text=messages.REDEEM_PROMPT_TEXT,
+            reply_markup=messages.BACK_TO_USER_MAIN_KEYBOARD,
             parse_mode='HTML')
 
     elif data == "user_my_stats":
@@ -275,40 +206,44 @@ async def show_user_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
 
-    user_id = str(update.effective_user.id)
+    user_id = update.effective_user.id
     user_data = get_user_stats(user_id)
 
     if not user_data:
         stats_text = "📊 <b>Your Statistics</b>\n\n❌ No data found!"
     else:
-        redeemed_keys = user_data.get('redeemed_keys', [])
+        total = user_data['total_redeemed']
+        joined_at = (user_data['joined_at'] or 'Unknown')[:10]
 
         stats_text = (
             "📊 <b>Your Statistics</b>\n\n"
-            f"🎯 <b>Total Keys Redeemed:</b> {len(redeemed_keys)}\n"
-            f"📅 <b>Member Since:</b> {user_data.get('joined_at', 'Unknown')[:10]}\n\n"
+            f"🎯 <b>Total Keys Redeemed:</b> {total}\n"
+            f"📅 <b>Member Since:</b> {joined_at}\n\n"
         )
 
-        if redeemed_keys:
-            stats_text += "🔑 <b>Redeemed Keys:</b>\n"
-            for key_info in redeemed_keys[-5:]:  # Show last 5 redeemed keys
-                platform = key_info.get('platform', 'Unknown')
-                redeemed_at = key_info.get('redeemed_at', 'Unknown')[:10]
-                stats_text += f"• {platform} - {redeemed_at}\n"
-
-            if len(redeemed_keys) > 5:
-                stats_text += f"\n... and {len(redeemed_keys) - 5} more"
+        if total:
+            platform_counts = sorted(user_data['platform_counts'].items(),
+                                     key=lambda item: item[1], reverse=True)
+            stats_text += "🎮 <b>By Platform:</b>\n"
+            for platform, count in platform_counts:
+                stats_text += f"• {platform} - {count}\n"
+            stats_text += (f"\n🕒 <b>First Redemption:</b> {user_data['first_redeemed_at'][:10]}\n"
+                           f"🕒 <b>Last Redemption:</b> {user_data['last_redeemed_at'][:10]}\n\n")
+
+            # The 5 most recent redemptions
+            stats_text += "🔑 <b>Recent Keys:</b>\n"
+            for key_info in user_data['redeemed_keys']:
+                redeemed_at = (key_info['redeemed_at'] or 'Unknown')[:10]
+                stats_text += f"• {key_info['platform']} - {redeemed_at}\n"
+
+            if total > len(user_data['redeemed_keys']):
+                stats_text += f"\n... and {total - len(user_data['redeemed_keys'])} more"
         else:
             stats_text += "❌ <i>You haven't redeemed any keys yet!</i>\n\n"
             stats_text += "💡 Use /redeem to redeem your first key!"
 
-    keyboard = [[
-        InlineKeyboardButton("🔙 Back to Main", callback_data="user_main")
-    ]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
     await query.edit_message_text(text=stats_text,
-                                  reply_markup=reply_markup,
+                                  reply_markup=messages.BACK_TO_USER_MAIN_KEYBOARD,
                                   parse_mode='HTML')
 
 
@@ -317,33 +252,8 @@ async def show_help(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
 
-    help_text = ("❓ <b>Help & Information</b>\n\n"
-                 "🎮 <b>How to use this bot:</b>\n\n"
-                 "1️⃣ <b>Join All Channels</b>\n"
-                 "   Make sure you're a member of all required channels\n\n"
-                 "2️⃣ <b>Redeem Keys</b>\n"
-                 "   Use the 'Redeem Key' button to enter your key code\n"
-                 "   Format: PLATFORM-XXXX-XXXX-XXXX\n\n"
-                 "3️⃣ <b>Get Premium Accounts</b>\n"
-                 "   Valid keys will give you premium account credentials\n\n"
-                 "4️⃣ <b>Join Giveaways</b>\n"
-                 "   Participate in giveaways for free keys!\n\n"
-                 "💡 <b>Need more help?</b>\n"
-                 "Contact our support team in the channels!\n\n"
-                 "🎁 <b>Available Platforms:</b>\n"
-                 "🎬 Netflix\n"
-                 "🍜 Crunchyroll\n"
-                 "🎵 Spotify\n"
-                 "🤼 WWE\n"
-                 "... and more!")
-
-    keyboard = [[
-        InlineKeyboardButton("🔙 Back to Main", callback_data="user_main")
-    ]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
-    await query.edit_message_text(text=help_text,
-                                  reply_markup=reply_markup,
+    await query.edit_message_text(text=messages.HELP_TEXT,
+                                  reply_markup=messages.BACK_TO_USER_MAIN_KEYBOARD,
                                   parse_mode='HTML')
 
 
@@ -352,7 +262,7 @@ async def join_giveaway(update: Update, context: ContextTypes.DEFAULT_TYPE):
     query = update.callback_query
     await query.answer()
 
-    user_id = str(update.effective_user.id)
+    user_id = update.effective_user.id
 
     with get_db_connection() as conn:
         cur = conn.cursor()
@@ -397,10 +307,7 @@ async def join_giveaway(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
         cur.close()
 
-    keyboard = [[
-        InlineKeyboardButton("🔙 Back to Main", callback_data="user_main")
-    ]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = messages.BACK_TO_USER_MAIN_KEYBOARD
 
     await query.edit_message_text(
         text=f"🎁 <b>Giveaway Entry Confirmed!</b>\n\n"
@@ -412,6 +319,7 @@ async def join_giveaway(update: Update, context: ContextTypes.DEFAULT_TYPE):
         parse_mode='HTML')
 
 
+@timed_handler
 async def handle_user_message(update: Update,
                               context: ContextTypes.DEFAULT_TYPE):
     """Handle user text messages"""
@@ -423,12 +331,11 @@ async def handle_user_message(update: Update,
 
     # Check if user is banned
     if is_banned(user_id, username):
-        await update.message.reply_text(
-            "🚫 <b>Access Denied</b>\n\n"
-            "❌ You have been banned from using this bot.",
-            parse_mode='HTML')
+        await update.message.reply_text(messages.BANNED_TEXT, parse_mode='HTML')
         return
 
+    record_user(user_id, username)
+
     # Import is_admin from admin module
     from admin import is_admin
 
@@ -437,11 +344,8 @@ async def handle_user_message(update: Update,
         # Check channel membership for regular users
         has_joined = await check_channel_membership(update, context)
         if not has_joined:
-            await update.message.reply_text(
-                "⚠️ <b>Access Restricted</b>\n\n"
-                "❌ You must join all required channels first!\n\n"
-                "Use /start to see the channels and join them.",
-                parse_mode='HTML')
+            await update.message.reply_text(messages.ACCESS_RESTRICTED_TEXT,
+                                            parse_mode='HTML')
             return
 
     # Handle key redemption
@@ -453,62 +357,60 @@ async def handle_user_message(update: Update,
 async def redeem_key(update: Update, context: ContextTypes.DEFAULT_TYPE,
                      key_code):
     """Redeem a key"""
-    user_id = str(update.effective_user.id)
+    user_id = update.effective_user.id
     key_code = key_code.strip().upper()
     user = update.effective_user
     username_str = user.username if user.username else "N/A"
     full_name = user.full_name if user.full_name else "N/A"
 
-    keyboard = [[
-        InlineKeyboardButton("🔙 Back to Main", callback_data="user_main")
-    ]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    reply_markup = messages.BACK_TO_USER_MAIN_KEYBOARD
+
+    # Typos and guesses fail the format or check character; no lookup needed
+    rejected = validate_key_code(key_code)
+    if rejected:
+        KEYS_REJECTED.inc(reason=rejected)
+        await update.message.reply_text(messages.INVALID_KEY_TEXT,
+                                        reply_markup=reply_markup,
+                                        parse_mode='HTML')
+        return
+
+    # Unknown and used-up codes are ruled out in memory, before any query
+    if not key_may_be_redeemable(key_code):
+        await update.message.reply_text(messages.KEY_UNAVAILABLE_TEXT,
+                                        reply_markup=reply_markup,
+                                        parse_mode='HTML')
+        return
 
     # Check 10-minute cooldown (only if enabled)
     if REDEMPTION_COOLDOWN_ENABLED:
-        with get_db_connection() as conn:
-            cur = conn.cursor()
-            cur.execute(
-                """
-                SELECT redeemed_at FROM key_redemptions 
-                WHERE user_id = %s 
-                ORDER BY redeemed_at DESC 
-                LIMIT 1
-            """, (user_id, ))
-            last_redemption = cur.fetchone()
-            cur.close()
-
-            if last_redemption:
-                from datetime import datetime, timedelta
-                last_time = last_redemption[0]
-                time_diff = datetime.now() - last_time
-                cooldown_seconds = 10 * 60  # 10 minutes
-
-                if time_diff.total_seconds() < cooldown_seconds:
-                    remaining_seconds = int(cooldown_seconds -
-                                            time_diff.total_seconds())
-                    remaining_minutes = remaining_seconds // 60
-                    remaining_secs = remaining_seconds % 60
-
-                    await update.message.reply_text(
-                        f"⏳ <b>Cooldown Active</b>\n\n"
-                        f"⚠️ You must wait <b>{remaining_minutes} minutes and {remaining_secs} seconds</b> before redeeming another key.\n\n"
-                        f"🕐 Last redemption: {last_time.strftime('%Y-%m-%d %H:%M:%S')}\n\n"
-                        f"💡 This cooldown helps prevent abuse and ensures fair distribution!",
-                        reply_markup=reply_markup,
-                        parse_mode='HTML')
-                    return
+        last_time = get_last_redemption_time(user_id)
+
+        if last_time:
+            time_diff = datetime.now() - last_time
+            cooldown_seconds = 10 * 60  # 10 minutes
+
+            if time_diff.total_seconds() < cooldown_seconds:
+                remaining_seconds = int(cooldown_seconds -
+                                        time_diff.total_seconds())
+                remaining_minutes = remaining_seconds // 60
+                remaining_secs = remaining_seconds % 60
+
+                await update.message.reply_text(
+                    f"⏳ <b>Cooldown Active</b>\n\n"
+                    f"⚠️ You must wait <b>{remaining_minutes} minutes and {remaining_secs} seconds</b> before redeeming another key.\n\n"
+                    f"🕐 Last redemption: {last_time.strftime('%Y-%m-%d %H:%M:%S')}\n\n"
+                    f"💡 This cooldown helps prevent abuse and ensures fair distribution!",
+                    reply_markup=reply_markup,
+                    parse_mode='HTML')
+                return
 
     # Find the key in database
     key_found = get_key_by_code(key_code)
 
     if not key_found:
-        await update.message.reply_text(
-            "❌ <b>Invalid Key</b>\n\n"
-            "The key you entered is not valid.\n\n"
-            "Please check and try again!",
-            reply_markup=reply_markup,
-            parse_mode='HTML')
+        await update.message.reply_text(messages.INVALID_KEY_TEXT,
+                                        reply_markup=reply_markup,
+                                        parse_mode='HTML')
         return
 
     # Check if key is already used
@@ -533,39 +435,25 @@ async def redeem_key(update: Update, context: ContextTypes.DEFAULT_TYPE,
         return
 
     # Check if user already used this key
-    with get_db_connection() as conn:
-        cur = conn.cursor()
-        cur.execute(
-            """
-            SELECT COUNT(*) FROM key_redemptions 
-            WHERE key_code = %s AND user_id = %s
-        """, (key_code, user_id))
-        if cur.fetchone()[0] > 0:
-            cur.close()
-            await update.message.reply_text(
-                "⚠️ <b>Already Redeemed</b>\n\n"
-                "You've already redeemed this key!\n\n"
-                "Try a different key.",
-                reply_markup=reply_markup,
-                parse_mode='HTML')
-            return
-        cur.close()
+    if has_user_redeemed_key(key_code, user_id):
+        await update.message.reply_text(
+            "⚠️ <b>Already Redeemed</b>\n\n"
+            "You've already redeemed this key!\n\n"
+            "Try a different key.",
+            reply_markup=reply_markup,
+            parse_mode='HTML')
+        return
 
     # Get credential from database
     platform = key_found.get('platform', '')
     credential = get_active_credential(platform)
 
-    keyboard = [[
-        InlineKeyboardButton("🔙 Back to Main", callback_data="user_main")
-    ]]
-    reply_markup_error = InlineKeyboardMarkup(keyboard)
-
     if not credential:
         await update.message.reply_text(
             "❌ <b>No Accounts Available</b>\n\n"
             "All accounts for this platform are currently used.\n\n"
             "Please try again later!",
-            reply_markup=reply_markup_error,
+            reply_markup=reply_markup,
             parse_mode='HTML')
         return
 
@@ -574,23 +462,9 @@ async def redeem_key(update: Update, context: ContextTypes.DEFAULT_TYPE,
     account_text = key_found.get('account_text', 'Premium Account')
 
     # Prepare success message and image BEFORE database operations
-    success_text = (
-        "🎉 <b>Key Redeemed Successfully!</b> 🎉\n\n"
-        f"🎁 <b>Platform:</b> {platform_name}\n"
-        f"✨ <b>Account Type:</b> {account_text}\n\n"
-        f"📧 <b>Email:</b> <code>{credential['email']}</code>\n"
-        f"🔑 <b>Password:</b> <code>{credential['password']}</code>\n\n"
-        f"💡 <i>Tap to copy the credentials!</i>\n\n"
-        f"⚠️ <b>Important:</b>\n"
-        f"• Don't share these credentials\n"
-        f"• Change the password if needed\n"
-        f"• Enjoy your {platform_name} account!\n\n"
-        f"🎮 Thank you for using Premium Vault Bot!")
-
-    keyboard = [[
-        InlineKeyboardButton("🔙 Back to Main", callback_data="user_main")
-    ]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
+    success_text = messages.render_redeem_success(platform_name, account_text,
+                                                  credential['email'],
+                                                  credential['password'])
 
     # Get platform logo path - try multiple locations
     platform_lower = platform_name.lower()
@@ -657,52 +531,38 @@ async def redeem_key(update: Update, context: ContextTypes.DEFAULT_TYPE,
                                    username_str, full_name, key_code))
 
 
+@timed_handler
 async def participate_command(update: Update,
                               context: ContextTypes.DEFAULT_TYPE):
     """Handle /participate command to join active giveaway"""
-    user_id = str(update.effective_user.id)
+    user_id = update.effective_user.id
     user = update.effective_user
     username = user.username
 
+    reply_markup = messages.BACK_TO_USER_MAIN_KEYBOARD
+
     # Check if user is banned
-    if is_banned(int(user_id), username):
-        keyboard = [[
-            InlineKeyboardButton("🔙 Back to Main", callback_data="user_main")
-        ]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
-        await update.message.reply_text(
-            "🚫 <b>Access Denied</b>\n\n"
-            "❌ You have been banned from using this bot.",
-            reply_markup=reply_markup,
-            parse_mode='HTML')
+    if is_banned(user_id, username):
+        await update.message.reply_text(messages.BANNED_TEXT,
+                                        reply_markup=reply_markup,
+                                        parse_mode='HTML')
         return
 
+    record_user(user_id, username)
+
     # Import is_admin from admin module
     from admin import is_admin
 
     # Skip channel check entirely for admins
-    if not is_admin(int(user_id)):
+    if not is_admin(user_id):
         # Check channel membership for regular users
         has_joined = await check_channel_membership(update, context)
         if not has_joined:
-            keyboard = [[
-                InlineKeyboardButton("🔙 Back to Main",
-                                     callback_data="user_main")
-            ]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
-            await update.message.reply_text(
-                "⚠️ <b>Access Restricted</b>\n\n"
-                "❌ You must join all required channels first!\n\n"
-                "Use /start to see the channels and join them.",
-                reply_markup=reply_markup,
-                parse_mode='HTML')
+            await update.message.reply_text(messages.ACCESS_RESTRICTED_TEXT,
+                                            reply_markup=reply_markup,
+                                            parse_mode='HTML')
             return
 
-    keyboard = [[
-        InlineKeyboardButton("🔙 Back to Main", callback_data="user_main")
-    ]]
-    reply_markup = InlineKeyboardMarkup(keyboard)
-
     with get_db_connection() as conn:
         cur = conn.cursor()
 
@@ -761,6 +621,7 @@ async def participate_command(update: Update,
         parse_mode='HTML')
 
 
+@timed_handler
 async def redeem_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Handle /redeem command with optional key parameter"""
     user_id = update.effective_user.id
@@ -771,17 +632,14 @@ async def redeem_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     # Check if user is banned
     if is_banned(user_id, username):
-        keyboard = [[
-            InlineKeyboardButton("🔙 Back to Main", callback_data="user_main")
-        ]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
         await update.message.reply_text(
-            "🚫 <b>Access Denied</b>\n\n"
-            "❌ You have been banned from using this bot.",
-            reply_markup=reply_markup,
+            messages.BANNED_TEXT,
+            reply_markup=messages.BACK_TO_USER_MAIN_KEYBOARD,
             parse_mode='HTML')
         return
 
+    record_user(user_id, username)
+
     # Import is_admin from admin module
     from admin import is_admin
 
@@ -790,16 +648,9 @@ async def redeem_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         # Check channel membership for regular users
         has_joined = await check_channel_membership(update, context)
         if not has_joined:
-            keyboard = [[
-                InlineKeyboardButton("🔙 Back to Main",
-                                     callback_data="user_main")
-            ]]
-            reply_markup = InlineKeyboardMarkup(keyboard)
             await update.message.reply_text(
-                "⚠️ <b>Access Restricted</b>\n\n"
-                "❌ You must join all required channels first!\n\n"
-                "Use /start to see the channels and join them.",
-                reply_markup=reply_markup,
+                messages.ACCESS_RESTRICTED_TEXT,
+                reply_markup=messages.BACK_TO_USER_MAIN_KEYBOARD,
                 parse_mode='HTML')
             return
 
@@ -808,16 +659,9 @@ async def redeem_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
         key_code = context.args[0].strip().upper()
         await redeem_key(update, context, key_code)
     else:
-        keyboard = [[
-            InlineKeyboardButton("🔙 Back to Main", callback_data="user_main")
-        ]]
-        reply_markup = InlineKeyboardMarkup(keyboard)
         await update.message.reply_text(
-            text="🎁 <b>Redeem Key</b>\n\n"
-            "🔑 Please use the command with your key:\n"
-            "<code>/redeem PLATFORM-XXXX-XXXX-XXXX</code>\n\n"
-            "📝 Example: <code>/redeem NETFLIX-A2D8-FA2F-VV82</code>",
-            reply_markup=reply_markup,
+            text=messages.REDEEM_USAGE_TEXT,
+            reply_markup=messages.BACK_TO_USER_MAIN_KEYBOARD,
             parse_mode='HTML')
 
 
@@ -0,0 +1,84 @@
+"""
+Response compression for the admin API.
+
+Buffered responses larger than COMPRESS_MIN_SIZE with a compressible content
+type are encoded with brotli (if installed and accepted) or gzip. Streamed
+responses (exports, the event stream) and file responses are left alone:
+exports compress themselves with ?gzip=1, SSE frames must not be buffered,
+and static files are served precompressed.
+"""
+import os
+import gzip
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    try:
+        import brotlicffi as brotli
+    except ImportError:
+        brotli = None
+
+MIN_SIZE = int(os.getenv('COMPRESS_MIN_SIZE', '1024'))
+GZIP_LEVEL = int(os.getenv('COMPRESS_GZIP_LEVEL', '6'))
+# Higher brotli qualities cost far more CPU than they save on dynamic responses
+BROTLI_QUALITY = int(os.getenv('COMPRESS_BROTLI_QUALITY', '4'))
+
+COMPRESSIBLE_TYPES = {
+    'application/json', 'application/javascript', 'application/x-ndjson',
+    'image/svg+xml', 'text/csv', 'text/css', 'text/html', 'text/plain',
+    'text/javascript'
+}
+
+
+def parse_accept_encoding(header):
+    """Get the set of content codings a client accepts (q=0 excluded)"""
+    accepted = set()
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        if params.replace(' ', '').lower() in ('q=0', 'q=0.0', 'q=0.00', 'q=0.000'):
+            continue
+        accepted.add(coding)
+    return accepted
+
+
+def choose_encoding(accept_encoding):
+    """Pick 'br', 'gzip' or None for an Accept-Encoding header"""
+    accepted = parse_accept_encoding(accept_encoding)
+    if brotli is not None and ('br' in accepted or '*' in accepted):
+        return 'br'
+    if 'gzip' in accepted or '*' in accepted:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding):
+    """Encode bytes with 'br' or 'gzip'"""
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def compress_response(response, accept_encoding):
+    """Compress a buffered response in place if it is worth it"""
+    if (response.is_streamed or response.direct_passthrough
+            or response.status_code < 200 or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_TYPES
+            or 'no-transform' in response.headers.get('Cache-Control', '')):
+        return response
+
+    data = response.get_data()
+    if len(data) < MIN_SIZE:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(accept_encoding)
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding))
+    response.headers['Content-Encoding'] = encoding
+    return response
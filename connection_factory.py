@@ -0,0 +1,192 @@
+"""
+Database connection factory.
+
+Connections are opened to an IPv4 address of the DATABASE_URL host taken
+from a small DNS cache (DB_DNS_TTL seconds) instead of one address resolved
+once and baked into the DSN. libpq gets both `host` (for TLS) and `hostaddr`
+(the address to dial), so no lookup happens per connection. When an address
+refuses or times out the factory rotates to the next one and, once every
+cached address has failed, resolves again so a failover to a new address is
+picked up without a restart. TCP keepalives are on, so dead peers behind
+NAT or a load balancer are detected instead of hanging a worker.
+
+FactoryConnectionPool waits up to DB_POOL_TIMEOUT seconds for a free
+connection instead of failing as soon as all are checked out (a gevent
+worker runs far more greenlets than it has connections), and keeps the
+connections it opens instead of closing those beyond the minimum when they
+are returned.
+"""
+import os
+import time
+import socket
+import logging
+import threading
+
+import psycopg2
+from psycopg2 import pool
+from psycopg2.extensions import parse_dsn
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DNS_TTL = float(os.getenv('DB_DNS_TTL', '60'))
+# Seconds getconn waits for a connection once all of the pool's are in use
+POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', '30'))
+
+# libpq parameters applied unless DATABASE_URL sets them
+DEFAULT_PARAMS = {
+    'sslmode': 'require',
+    'connect_timeout': os.getenv('DB_CONNECT_TIMEOUT', '15'),
+    'keepalives': '1',
+    'keepalives_idle': os.getenv('DB_KEEPALIVES_IDLE', '30'),
+    'keepalives_interval': '10',
+    'keepalives_count': '3',
+}
+
+CONNECT_DURATION = REGISTRY.histogram(
+    'db_connect_duration_seconds',
+    'Time spent opening database connections (TCP, TLS and authentication), by outcome',
+    ['outcome'])
+POOL_WAIT = REGISTRY.histogram(
+    'db_pool_wait_seconds',
+    'Time spent waiting for a free pooled connection, by outcome',
+    ['outcome'])
+DNS_LOOKUPS = REGISTRY.counter(
+    'db_dns_lookups_total',
+    'Resolutions of the database host, by outcome',
+    ['outcome'])
+
+
+class ConnectionFactory:
+    """Opens connections to a DSN's host through a TTL'd DNS cache"""
+
+    def __init__(self, dsn, ttl=DNS_TTL):
+        self.params = {**DEFAULT_PARAMS, **parse_dsn(dsn)}
+        self.host = self.params.get('host')
+        self.port = int(self.params.get('port') or 5432)
+        self.ttl = ttl
+        self._addresses = []
+        self._expires = 0.0
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def _resolves(self):
+        # Unix sockets, explicit hostaddr and multi-host DSNs are left to libpq
+        return (self.host and not self.host.startswith('/') and ',' not in self.host
+                and 'hostaddr' not in self.params)
+
+    def resolve(self, force=False):
+        """Get the cached IPv4 addresses of the host, resolving if expired"""
+        with self._lock:
+            if not force and self._addresses and time.monotonic() < self._expires:
+                return list(self._addresses)
+
+        try:
+            infos = socket.getaddrinfo(self.host, self.port, socket.AF_INET, socket.SOCK_STREAM)
+            addresses = list(dict.fromkeys(info[4][0] for info in infos))
+            DNS_LOOKUPS.inc(outcome='ok')
+        except OSError as e:
+            DNS_LOOKUPS.inc(outcome='error')
+            logger.warning(f"Could not resolve {self.host}: {e}")
+            addresses = []
+
+        with self._lock:
+            if addresses:
+                if addresses != self._addresses:
+                    logger.info(f"Resolved {self.host} to {', '.join(addresses)}")
+                    self._next = 0
+                self._addresses = addresses
+                self._expires = time.monotonic() + self.ttl
+            # On failure keep serving stale addresses rather than none
+            return list(self._addresses)
+
+    def _open(self, hostaddr, **kwargs):
+        params = dict(self.params)
+        if hostaddr:
+            params['hostaddr'] = hostaddr
+        start = time.perf_counter()
+        try:
+            conn = psycopg2.connect(**params, **kwargs)
+        except psycopg2.OperationalError:
+            CONNECT_DURATION.observe(time.perf_counter() - start, outcome='error')
+            raise
+        CONNECT_DURATION.observe(time.perf_counter() - start, outcome='ok')
+        return conn
+
+    def connect(self, **kwargs):
+        """Open a connection, rotating through the host's addresses on failure"""
+        if not self._resolves():
+            return self._open(None, **kwargs)
+
+        addresses = self.resolve()
+        if not addresses:
+            # DNS is down and nothing is cached: let libpq try the name itself
+            return self._open(None, **kwargs)
+
+        tried = set()
+        last_error = None
+        for attempt in range(2):
+            if attempt:
+                # Every cached address failed; the host may have moved
+                addresses = [a for a in self.resolve(force=True) if a not in tried]
+            with self._lock:
+                start = self._next % len(addresses) if addresses else 0
+            for address in addresses[start:] + addresses[:start]:
+                tried.add(address)
+                try:
+                    conn = self._open(address, **kwargs)
+                except psycopg2.OperationalError as e:
+                    logger.warning(f"Connecting to {self.host} ({address}) failed: {e}")
+                    last_error = e
+                    continue
+                with self._lock:
+                    # Stick with the address that works
+                    if address in self._addresses:
+                        self._next = self._addresses.index(address)
+                return conn
+            with self._lock:
+                self._next += 1
+        raise last_error
+
+
+class FactoryConnectionPool(pool.ThreadedConnectionPool):
+    """Thread-safe pool whose connections come from a ConnectionFactory"""
+
+    def __init__(self, minconn, maxconn, factory, timeout=POOL_TIMEOUT, **connect_kwargs):
+        self._factory = factory
+        self._timeout = timeout
+        # One slot per connection; getconn blocks on it rather than raising
+        self._slots = threading.BoundedSemaphore(maxconn)
+        super().__init__(minconn, maxconn, **connect_kwargs)
+        # psycopg2 closes returned connections once minconn are idle; keep
+        # every connection opened instead of reconnecting under load
+        self.minconn = maxconn
+
+    def getconn(self, key=None):
+        start = time.perf_counter()
+        if not self._slots.acquire(timeout=self._timeout):
+            POOL_WAIT.observe(time.perf_counter() - start, outcome='timeout')
+            raise pool.PoolError(f"connection pool exhausted ({self.maxconn} connections in use "
+                                 f"for {self._timeout:g}s)")
+        POOL_WAIT.observe(time.perf_counter() - start, outcome='ok')
+        try:
+            return super().getconn(key)
+        except Exception:
+            self._slots.release()
+            raise
+
+    def putconn(self, conn=None, key=None, close=False):
+        try:
+            super().putconn(conn, key, close)
+        finally:
+            self._slots.release()
+
+    def _connect(self, key=None):
+        conn = self._factory.connect(**self._kwargs)
+        if key is not None:
+            self._used[key] = conn
+            self._rused[id(conn)] = key
+        else:
+            self._pool.append(conn)
+        return conn
@@ -0,0 +1,419 @@
+"""
+Storage backends behind db_setup.get_db_connection.
+
+BACKEND picks where the data layer keeps its tables:
+
+    postgres  (default) the pooled PostgreSQL connections to DATABASE_URL.
+    sqlite    an embedded database file at SQLITE_PATH with the same
+              per-platform tables, so the redemption, stats and upload paths
+              run end-to-end without a server (benchmarks, CI, laptops).
+
+Callers keep writing PostgreSQL: SQLite cursors translate the few constructs
+the hot paths use (%s placeholders, ::casts, = ANY(%s), FOR UPDATE SKIP
+LOCKED, make_interval) and query_registry swaps in SQLite versions of the
+statements that need more than that. Bulk inserts go through insert_many,
+which is execute_values on PostgreSQL and multi-row VALUES on SQLite.
+PostgreSQL-only features (LISTEN/NOTIFY events, partition maintenance,
+COPY exports) are not available on SQLite.
+"""
+import os
+import re
+import json
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+from contextlib import contextmanager
+from functools import lru_cache
+
+from psycopg2.extras import Json, execute_values
+
+logger = logging.getLogger(__name__)
+
+BACKEND = os.getenv('BACKEND', 'postgres').lower()
+SQLITE_PATH = os.getenv('SQLITE_PATH', 'vault.sqlite3')
+
+# Seconds a writer waits for another connection's write lock
+SQLITE_BUSY_TIMEOUT = float(os.getenv('SQLITE_BUSY_TIMEOUT', '30'))
+
+# Rows per multi-row INSERT, as execute_values' default page size
+INSERT_PAGE_SIZE = 100
+
+
+class PostgresBackend:
+    """The pooled PostgreSQL database at DATABASE_URL"""
+
+    name = 'postgres'
+
+    def connection(self):
+        import db_setup
+        return db_setup.get_pool_connection()
+
+    def init_schema(self):
+        import db_setup
+        db_setup.init_postgres_schema()
+
+    def insert_many(self, cur, sql, rows, fetch=False, page_size=INSERT_PAGE_SIZE):
+        return execute_values(cur, sql, rows, page_size=page_size, fetch=fetch)
+
+    def usage(self):
+        import db_setup
+        return db_setup.get_pool_usage()
+
+    def init_worker(self):
+        import db_setup
+        db_setup.init_worker_pool()
+
+    def close(self):
+        import db_setup
+        db_setup.close_db_pool()
+
+
+_LOCKING = re.compile(r'\bFOR\s+UPDATE(?:\s+SKIP\s+LOCKED)?', re.IGNORECASE)
+_INTERVAL_AGO = re.compile(
+    r'CURRENT_TIMESTAMP\s*-\s*make_interval\(\s*secs\s*=>\s*%s\s*\)', re.IGNORECASE)
+_ANY = re.compile(r'=\s*ANY\(\s*%s\s*\)', re.IGNORECASE)
+_CAST = re.compile(r'::[A-Za-z_]+(?:\[\])?')
+_ILIKE = re.compile(r'\bILIKE\b', re.IGNORECASE)
+
+
+@lru_cache(maxsize=2048)
+def translate(sql):
+    """Rewrite a PostgreSQL statement of the data layer for SQLite"""
+    sql = _LOCKING.sub('', sql)
+    sql = _INTERVAL_AGO.sub("datetime('now', '-' || %s || ' seconds')", sql)
+    # Lists are bound as JSON arrays (see the adapters below)
+    sql = _ANY.sub('IN (SELECT value FROM json_each(%s))', sql)
+    sql = _CAST.sub('', sql)
+    sql = _ILIKE.sub('LIKE', sql)
+    return sql.replace('%s', '?').replace('%%', '%')
+
+
+def _to_datetime(value):
+    return datetime.fromisoformat(value.decode())
+
+
+def _to_json(value):
+    return json.loads(value)
+
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+sqlite3.register_adapter(Json, lambda value: json.dumps(value.adapted))
+sqlite3.register_adapter(dict, json.dumps)
+sqlite3.register_adapter(list, json.dumps)
+# Columns are converted by declared type, expressions by an "name [TYPE]" alias
+sqlite3.register_converter('TIMESTAMP', _to_datetime)
+sqlite3.register_converter('TIMESTAMPTZ', _to_datetime)
+sqlite3.register_converter('BOOLEAN', lambda value: value not in (b'0', b''))
+sqlite3.register_converter('JSONB', _to_json)
+
+
+class SQLiteCursor(sqlite3.Cursor):
+    """Cursor that runs the data layer's PostgreSQL statements on SQLite"""
+
+    def execute(self, sql, params=()):
+        return super().execute(translate(sql), params or ())
+
+    def executemany(self, sql, params_list):
+        return super().executemany(translate(sql), params_list)
+
+
+class SQLiteConnection(sqlite3.Connection):
+    """Connection handing out translating cursors"""
+
+    def cursor(self, factory=SQLiteCursor, name=None):
+        # name asks psycopg2 for a server-side cursor; SQLite cursors already
+        # step through results as they are fetched
+        return super().cursor(factory)
+
+
+class SQLiteBackend:
+    """An embedded SQLite database file with the PostgreSQL schema"""
+
+    name = 'sqlite'
+
+    def __init__(self, path=SQLITE_PATH):
+        self.path = path
+        self._idle = []
+        self._in_use = 0
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.path, timeout=SQLITE_BUSY_TIMEOUT, factory=SQLiteConnection,
+            detect_types=sqlite3.PARSE_DECLTYPES | sqlite3.PARSE_COLNAMES,
+            # Connections are handed between threads, one at a time
+            check_same_thread=False,
+            # Reads run outside transactions; the first write takes the
+            # write lock up front instead of failing to upgrade a read
+            isolation_level='IMMEDIATE')
+        conn.execute('PRAGMA journal_mode = WAL')
+        conn.execute('PRAGMA synchronous = NORMAL')
+        conn.execute('PRAGMA foreign_keys = ON')
+        return conn
+
+    def _checkout(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # Inherited from the parent process; never share its handles
+                self._idle = []
+                self._in_use = 0
+                self._pid = os.getpid()
+            self._in_use += 1
+            if self._idle:
+                return self._idle.pop()
+        return self._open()
+
+    @contextmanager
+    def connection(self):
+        conn = self._checkout()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            with self._lock:
+                if self._pid == os.getpid():
+                    self._in_use -= 1
+                    self._idle.append(conn)
+
+    def usage(self):
+        # Connections are opened on demand; there is no maximum
+        return self._in_use, None
+
+    def init_schema(self):
+        from db_helpers import PLATFORMS
+        with self.connection() as conn:
+            cur = conn.cursor()
+            create_sqlite_schema(cur, PLATFORMS)
+            cur.close()
+
+    def insert_many(self, cur, sql, rows, fetch=False, page_size=INSERT_PAGE_SIZE):
+        results = []
+        for start in range(0, len(rows), page_size):
+            page = [tuple(row) for row in rows[start:start + page_size]]
+            row_sql = f"({', '.join(['%s'] * len(page[0]))})"
+            # The single %s after VALUES expands to one tuple per row
+            cur.execute(sql.replace('%s', ', '.join([row_sql] * len(page)), 1),
+                        [value for row in page for value in row])
+            if fetch:
+                results.extend(cur.fetchall())
+        return results if fetch else None
+
+    def init_worker(self):
+        with self._lock:
+            self._idle = []
+            self._in_use = 0
+            self._pid = os.getpid()
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+def create_sqlite_schema(cur, platforms):
+    """Create the tables, indexes and version triggers of init_database on SQLite"""
+    from resource_versions import RESOURCE_KINDS, resource_names
+
+    for platform in platforms:
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {platform}_credentials (
+                id INTEGER PRIMARY KEY,
+                email VARCHAR(255) NOT NULL,
+                password VARCHAR(255) NOT NULL,
+                status VARCHAR(20) DEFAULT 'active',
+                claimed_by BIGINT,
+                claimed_by_username VARCHAR(255),
+                claimed_by_name VARCHAR(255),
+                claimed_at TIMESTAMP,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS {platform}_keys (
+                id INTEGER PRIMARY KEY,
+                key_code VARCHAR(100) UNIQUE NOT NULL,
+                uses INTEGER DEFAULT 1,
+                remaining_uses INTEGER DEFAULT 1,
+                account_text VARCHAR(255),
+                status VARCHAR(20) DEFAULT 'active',
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                redeemed_at TIMESTAMP,
+                giveaway_generated BOOLEAN DEFAULT FALSE,
+                giveaway_winner BIGINT
+            )
+        """)
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{platform}_creds_status ON {platform}_credentials(status)")
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_{platform}_keys_status ON {platform}_keys(status)")
+        cur.execute(f"""
+            CREATE INDEX IF NOT EXISTS idx_{platform}_creds_claimed_at
+            ON {platform}_credentials(claimed_at DESC, id DESC)
+            WHERE status = 'claimed' AND claimed_by IS NOT NULL AND claimed_at IS NOT NULL
+        """)
+
+    # One unpartitioned ledger with the partitioned table's indexes
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS key_redemptions (
+            id INTEGER PRIMARY KEY,
+            platform VARCHAR(50) NOT NULL,
+            key_code VARCHAR(100) NOT NULL,
+            user_id BIGINT NOT NULL,
+            username VARCHAR(255),
+            full_name VARCHAR(255),
+            redeemed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_key_redemptions_user ON key_redemptions(user_id, redeemed_at)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_key_redemptions_time ON key_redemptions(redeemed_at, id)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_key_redemptions_platform ON key_redemptions(platform)")
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_key_redemptions_key_user ON key_redemptions(key_code, user_id)")
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            user_id BIGINT UNIQUE NOT NULL,
+            username VARCHAR(255),
+            joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_seen_at TIMESTAMP
+        )
+    """)
+    cur.execute("PRAGMA table_info(users)")
+    if 'last_seen_at' not in [row[1] for row in cur.fetchall()]:
+        cur.execute("ALTER TABLE users ADD COLUMN last_seen_at TIMESTAMP")
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS user_stats (
+            user_id BIGINT PRIMARY KEY,
+            total_redemptions INTEGER NOT NULL DEFAULT 0,
+            platform_counts JSONB NOT NULL DEFAULT '{}',
+            first_redeemed_at TIMESTAMP,
+            last_redeemed_at TIMESTAMP
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS banned_users (
+            id INTEGER PRIMARY KEY,
+            user_identifier VARCHAR(255) UNIQUE NOT NULL,
+            banned_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS giveaways (
+            id INTEGER PRIMARY KEY,
+            platform VARCHAR(50) NOT NULL,
+            active BOOLEAN DEFAULT TRUE,
+            duration VARCHAR(10),
+            winners INTEGER,
+            end_time TIMESTAMP,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS giveaway_participants (
+            id INTEGER PRIMARY KEY,
+            giveaway_id INTEGER REFERENCES giveaways(id) ON DELETE CASCADE,
+            user_id BIGINT NOT NULL,
+            joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(giveaway_id, user_id)
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS admin_credentials (
+            id INTEGER PRIMARY KEY,
+            username VARCHAR(100) UNIQUE NOT NULL,
+            password VARCHAR(255) NOT NULL,
+            role VARCHAR(20) DEFAULT 'admin',
+            telegram_user_id VARCHAR(50),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id VARCHAR(32) PRIMARY KEY,
+            kind VARCHAR(50) NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'queued',
+            params JSONB NOT NULL DEFAULT '{}',
+            progress INTEGER NOT NULL DEFAULT 0,
+            total INTEGER,
+            result JSONB,
+            error TEXT,
+            created_by VARCHAR(100),
+            worker VARCHAR(100),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_jobs_queued ON jobs(created_at) WHERE status = 'queued'")
+
+    # Version counters behind the admin API's ETags; SQLite triggers are
+    # row-level only, so a bulk write bumps once per row instead of once
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS resource_versions (
+            resource VARCHAR(100) PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    for kind in RESOURCE_KINDS:
+        for resource in resource_names(kind, platforms):
+            cur.execute("INSERT INTO resource_versions (resource) VALUES (%s) ON CONFLICT (resource) DO NOTHING",
+                        (resource,))
+    for kind in ('keys', 'credentials'):
+        for platform in platforms:
+            for op in ('INSERT', 'UPDATE', 'DELETE'):
+                cur.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {platform}_{kind}_version_{op.lower()}
+                    AFTER {op} ON {platform}_{kind}
+                    BEGIN
+                        UPDATE resource_versions
+                        SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+                        WHERE resource = '{kind}:{platform}';
+                    END
+                """)
+    cur.execute("""
+        CREATE TRIGGER IF NOT EXISTS key_redemptions_version
+        AFTER INSERT ON key_redemptions
+        BEGIN
+            UPDATE resource_versions
+            SET version = version + 1, updated_at = CURRENT_TIMESTAMP
+            WHERE resource = 'redemptions:' || NEW.platform;
+        END
+    """)
+
+    cur.execute("""
+        INSERT INTO admin_credentials (username, password, role)
+        VALUES (%s, %s, 'owner')
+        ON CONFLICT (username) DO NOTHING
+    """, (os.getenv('ADMIN_USERNAME', 'admin'), os.getenv('ADMIN_PASSWORD', 'changeme')))
+
+
+BACKENDS = {'postgres': PostgresBackend, 'sqlite': SQLiteBackend}
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """Get the storage backend selected by BACKEND"""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if BACKEND not in BACKENDS:
+                    raise ValueError(f"Unknown BACKEND {BACKEND!r}; choose from {', '.join(BACKENDS)}")
+                _backend = BACKENDS[BACKEND]()
+                if BACKEND != 'postgres':
+                    logger.info(f"Using the {BACKEND} storage backend")
+    return _backend
+
+
+def insert_many(cur, sql, rows, fetch=False, page_size=INSERT_PAGE_SIZE):
+    """Insert rows through a statement with a single `VALUES %s` (execute_values style)"""
+    return get_backend().insert_many(cur, sql, rows, fetch=fetch, page_size=page_size)
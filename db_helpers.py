@@ -1,5 +1,6 @@
 from db_setup import get_db_connection
-from datetime import datetime
+import query_registry
+import key_filter
 import json
 import asyncio
 
@@ -123,13 +124,7 @@ def get_active_credential(platform_name):
 
     with get_db_connection() as conn:
         cur = conn.cursor()
-        cur.execute(f"""
-            SELECT id, email, password
-            FROM {platform_lower}_credentials
-            WHERE status = 'active'
-            ORDER BY created_at ASC
-            LIMIT 1
-        """)
+        query_registry.execute(cur, 'active_credential', platform=platform_lower)
         cred = cur.fetchone()
         cur.close()
 
@@ -145,15 +140,9 @@ def claim_credential(platform_name, cred_id, user_id, username=None, full_name=N
 
     with get_db_connection() as conn:
         cur = conn.cursor()
-        cur.execute(f"""
-            UPDATE {platform_lower}_credentials
-            SET status = 'claimed', 
-                claimed_by = %s, 
-                claimed_by_username = %s,
-                claimed_by_name = %s,
-                claimed_at = CURRENT_TIMESTAMP
-            WHERE id = %s
-        """, (user_id, username, full_name, cred_id))
+        query_registry.execute(cur, 'claim_credential',
+                               (user_id, username, full_name, cred_id),
+                               platform=platform_lower)
         cur.close()
         return True
 
@@ -172,23 +161,19 @@ def add_key(key_code, platform_name, uses, account_text, giveaway_generated=Fals
         """, (key_code, uses, uses, account_text, giveaway_generated, giveaway_winner))
         key_id = cur.fetchone()[0]
         cur.close()
-        return key_id
+    key_filter.FILTER.add(key_code)
+    return key_id
 
 def get_key_by_code(key_code):
     """Get a key by its code - search across all platform tables"""
-    for platform in PLATFORMS:
-        with get_db_connection() as conn:
-            cur = conn.cursor()
-            cur.execute(f"""
-                SELECT id, key_code, uses, remaining_uses, account_text, status, 
-                       created_at, redeemed_at, giveaway_generated, giveaway_winner
-                FROM {platform}_keys
-                WHERE key_code = %s
-            """, (key_code,))
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        for platform in PLATFORMS:
+            query_registry.execute(cur, 'key_by_code', (key_code,), platform=platform)
             key = cur.fetchone()
-            cur.close()
 
             if key:
+                cur.close()
                 return {
                     'id': key[0],
                     'key': key[1],
@@ -202,6 +187,7 @@ def get_key_by_code(key_code):
                     'giveaway_generated': key[8],
                     'giveaway_winner': key[9]
                 }
+        cur.close()
     return None
 
 def get_keys_by_platform(platform_name):
@@ -272,7 +258,7 @@ def redeem_key(platform_name, key_id, user_id, username=None, full_name=None):
         cur = conn.cursor()
 
         # Get key_code first
-        cur.execute(f"SELECT key_code FROM {platform_lower}_keys WHERE id = %s", (key_id,))
+        query_registry.execute(cur, 'key_code_by_id', (key_id,), platform=platform_lower)
         key_row = cur.fetchone()
         if not key_row:
             cur.close()
@@ -280,22 +266,21 @@ def redeem_key(platform_name, key_id, user_id, username=None, full_name=None):
         key_code = key_row[0]
 
         # Update key
-        cur.execute(f"""
-            UPDATE {platform_lower}_keys
-            SET remaining_uses = remaining_uses - 1,
-                redeemed_at = CURRENT_TIMESTAMP,
-                status = CASE WHEN remaining_uses - 1 <= 0 THEN 'used' ELSE status END
-            WHERE id = %s
-        """, (key_id,))
+        query_registry.execute(cur, 'consume_key_use', (key_id,), platform=platform_lower)
+        exhausted = cur.fetchone()[0] <= 0
 
         # Add redemption record with full user details
-        cur.execute("""
-            INSERT INTO key_redemptions (platform, key_code, user_id, username, full_name)
-            VALUES (%s, %s, %s, %s, %s)
-        """, (platform_lower, key_code, str(user_id), username, full_name))
+        query_registry.execute(cur, 'insert_redemption',
+                               (platform_lower, key_code, user_id, username, full_name))
+
+        # Keep the per-user summary in the same transaction
+        query_registry.execute(cur, 'bump_user_stats',
+                               (user_id, platform_lower, platform_lower, platform_lower))
 
         cur.close()
-        return True
+    if exhausted:
+        key_filter.FILTER.discard(key_code)
+    return True
 
 def delete_keys_by_platform(platform_name):
     """Delete all keys for a platform from platform-specific table"""
@@ -314,15 +299,10 @@ def is_user_banned(user_id, username=None):
     with get_db_connection() as conn:
         cur = conn.cursor()
         if username:
-            cur.execute("""
-                SELECT COUNT(*) FROM banned_users 
-                WHERE user_identifier IN (%s, %s)
-            """, (str(user_id), f"@{username}"))
+            query_registry.execute(cur, 'is_banned_by_id_or_username',
+                                   (str(user_id), f"@{username}"))
         else:
-            cur.execute("""
-                SELECT COUNT(*) FROM banned_users 
-                WHERE user_identifier = %s
-            """, (str(user_id),))
+            query_registry.execute(cur, 'is_banned_by_id', (str(user_id),))
 
         count = cur.fetchone()[0]
         cur.close()
@@ -397,42 +377,36 @@ def get_or_create_user(user_id, username=None):
     """Get or create user"""
     with get_db_connection() as conn:
         cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO users (user_id, username)
-            VALUES (%s, %s)
-            ON CONFLICT (user_id) DO UPDATE SET username = EXCLUDED.username
-            RETURNING id
-        """, (str(user_id), username))
+        query_registry.execute(cur, 'upsert_user', (user_id, username))
         user_pk = cur.fetchone()[0]
         cur.close()
         return user_pk
 
-def get_user_stats(user_id):
-    """Get user statistics"""
+def get_user_stats(user_id, recent=5):
+    """Get user statistics from the user_stats summary and the most recent redemptions"""
     with get_db_connection() as conn:
         cur = conn.cursor()
 
-        # Get user info
-        cur.execute("""
-            SELECT joined_at FROM users WHERE user_id = %s
-        """, (str(user_id),))
-        user = cur.fetchone()
+        query_registry.execute(cur, 'user_stats_summary', (user_id,))
+        summary = cur.fetchone()
 
-        if not user:
+        if not summary:
+            cur.close()
             return None
 
-        # Get redeemed keys from the new key_redemptions table
-        cur.execute("""
-            SELECT key_code, platform, redeemed_at
-            FROM key_redemptions
-            WHERE user_id = %s
-            ORDER BY redeemed_at DESC
-        """, (str(user_id),))
-        redemptions = cur.fetchall()
+        joined_at, total, platform_counts, first_redeemed_at, last_redeemed_at = summary
+        redemptions = []
+        if total:
+            query_registry.execute(cur, 'user_recent_redemptions', (user_id, recent))
+            redemptions = cur.fetchall()
         cur.close()
 
         return {
-            'joined_at': user[0].isoformat() if user[0] else None,
+            'joined_at': joined_at.isoformat() if joined_at else None,
+            'total_redeemed': total or 0,
+            'platform_counts': platform_counts or {},
+            'first_redeemed_at': first_redeemed_at.isoformat() if first_redeemed_at else None,
+            'last_redeemed_at': last_redeemed_at.isoformat() if last_redeemed_at else None,
             'redeemed_keys': [{
                 'key': r[0],
                 'platform': r[1],
@@ -440,6 +414,148 @@ def get_user_stats(user_id):
             } for r in redemptions]
         }
 
+def get_last_redemption_time(user_id):
+    """Get the time of a user's most recent key redemption"""
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        query_registry.execute(cur, 'last_redemption_time', (user_id,))
+        row = cur.fetchone()
+        cur.close()
+        return row[0] if row else None
+
+def has_user_redeemed_key(key_code, user_id):
+    """Check if a user has already redeemed a key"""
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        query_registry.execute(cur, 'user_key_redemption_count', (key_code, user_id))
+        count = cur.fetchone()[0]
+        cur.close()
+        return count > 0
+
+def _claim_history_branch(platform, user_id, after):
+    """Build the per-platform SELECT of the claim history UNION ALL"""
+    conditions = ["status = 'claimed'", "claimed_by IS NOT NULL", "claimed_at IS NOT NULL"]
+    params = []
+    if user_id is not None:
+        conditions.append("claimed_by = %s")
+        params.append(user_id)
+    if after is not None:
+        # Keyset position (claimed_at, platform, id); the platform is constant
+        # per branch, so each branch only needs a range on its own index
+        after_at, after_platform, after_id = after
+        if platform < after_platform:
+            conditions.append("claimed_at <= %s")
+            params.append(after_at)
+        elif platform == after_platform:
+            conditions.append("(claimed_at, id) < (%s, %s)")
+            params.extend([after_at, after_id])
+        else:
+            conditions.append("claimed_at < %s")
+            params.append(after_at)
+
+    sql = f"""
+        (SELECT '{platform}' AS platform, id, claimed_by, claimed_by_username,
+                claimed_by_name, claimed_at, email
+         FROM {platform}_credentials
+         WHERE {' AND '.join(conditions)}
+         ORDER BY claimed_at DESC, id DESC
+         LIMIT %s)
+    """
+    return sql, params
+
+def get_claim_history(limit=100, after=None, platform=None, user_id=None):
+    """Get one page of credential claims across platforms, newest first
+
+    `after` is the (claimed_at, platform, id) position of the last row of the
+    previous page. Returns (rows, next_position), next_position being None on
+    the last page.
+    """
+    platforms = [platform] if platform else PLATFORMS
+    branches = []
+    params = []
+    for p in platforms:
+        sql, branch_params = _claim_history_branch(p, user_id, after)
+        branches.append(sql)
+        params.extend(branch_params)
+        params.append(limit + 1)
+
+    query = f"""
+        SELECT platform, id, claimed_by, claimed_by_username, claimed_by_name,
+               claimed_at, email
+        FROM ({' UNION ALL '.join(branches)}) AS claims
+        ORDER BY claimed_at DESC, platform DESC, id DESC
+        LIMIT %s
+    """
+    params.append(limit + 1)
+
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(query, params)
+        rows = cur.fetchall()
+        cur.close()
+
+    next_position = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_position = (last[5], last[0], last[1])
+
+    return [{
+        'user_id': r[2],
+        'username': r[3] if r[3] else 'N/A',
+        'full_name': r[4] if r[4] else 'N/A',
+        'claimed_at': r[5].isoformat() if r[5] else None,
+        'email': r[6],
+        'platform': r[0]
+    } for r in rows], next_position
+
+def get_redemption_history(limit=100, after=None, platform=None, user_id=None):
+    """Get one page of key redemptions, newest first
+
+    `after` is the (redeemed_at, id) position of the last row of the previous
+    page. Returns (rows, next_position), next_position being None on the last
+    page.
+    """
+    conditions = []
+    params = []
+    if platform:
+        conditions.append("platform = %s")
+        params.append(platform)
+    if user_id is not None:
+        conditions.append("user_id = %s")
+        params.append(user_id)
+    if after is not None:
+        conditions.append("(redeemed_at, id) < (%s, %s)")
+        params.extend(after)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+    params.append(limit + 1)
+
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            SELECT id, user_id, username, full_name, redeemed_at, key_code, platform
+            FROM key_redemptions
+            {where}
+            ORDER BY redeemed_at DESC, id DESC
+            LIMIT %s
+        """, params)
+        rows = cur.fetchall()
+        cur.close()
+
+    next_position = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_position = (rows[-1][4], rows[-1][0])
+
+    return [{
+        'user_id': r[1],
+        'username': r[2] if r[2] else 'N/A',
+        'full_name': r[3] if r[3] else 'N/A',
+        'redeemed_at': r[4].isoformat() if r[4] else None,
+        'key_code': r[5],
+        'platform': r[6]
+    } for r in rows], next_position
+
 def get_all_admin_telegram_ids():
     """Get all admin Telegram IDs from database"""
     with get_db_connection() as conn:
@@ -459,97 +575,13 @@ def get_all_admin_telegram_ids():
         return telegram_ids
 
 async def notify_admins_key_redeemed(bot, platform, user_id, username, full_name, key_code):
-    """Send notification to all admins when a key is redeemed"""
-    import os
-
-    # Get admin IDs from database
-    admin_ids = get_all_admin_telegram_ids()
-
-    # Add static admin and environment variable admins
-    STATIC_ADMIN_ID = 6562270244
-    if STATIC_ADMIN_ID not in admin_ids:
-        admin_ids.append(STATIC_ADMIN_ID)
-
-    # Add admins from environment variable
-    _admin_ids_str = os.getenv('ADMIN_IDS', '')
-    if _admin_ids_str:
-        for id_str in _admin_ids_str.split(','):
-            if id_str.strip() and id_str.strip().isdigit():
-                admin_id = int(id_str.strip())
-                if admin_id not in admin_ids:
-                    admin_ids.append(admin_id)
-
-    if not admin_ids:
-        return
-
-    username_text = f"@{username}" if username and username != "N/A" else "N/A"
-    full_name_text = full_name if full_name else "N/A"
-
-    message = (
-        f"🎉 <b>Key Redeemed Successfully!</b>\n\n"
-        f"🔑 <b>Key:</b> <code>{key_code}</code>\n"
-        f"🎮 <b>Platform:</b> {platform}\n\n"
-        f"👤 <b>User Information:</b>\n"
-        f"├ <b>Name:</b> {full_name_text}\n"
-        f"├ <b>Username:</b> {username_text}\n"
-        f"└ <b>Chat ID:</b> <code>{user_id}</code>\n\n"
-        f"⏰ <b>Redeemed At:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-    )
-
-    for admin_id in admin_ids:
-        try:
-            await bot.send_message(
-                chat_id=admin_id,
-                text=message,
-                parse_mode='HTML'
-            )
-        except Exception as e:
-            print(f"Failed to notify admin {admin_id}: {e}")
+    """Queue an admin notification for a key redemption (sent in the next digest)"""
+    import notifications
+    notifications.NOTIFIER.add(bot, notifications.KEY_REDEEMED, platform,
+                               user_id, username, full_name, key_code)
 
 async def notify_admins_credential_claimed(bot, platform, user_id, username, full_name, email):
-    """Send notification to all admins when a credential is claimed"""
-    import os
-
-    # Get admin IDs from database
-    admin_ids = get_all_admin_telegram_ids()
-
-    # Add static admin and environment variable admins
-    STATIC_ADMIN_ID = 6562270244
-    if STATIC_ADMIN_ID not in admin_ids:
-        admin_ids.append(STATIC_ADMIN_ID)
-
-    # Add admins from environment variable
-    _admin_ids_str = os.getenv('ADMIN_IDS', '')
-    if _admin_ids_str:
-        for id_str in _admin_ids_str.split(','):
-            if id_str.strip() and id_str.strip().isdigit():
-                admin_id = int(id_str.strip())
-                if admin_id not in admin_ids:
-                    admin_ids.append(admin_id)
-
-    if not admin_ids:
-        return
-
-    username_text = f"@{username}" if username else "N/A"
-    full_name_text = full_name if full_name else "N/A"
-
-    message = (
-        f"📧 <b>Credential Claimed!</b>\n\n"
-        f"🎮 <b>Platform:</b> {platform}\n"
-        f"📧 <b>Email:</b> <code>{email}</code>\n\n"
-        f"👤 <b>User Details:</b>\n"
-        f"├ <b>Name:</b> {full_name_text}\n"
-        f"├ <b>Chat ID:</b> <code>{user_id}</code>\n"
-        f"└ <b>Username:</b> {username_text}\n\n"
-        f"⏰ <b>Time:</b> {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-    )
-
-    for admin_id in admin_ids:
-        try:
-            await bot.send_message(
-                chat_id=admin_id,
-                text=message,
-                parse_mode='HTML'
-            )
-        except Exception as e:
-            print(f"Failed to notify admin {admin_id}: {e}")
\ No newline at end of file
+    """Queue an admin notification for a credential claim (sent in the next digest)"""
+    import notifications
+    notifications.NOTIFIER.add(bot, notifications.CREDENTIAL_CLAIMED, platform,
+                               user_id, username, full_name, email)
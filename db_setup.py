@@ -1,65 +1,231 @@
 
 import os
+import re
+import sys
+import time
+import logging
+import threading
 import psycopg2
-from psycopg2 import pool
+from functools import lru_cache
+from psycopg2 import extensions
 from contextlib import contextmanager
 
-# Database connection pool
+from metrics import REGISTRY
+from db_backends import get_backend
+from connection_factory import ConnectionFactory, FactoryConnectionPool
+
+logger = logging.getLogger(__name__)
+
+# Database connection pool, owned by the process in _pool_pid
 db_pool = None
+_pool_pid = None
+_pool_lock = threading.Lock()
+_connection_factory = None
+
+DB_POOL_MIN = int(os.getenv('DB_POOL_MIN', '2'))
+DB_POOL_MAX = int(os.getenv('DB_POOL_MAX', '10'))
+
+# Statements slower than this are logged with the calling function
+SLOW_QUERY_MS = float(os.getenv('DB_SLOW_QUERY_MS', '500'))
+
+QUERY_DURATION = REGISTRY.histogram(
+    'db_query_duration_seconds',
+    'Time spent executing SQL statements, by normalized fingerprint',
+    ['query'])
+QUERY_ROWS = REGISTRY.histogram(
+    'db_query_rows',
+    'Rows returned or affected by SQL statements, by normalized fingerprint',
+    ['query'],
+    buckets=(0, 1, 10, 100, 1000, 10000, 100000))
+QUERY_ERRORS = REGISTRY.counter(
+    'db_query_errors_total',
+    'SQL statements that raised an error, by normalized fingerprint',
+    ['query'])
+
+_STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%(?:\([^)]+\))?s|\$\d+")
+_VALUE_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_WHITESPACE = re.compile(r"\s+")
+
+# Frames from these files are skipped when looking for the caller of a query
+_INTERNAL_FILES = ('db_setup.py', 'query_registry.py', 'contextlib.py')
+
+@lru_cache(maxsize=2048)
+def fingerprint_query(query):
+    """Normalize a statement so calls differing only in values group together"""
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    elif not isinstance(query, str):
+        query = str(query)
+    normalized = _STRING_LITERAL.sub('?', query)
+    normalized = _PLACEHOLDER.sub('?', normalized)
+    normalized = _NUMBER_LITERAL.sub('?', normalized)
+    normalized = _VALUE_LIST.sub('(?)', normalized)
+    normalized = _WHITESPACE.sub(' ', normalized).strip()
+    return normalized[:200]
+
+def _find_caller():
+    """Get the first function outside the database layer on the stack"""
+    frame = sys._getframe(2)
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if not filename.endswith(_INTERNAL_FILES) and 'psycopg2' not in filename:
+            return f"{frame.f_code.co_name} ({os.path.basename(filename)}:{frame.f_lineno})"
+        frame = frame.f_back
+    return 'unknown'
+
+class InstrumentedCursor(extensions.cursor):
+    """Cursor that records duration and row count of every statement"""
+
+    def execute(self, query, vars=None):
+        start = time.perf_counter()
+        failed = False
+        try:
+            return super().execute(query, vars)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._observe(query, time.perf_counter() - start, failed)
+
+    def executemany(self, query, vars_list):
+        start = time.perf_counter()
+        failed = False
+        try:
+            return super().executemany(query, vars_list)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._observe(query, time.perf_counter() - start, failed)
+
+    def _observe(self, query, elapsed, failed):
+        fingerprint = fingerprint_query(query)
+        QUERY_DURATION.observe(elapsed, query=fingerprint)
+        if failed:
+            QUERY_ERRORS.inc(query=fingerprint)
+        elif self.rowcount >= 0:
+            QUERY_ROWS.observe(self.rowcount, query=fingerprint)
+
+        elapsed_ms = elapsed * 1000
+        if elapsed_ms >= SLOW_QUERY_MS:
+            logger.warning(f"Slow query ({elapsed_ms:.1f} ms, rows={self.rowcount}) "
+                           f"from {_find_caller()}: {fingerprint}")
+
+class PooledConnection(extensions.connection):
+    """Connection that remembers which statements it has prepared"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements = set()
+
+def get_connection_factory():
+    """Get the factory that opens connections to DATABASE_URL"""
+    global _connection_factory
+    if _connection_factory is None:
+        database_url = os.getenv('DATABASE_URL')
+        if not database_url:
+            raise ValueError("DATABASE_URL environment variable not set")
+        _connection_factory = ConnectionFactory(database_url)
+    return _connection_factory
+
+def open_connection(**kwargs):
+    """Open an unpooled connection (e.g. for LISTEN)"""
+    return get_connection_factory().connect(**kwargs)
 
 def init_db_pool():
     """Initialize database connection pool"""
-    global db_pool
-    database_url = os.getenv('DATABASE_URL')
-    if not database_url:
-        raise ValueError("DATABASE_URL environment variable not set")
-    
-    # Parse the URL to extract components
-    from urllib.parse import urlparse
-    parsed = urlparse(database_url)
+    global db_pool, _pool_pid
     
-    # Resolve hostname to IPv4 address
-    import socket
-    ipv4_addr = None
     try:
-        # Force IPv4 resolution by explicitly requesting AF_INET family
-        result = socket.getaddrinfo(
-            parsed.hostname, 
-            None,  # Don't need port for resolution
-            socket.AF_INET,  # IPv4 only
-            socket.SOCK_STREAM
+        # Threaded: gthread workers share the pool between request threads
+        db_pool = FactoryConnectionPool(
+            DB_POOL_MIN,
+            DB_POOL_MAX,
+            get_connection_factory(),
+            connection_factory=PooledConnection,
+            cursor_factory=InstrumentedCursor
         )
-        if result:
-            ipv4_addr = result[0][4][0]
-            print(f"✓ Resolved {parsed.hostname} to IPv4: {ipv4_addr}")
-    except Exception as e:
-        print(f"⚠ IPv4 resolution failed: {e}")
-        # Fall back to using hostname directly
-        ipv4_addr = parsed.hostname
-    
-    # Build connection string with resolved IP or hostname
-    conn_string = f"postgresql://{parsed.username}:{parsed.password}@{ipv4_addr}:{parsed.port or 5432}{parsed.path}?sslmode=require&connect_timeout=15"
-    
-    try:
-        db_pool = pool.SimpleConnectionPool(
-            1,  # minconn
-            10,  # maxconn
-            conn_string
-        )
-        print(f"✓ Database pool initialized successfully")
+        _pool_pid = os.getpid()
+        # Open connections are validated now rather than by the first requests
+        warmed = warm_db_pool()
+        print(f"✓ Database pool initialized successfully ({warmed} connections ready)")
         return db_pool
     except Exception as e:
         print(f"✗ Database pool initialization failed: {e}")
         raise
 
-@contextmanager
+def discard_pool_after_fork():
+    """Forget a pool inherited from the parent process without closing it"""
+    # Closing would send a terminate message on sockets the parent and the
+    # other forked workers still use; the next get_db_connection opens a pool
+    global db_pool, _pool_pid
+    db_pool = None
+    _pool_pid = None
+
+def warm_db_pool():
+    """Open and validate the pool's minimum connections"""
+    conns = []
+    try:
+        for _ in range(DB_POOL_MIN):
+            conn = db_pool.getconn()
+            conns.append(conn)
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+    finally:
+        for conn in conns:
+            db_pool.putconn(conn)
+    return len(conns)
+
+def init_worker_pool():
+    """Give a freshly forked worker its own warmed-up pool (gunicorn post_fork)"""
+    discard_pool_after_fork()
+    try:
+        with _pool_lock:
+            init_db_pool()
+        logger.info(f"Worker {os.getpid()} opened its database pool")
+    except Exception as e:
+        # Serve anyway; get_db_connection retries on the first request
+        logger.error(f"Worker {os.getpid()} could not warm up the database pool: {e}")
+        discard_pool_after_fork()
+
+def close_db_pool():
+    """Close this process's pool connections (gunicorn worker_exit)"""
+    global db_pool, _pool_pid
+    with _pool_lock:
+        if db_pool is not None and _pool_pid == os.getpid():
+            db_pool.closeall()
+        db_pool = None
+        _pool_pid = None
+
+def get_pool_usage():
+    """Get (connections checked out, pool maximum) of this process's pool"""
+    conn_pool = db_pool
+    if conn_pool is None or _pool_pid != os.getpid():
+        return 0, DB_POOL_MAX
+    return len(conn_pool._used), conn_pool.maxconn
+
+def _get_pool():
+    # A pool created before a fork belongs to the parent; never use its sockets
+    if db_pool is None or _pool_pid != os.getpid():
+        with _pool_lock:
+            if db_pool is None or _pool_pid != os.getpid():
+                discard_pool_after_fork()
+                init_db_pool()
+    return db_pool
+
 def get_db_connection():
-    """Context manager for database connections"""
-    global db_pool
-    if db_pool is None:
-        init_db_pool()
-    
-    conn = db_pool.getconn()
+    """Context manager for database connections (of the BACKEND storage backend)"""
+    return get_backend().connection()
+
+@contextmanager
+def get_pool_connection():
+    """Context manager for a pooled PostgreSQL connection"""
+    conn_pool = _get_pool()
+    conn = conn_pool.getconn()
     try:
         yield conn
         conn.commit()
@@ -67,11 +233,15 @@ def get_db_connection():
         conn.rollback()
         raise e
     finally:
-        db_pool.putconn(conn)
+        conn_pool.putconn(conn)
 
 def init_database():
     """Create database tables if they don't exist"""
-    with get_db_connection() as conn:
+    get_backend().init_schema()
+
+def init_postgres_schema():
+    """Create the PostgreSQL tables, triggers and partitions"""
+    with get_pool_connection() as conn:
         cur = conn.cursor()
         
         # Define platforms
@@ -95,7 +265,7 @@ def init_database():
                     email VARCHAR(255) NOT NULL,
                     password VARCHAR(255) NOT NULL,
                     status VARCHAR(20) DEFAULT 'active',
-                    claimed_by VARCHAR(50),
+                    claimed_by BIGINT,
                     claimed_by_username VARCHAR(255),
                     claimed_by_name VARCHAR(255),
                     claimed_at TIMESTAMP,
@@ -117,32 +287,62 @@ def init_database():
                     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                     redeemed_at TIMESTAMP,
                     giveaway_generated BOOLEAN DEFAULT FALSE,
-                    giveaway_winner VARCHAR(50)
+                    giveaway_winner BIGINT
                 )
             """)
         
-        # Create key_redemptions table (single table for all platforms)
+        # Refuse to start while user IDs are still text (python user_ids.py
+        # migrate converts them), before the ledger migration and the
+        # user_stats backfill cast them to BIGINT
+        from user_ids import check_user_ids
+        check_user_ids(cur, [platform_key for platform_key, _, _ in platforms])
+        
+        # Create key_redemptions ledger (single table for all platforms,
+        # partitioned by month on redeemed_at)
+        from redemption_ledger import create_redemption_ledger
+        create_redemption_ledger(cur)
+        
+        # Create users table
         cur.execute("""
-            CREATE TABLE IF NOT EXISTS key_redemptions (
+            CREATE TABLE IF NOT EXISTS users (
                 id SERIAL PRIMARY KEY,
-                platform VARCHAR(50) NOT NULL,
-                key_code VARCHAR(100) NOT NULL,
-                user_id VARCHAR(50) NOT NULL,
+                user_id BIGINT UNIQUE NOT NULL,
                 username VARCHAR(255),
-                full_name VARCHAR(255),
-                redeemed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_seen_at TIMESTAMP
             )
         """)
+        # Written in batches by user_registry
+        cur.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS last_seen_at TIMESTAMP")
         
-        # Create users table
+        # Create user_stats summary (maintained by redeem_key), backfilled
+        # from the ledger the first time it is created
+        cur.execute("SELECT to_regclass('user_stats')")
+        user_stats_exists = cur.fetchone()[0] is not None
         cur.execute("""
-            CREATE TABLE IF NOT EXISTS users (
-                id SERIAL PRIMARY KEY,
-                user_id VARCHAR(50) UNIQUE NOT NULL,
-                username VARCHAR(255),
-                joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            CREATE TABLE IF NOT EXISTS user_stats (
+                user_id BIGINT PRIMARY KEY,
+                total_redemptions INTEGER NOT NULL DEFAULT 0,
+                platform_counts JSONB NOT NULL DEFAULT '{}'::jsonb,
+                first_redeemed_at TIMESTAMP,
+                last_redeemed_at TIMESTAMP
             )
         """)
+        if not user_stats_exists:
+            cur.execute("""
+                INSERT INTO user_stats (user_id, total_redemptions, platform_counts,
+                                        first_redeemed_at, last_redeemed_at)
+                SELECT user_id::bigint, SUM(redemptions), jsonb_object_agg(platform, redemptions),
+                       MIN(first_at), MAX(last_at)
+                FROM (
+                    SELECT user_id, platform, COUNT(*) AS redemptions,
+                           MIN(redeemed_at) AS first_at, MAX(redeemed_at) AS last_at
+                    FROM key_redemptions
+                    GROUP BY user_id, platform
+                ) per_platform
+                GROUP BY user_id
+                ON CONFLICT (user_id) DO NOTHING
+            """)
         
         # Create banned_users table
         cur.execute("""
@@ -171,7 +371,7 @@ def init_database():
             CREATE TABLE IF NOT EXISTS giveaway_participants (
                 id SERIAL PRIMARY KEY,
                 giveaway_id INTEGER REFERENCES giveaways(id) ON DELETE CASCADE,
-                user_id VARCHAR(50) NOT NULL,
+                user_id BIGINT NOT NULL,
                 joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 UNIQUE(giveaway_id, user_id)
             )
@@ -189,6 +389,18 @@ def init_database():
             )
         """)
         
+        # Create jobs table for background admin operations
+        from jobs import create_jobs_table
+        create_jobs_table(cur)
+        
+        # Create NOTIFY triggers feeding the admin panel's live events
+        from events import create_event_triggers
+        create_event_triggers(cur, [platform_key for platform_key, _, _ in platforms])
+        
+        # Create version counters behind the admin API's ETags
+        from resource_versions import create_version_triggers
+        create_version_triggers(cur, [platform_key for platform_key, _, _ in platforms])
+        
         # Create indexes for better performance
         for platform_key, platform_name, emoji in platforms:
             cur.execute(f"""
@@ -203,16 +415,12 @@ def init_database():
                 CREATE INDEX IF NOT EXISTS idx_{platform_key}_keys_code 
                 ON {platform_key}_keys(key_code)
             """)
-        
-        # Index for redemptions
-        cur.execute("""
-            CREATE INDEX IF NOT EXISTS idx_redemptions_platform 
-            ON key_redemptions(platform)
-        """)
-        cur.execute("""
-            CREATE INDEX IF NOT EXISTS idx_redemptions_user 
-            ON key_redemptions(user_id)
-        """)
+            # Claim history pages walk this index newest first
+            cur.execute(f"""
+                CREATE INDEX IF NOT EXISTS idx_{platform_key}_creds_claimed_at
+                ON {platform_key}_credentials(claimed_at DESC, id DESC)
+                WHERE status = 'claimed' AND claimed_by IS NOT NULL AND claimed_at IS NOT NULL
+            """)
         
         # Insert default admin if not exists
         default_admin_username = os.getenv('ADMIN_USERNAME', 'admin')
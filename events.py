@@ -0,0 +1,211 @@
+"""
+Live admin panel events over Server-Sent Events.
+
+Triggers on key_redemptions and every {platform}_credentials table publish
+a small JSON payload with pg_notify on the `vault_events` channel. Each API
+worker process runs one listener thread on its own (unpooled) connection
+that LISTENs on the channel and fans every notification out to the queues
+of the SSE clients connected to that process. A client that cannot keep up
+loses events rather than slowing the others down; it resyncs by refetching
+whenever it reconnects.
+
+Event payloads:
+    {"type": "redemption", "platform", "id", "key_code", "user_id",
+     "username", "full_name", "redeemed_at"}
+    {"type": "credentials", "platform", "op"}   # op: INSERT|UPDATE|DELETE
+    {"type": "resync"}   # the listener reconnected and may have missed events
+"""
+import os
+import json
+import time
+import queue
+import select
+import logging
+import threading
+
+from psycopg2 import extensions
+
+from db_setup import open_connection
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'vault_events'
+
+# Events buffered per client before newer ones are dropped
+QUEUE_SIZE = int(os.getenv('EVENTS_QUEUE_SIZE', '100'))
+# Seconds between select() wakeups of the listener
+LISTEN_TIMEOUT = 5.0
+# Seconds to wait before reconnecting a lost listener connection
+RECONNECT_DELAY = 5.0
+# Threads of a threaded worker kept free of streams for ordinary requests
+RESERVED_THREADS = int(os.getenv('EVENTS_RESERVED_THREADS', '2'))
+
+EVENTS_RECEIVED = REGISTRY.counter(
+    'events_received_total',
+    'Notifications received by this process, by type',
+    ['type'])
+EVENTS_DROPPED = REGISTRY.counter(
+    'events_dropped_total',
+    'Events dropped because a client queue was full')
+STREAMS_OPENED = REGISTRY.counter(
+    'events_streams_opened_total',
+    'SSE streams opened')
+STREAMS_REJECTED = REGISTRY.counter(
+    'events_streams_rejected_total',
+    'SSE streams refused because the process was at its client limit')
+
+
+def stream_capacity(worker_class, threads):
+    """Get how many streams a worker process can hold open (None for no limit)"""
+    configured = os.getenv('EVENTS_MAX_CLIENTS')
+    if configured:
+        return int(configured)
+    if worker_class == 'gevent':
+        # A stream is a greenlet parked on its queue, not a thread
+        return None
+    return max(threads - RESERVED_THREADS, 1)
+
+
+def create_event_triggers(cur, platforms):
+    """Create the NOTIFY triggers on key_redemptions and the credential tables"""
+    cur.execute(f"""
+        CREATE OR REPLACE FUNCTION notify_redemption() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('{CHANNEL}', json_build_object(
+                'type', 'redemption',
+                'platform', NEW.platform,
+                'id', NEW.id,
+                'key_code', NEW.key_code,
+                'user_id', NEW.user_id,
+                'username', NEW.username,
+                'full_name', NEW.full_name,
+                'redeemed_at', NEW.redeemed_at
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    # Statement-level so bulk uploads and deletes send one event, not one per row
+    cur.execute(f"""
+        CREATE OR REPLACE FUNCTION notify_credentials() RETURNS trigger AS $$
+        BEGIN
+            PERFORM pg_notify('{CHANNEL}', json_build_object(
+                'type', 'credentials',
+                'platform', TG_ARGV[0],
+                'op', TG_OP
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+    cur.execute("DROP TRIGGER IF EXISTS key_redemptions_notify ON key_redemptions")
+    cur.execute("""
+        CREATE TRIGGER key_redemptions_notify
+        AFTER INSERT ON key_redemptions
+        FOR EACH ROW EXECUTE FUNCTION notify_redemption()
+    """)
+    for platform in platforms:
+        cur.execute(f"DROP TRIGGER IF EXISTS {platform}_credentials_notify ON {platform}_credentials")
+        cur.execute(f"""
+            CREATE TRIGGER {platform}_credentials_notify
+            AFTER INSERT OR UPDATE OR DELETE ON {platform}_credentials
+            FOR EACH STATEMENT EXECUTE FUNCTION notify_credentials('{platform}')
+        """)
+
+
+class EventBroker:
+    """One LISTEN connection per process, fanned out to per-client queues"""
+
+    def __init__(self, max_clients=None):
+        self.max_clients = max_clients
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._listener_pid = None
+
+    def subscribe(self):
+        """Register a client; returns the queue its events are put on, or None if the process is full"""
+        q = queue.Queue(maxsize=QUEUE_SIZE)
+        with self._lock:
+            if self.max_clients is not None and len(self._subscribers) >= self.max_clients:
+                return None
+            self._subscribers.add(q)
+        self._ensure_listener()
+        return q
+
+    def unsubscribe(self, q):
+        """Remove a client's queue"""
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def client_count(self):
+        """Get the number of clients connected to this process"""
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event):
+        """Put an event on every client's queue"""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            try:
+                q.put_nowait(event)
+            except queue.Full:
+                EVENTS_DROPPED.inc()
+
+    def _ensure_listener(self):
+        # Checked by PID so a forked worker starts its own listener
+        if self._listener_pid == os.getpid():
+            return
+        with self._lock:
+            if self._listener_pid == os.getpid():
+                return
+            self._listener_pid = os.getpid()
+            threading.Thread(target=self._listen_loop, name='events-listener', daemon=True).start()
+
+    def _listen_loop(self):
+        reconnecting = False
+        while True:
+            conn = None
+            try:
+                conn = open_connection()
+                conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                cur = conn.cursor()
+                cur.execute(f"LISTEN {CHANNEL}")
+                cur.close()
+                logger.info(f"Listening for {CHANNEL} notifications")
+                if reconnecting:
+                    # Notifications sent while disconnected are lost; clients refetch
+                    self.publish({'type': 'resync'})
+                while True:
+                    if select.select([conn], [], [], LISTEN_TIMEOUT) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._dispatch(conn.notifies.pop(0).payload)
+            except Exception as e:
+                logger.warning(f"Event listener error, reconnecting: {e}")
+                reconnecting = True
+            finally:
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except Exception:
+                        pass
+            time.sleep(RECONNECT_DELAY)
+
+    def _dispatch(self, payload):
+        try:
+            event = json.loads(payload)
+        except ValueError:
+            logger.warning(f"Ignoring malformed event payload: {payload!r}")
+            return
+        EVENTS_RECEIVED.inc(type=event.get('type', 'unknown'))
+        self.publish(event)
+
+
+# Outside gunicorn (the development server starts a thread per request)
+# streams are limited only by EVENTS_MAX_CLIENTS; gunicorn's post_fork sizes
+# the limit from the worker's threads
+BROKER = EventBroker(int(os.environ['EVENTS_MAX_CLIENTS']) if os.getenv('EVENTS_MAX_CLIENTS') else None)
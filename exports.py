@@ -0,0 +1,163 @@
+"""
+Streaming exports of keys, credentials and redemptions.
+
+Rows are read through server-side (named) cursors in EXPORT_BATCH_SIZE
+batches and serialized to CSV or NDJSON chunk by chunk, optionally gzipped,
+so memory stays flat no matter how many rows are exported. The generators
+hold one pooled connection until the last chunk has been sent.
+"""
+import io
+import os
+import csv
+import json
+import zlib
+import uuid
+from datetime import datetime, date
+
+from db_setup import get_db_connection
+from db_helpers import PLATFORMS
+
+# Rows fetched per round trip from the server-side cursor
+BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', '2000'))
+# Serialized output is flushed to the client in chunks of roughly this size
+CHUNK_SIZE = 64 * 1024
+
+FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson'
+}
+
+KEY_COLUMNS = ['id', 'platform', 'key_code', 'uses', 'remaining_uses', 'account_text',
+               'status', 'created_at', 'redeemed_at', 'giveaway_generated', 'giveaway_winner']
+CREDENTIAL_COLUMNS = ['id', 'platform', 'email', 'password', 'status', 'claimed_by',
+                      'claimed_by_username', 'claimed_by_name', 'claimed_at', 'created_at']
+REDEMPTION_COLUMNS = ['id', 'platform', 'key_code', 'user_id', 'username', 'full_name',
+                      'redeemed_at']
+
+
+def _iter_named(cur_name, conn, sql, params=()):
+    """Iterate over a query through a server-side cursor, BATCH_SIZE rows at a time"""
+    cur = conn.cursor(name=cur_name)
+    try:
+        cur.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(BATCH_SIZE)
+            if not rows:
+                return
+            yield from rows
+    finally:
+        cur.close()
+
+
+def iter_keys(platforms):
+    """Yield key rows (KEY_COLUMNS) for the given platforms"""
+    with get_db_connection() as conn:
+        for platform in platforms:
+            yield from _iter_named(f"export_keys_{uuid.uuid4().hex}", conn, f"""
+                SELECT id, '{platform}', key_code, uses, remaining_uses, account_text,
+                       status, created_at, redeemed_at, giveaway_generated, giveaway_winner
+                FROM {platform}_keys
+                ORDER BY id
+            """)
+
+
+def iter_credentials(platforms):
+    """Yield credential rows (CREDENTIAL_COLUMNS) for the given platforms"""
+    with get_db_connection() as conn:
+        for platform in platforms:
+            yield from _iter_named(f"export_credentials_{uuid.uuid4().hex}", conn, f"""
+                SELECT id, '{platform}', email, password, status, claimed_by,
+                       claimed_by_username, claimed_by_name, claimed_at, created_at
+                FROM {platform}_credentials
+                ORDER BY id
+            """)
+
+
+def iter_redemptions(platform=None, user_id=None, since=None, until=None):
+    """Yield redemption rows (REDEMPTION_COLUMNS), oldest first"""
+    conditions = []
+    params = []
+    if platform:
+        conditions.append("platform = %s")
+        params.append(platform)
+    if user_id:
+        conditions.append("user_id = %s")
+        params.append(user_id)
+    if since:
+        conditions.append("redeemed_at >= %s")
+        params.append(since)
+    if until:
+        conditions.append("redeemed_at < %s")
+        params.append(until)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    with get_db_connection() as conn:
+        yield from _iter_named(f"export_redemptions_{uuid.uuid4().hex}", conn, f"""
+            SELECT {', '.join(REDEMPTION_COLUMNS)}
+            FROM key_redemptions
+            {where}
+            ORDER BY redeemed_at, id
+        """, params)
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _serialize_csv(columns, rows):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for row in rows:
+        writer.writerow([_json_value(v) for v in row])
+        if buffer.tell() >= CHUNK_SIZE:
+            yield buffer.getvalue().encode()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _serialize_ndjson(columns, rows):
+    parts = []
+    size = 0
+    for row in rows:
+        line = json.dumps(dict(zip(columns, (_json_value(v) for v in row))),
+                          ensure_ascii=False) + '\n'
+        parts.append(line)
+        size += len(line)
+        if size >= CHUNK_SIZE:
+            yield ''.join(parts).encode()
+            parts, size = [], 0
+    if parts:
+        yield ''.join(parts).encode()
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def stream_export(columns, rows, fmt='csv', compress=False):
+    """Serialize rows to CSV or NDJSON chunks, optionally gzipped"""
+    if fmt == 'ndjson':
+        chunks = _serialize_ndjson(columns, rows)
+    else:
+        chunks = _serialize_csv(columns, rows)
+    return _gzip(chunks) if compress else chunks
+
+
+def resolve_platforms(platform):
+    """Get the platform tables to export for a ?platform= value (all if empty)"""
+    if not platform or platform == 'all':
+        return list(PLATFORMS)
+    platform = platform.lower()
+    if platform not in PLATFORMS:
+        raise ValueError('Invalid platform')
+    return [platform]
@@ -0,0 +1,136 @@
+"""
+Gunicorn configuration for the admin API (gunicorn -c gunicorn_config.py api_server:app).
+
+GUNICORN_PROFILE picks how requests are served:
+
+    gthread  (default) threaded workers; CPU + 1 processes x GUNICORN_THREADS (8).
+             Slow requests and event streams each hold one thread, not a process.
+    gevent   one process per CPU with GUNICORN_WORKER_CONNECTIONS (1000)
+             greenlets each; needs `gevent` and `psycogreen` installed, falls
+             back to gthread otherwise.
+    sync     2 x CPU + 1 single-threaded processes; for CPU-bound benchmarks.
+    legacy   the previous fixed 2 workers x 2 threads.
+
+GUNICORN_WORKERS, GUNICORN_THREADS and GUNICORN_WORKER_CLASS override the
+profile. GUNICORN_PRELOAD=true imports the app once in the master so workers
+share its memory (the static bundle, compiled modules). Database pools are
+never shared: post_fork gives each worker its own pool with DB_POOL_MIN
+connections open and validated before it accepts requests, and worker_exit
+closes them. Unless DB_POOL_MAX is set, each worker's pool is sized so that
+all workers' pools plus their LISTEN connections for live events stay within
+DB_CONNECTION_BUDGET (80, under PostgreSQL's default max_connections of 100
+with room for the bot and maintenance); requests beyond a worker's pool wait
+for a free connection. post_fork also sizes the worker's live event stream limit
+(events.stream_capacity): the threads not reserved for ordinary requests
+under gthread and sync, none under gevent.
+"""
+import os
+import logging
+import multiprocessing
+
+logger = logging.getLogger('gunicorn.error')
+
+CPU_COUNT = multiprocessing.cpu_count()
+
+
+def _env_int(name, default):
+    value = os.getenv(name)
+    return int(value) if value else default
+
+
+def _gevent_available():
+    try:
+        import gevent  # noqa: F401
+        import psycogreen  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+PROFILES = {
+    'gthread': {'worker_class': 'gthread', 'workers': CPU_COUNT + 1, 'threads': 8},
+    'gevent': {'worker_class': 'gevent', 'workers': CPU_COUNT, 'threads': 1},
+    'sync': {'worker_class': 'sync', 'workers': 2 * CPU_COUNT + 1, 'threads': 1},
+    'legacy': {'worker_class': 'gthread', 'workers': 2, 'threads': 2},
+}
+
+
+def resolve_profile(name=None):
+    """Get the (profile name, settings) to run with, after env overrides"""
+    name = (name or os.getenv('GUNICORN_PROFILE', 'gthread')).lower()
+    if name not in PROFILES:
+        raise ValueError(f"Unknown GUNICORN_PROFILE {name!r}; choose from {', '.join(PROFILES)}")
+    if name == 'gevent' and not _gevent_available():
+        logger.warning("gevent profile needs gevent and psycogreen installed; using gthread")
+        name = 'gthread'
+
+    settings = dict(PROFILES[name])
+    settings['worker_class'] = os.getenv('GUNICORN_WORKER_CLASS', settings['worker_class'])
+    settings['workers'] = _env_int('GUNICORN_WORKERS', _env_int('WEB_CONCURRENCY', settings['workers']))
+    settings['threads'] = _env_int('GUNICORN_THREADS', settings['threads'])
+    return name, settings
+
+
+profile, _settings = resolve_profile()
+
+bind = f"0.0.0.0:{os.getenv('PORT', '10000')}"
+worker_class = _settings['worker_class']
+workers = _settings['workers']
+threads = _settings['threads']
+worker_connections = _env_int('GUNICORN_WORKER_CONNECTIONS', 1000)
+db_connection_budget = _env_int('DB_CONNECTION_BUDGET', 80)
+timeout = _env_int('GUNICORN_TIMEOUT', 120)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+preload_app = os.getenv('GUNICORN_PRELOAD', 'false').lower() in ('1', 'true', 'yes')
+accesslog = '-'
+errorlog = '-'
+
+
+def pool_size(workers, budget):
+    """Get the per-worker pool maximum that keeps every worker within the budget"""
+    import db_setup
+    if os.getenv('DB_POOL_MAX'):
+        return db_setup.DB_POOL_MAX
+    # One connection per worker is its LISTEN connection for live events
+    return max(min(budget // workers - 1, db_setup.DB_POOL_MAX), db_setup.DB_POOL_MIN)
+
+
+def when_ready(server):
+    server.log.info(f"Worker profile {profile}: {workers} x {worker_class}"
+                    f"{f' ({threads} threads)' if worker_class == 'gthread' else ''}"
+                    f"{', preloaded' if preload_app else ''}")
+    per_worker = pool_size(workers, db_connection_budget)
+    total = workers * (per_worker + 1)
+    server.log.info(f"Database connections: up to {per_worker} pooled + 1 LISTEN per worker, "
+                    f"{total} in total (budget {db_connection_budget})")
+    if total > db_connection_budget:
+        server.log.warning(f"DB_POOL_MAX={per_worker} lets {workers} workers open {total} "
+                           f"connections, more than DB_CONNECTION_BUDGET={db_connection_budget}")
+
+
+def post_fork(server, worker):
+    if worker_class == 'gevent':
+        # psycopg2 blocks the whole process unless its waits go through gevent
+        from psycogreen.gevent import patch_psycopg
+        patch_psycopg()
+
+    # A preloaded app may have opened a pool in the master; its sockets are
+    # shared with every other worker, so drop it and open this worker's own,
+    # warmed up before the worker starts accepting requests
+    import db_setup
+    db_setup.DB_POOL_MAX = pool_size(workers, db_connection_budget)
+    from db_backends import get_backend
+    get_backend().init_worker()
+
+    import events
+    events.BROKER.max_clients = events.stream_capacity(worker_class, threads)
+
+
+def worker_exit(server, worker):
+    from db_backends import get_backend
+    get_backend().close()
+
+    # The next scrape must not merge the exited worker's counters
+    from metrics import remove_snapshot
+    remove_snapshot(worker.pid)
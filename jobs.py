@@ -0,0 +1,303 @@
+"""
+Background jobs for long admin operations.
+
+Jobs are rows in the `jobs` table so any API worker can report on them.
+Endpoints submit a job and return its ID immediately; a small thread pool in
+each worker process claims queued jobs (SELECT ... FOR UPDATE SKIP LOCKED),
+runs the registered handler and stores its progress and result. A poller
+thread picks up jobs queued by workers that were busy or have exited, and
+fails running jobs whose progress stopped updating for JOB_STALE_SECONDS.
+
+Handlers are registered with @job('kind') and receive a JobContext and the
+job's params; their return value is stored as the job result.
+"""
+import os
+import time
+import uuid
+import socket
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from psycopg2.extras import Json
+
+from db_setup import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+WORKERS = int(os.getenv('JOB_WORKERS', '2'))
+POLL_INTERVAL = float(os.getenv('JOB_POLL_INTERVAL', '5'))
+STALE_AFTER = float(os.getenv('JOB_STALE_SECONDS', '600'))
+RETENTION_DAYS = float(os.getenv('JOB_RETENTION_DAYS', '7'))
+
+# Progress is written at most this often per job
+PROGRESS_INTERVAL = 0.5
+
+# Params carrying uploaded data, dropped from the row once the job has finished
+PAYLOAD_PARAMS = frozenset({'content'})
+
+_handlers = {}
+
+_executor = None
+_worker_pid = None
+_worker_lock = threading.Lock()
+_active = 0
+_active_lock = threading.Lock()
+
+
+def create_jobs_table(cur):
+    """Create the jobs table"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS jobs (
+            id VARCHAR(32) PRIMARY KEY,
+            kind VARCHAR(50) NOT NULL,
+            status VARCHAR(20) NOT NULL DEFAULT 'queued',
+            params JSONB NOT NULL DEFAULT '{}'::jsonb,
+            progress INTEGER NOT NULL DEFAULT 0,
+            total INTEGER,
+            result JSONB,
+            error TEXT,
+            created_by VARCHAR(100),
+            worker VARCHAR(100),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            started_at TIMESTAMP,
+            finished_at TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_jobs_queued
+        ON jobs(created_at) WHERE status = 'queued'
+    """)
+
+
+def job(kind):
+    """Register a function as the handler for a job kind"""
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+class JobContext:
+    """Handle passed to job handlers for reporting progress"""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self._last_report = 0.0
+
+    def progress(self, done, total=None, force=False):
+        """Record how much of the job is done (throttled)"""
+        now = time.monotonic()
+        if not force and now - self._last_report < PROGRESS_INTERVAL:
+            return
+        self._last_report = now
+        with get_db_connection() as conn:
+            cur = conn.cursor()
+            cur.execute("""
+                UPDATE jobs
+                SET progress = %s, total = COALESCE(%s, total), updated_at = CURRENT_TIMESTAMP
+                WHERE id = %s
+            """, (done, total, self.job_id))
+            cur.close()
+
+
+def _serialize(row, with_result=True):
+    job = {
+        'id': row[0],
+        'kind': row[1],
+        'status': row[2],
+        'progress': row[3],
+        'total': row[4],
+        'result': row[5],
+        'error': row[6],
+        'created_by': row[7],
+        'created_at': row[8].isoformat() if row[8] else None,
+        'started_at': row[9].isoformat() if row[9] else None,
+        'finished_at': row[10].isoformat() if row[10] else None
+    }
+    if not with_result:
+        del job['result']
+    return job
+
+
+_JOB_COLUMNS = """id, kind, status, progress, total, result, error, created_by,
+                  created_at, started_at, finished_at"""
+
+
+def get_job(job_id):
+    """Get a job's status, progress and result"""
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT {_JOB_COLUMNS} FROM jobs WHERE id = %s", (job_id,))
+        row = cur.fetchone()
+        cur.close()
+    return _serialize(row) if row else None
+
+
+def list_jobs(limit=20):
+    """Get the most recent jobs, without their results"""
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"SELECT {_JOB_COLUMNS} FROM jobs ORDER BY created_at DESC LIMIT %s", (limit,))
+        rows = cur.fetchall()
+        cur.close()
+    return [_serialize(row, with_result=False) for row in rows]
+
+
+def submit(kind, params=None, created_by=None):
+    """Queue a job and start it on this worker's pool; returns the job ID"""
+    if kind not in _handlers:
+        raise ValueError(f"Unknown job kind: {kind}")
+
+    job_id = uuid.uuid4().hex
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            INSERT INTO jobs (id, kind, params, created_by)
+            VALUES (%s, %s, %s, %s)
+        """, (job_id, kind, Json(params or {}), created_by))
+        cur.close()
+
+    start_worker()
+    _start(job_id)
+    return job_id
+
+
+def _start(job_id=None):
+    global _active
+    with _active_lock:
+        _active += 1
+    _executor.submit(_run, job_id)
+
+
+def _worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+def _claim(job_id=None):
+    """Mark a queued job (a specific one, or the oldest) as running"""
+    worker = _worker_name()
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute(f"""
+            UPDATE jobs
+            SET status = 'running', worker = %s, started_at = CURRENT_TIMESTAMP,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE id = (
+                SELECT id FROM jobs
+                WHERE status = 'queued' {'AND id = %s' if job_id else ''}
+                ORDER BY created_at
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, kind, params
+        """, (worker, job_id) if job_id else (worker,))
+        row = cur.fetchone()
+        cur.close()
+    return row
+
+
+def _finish(job_id, status, params, result=None, error=None):
+    params = {key: value for key, value in (params or {}).items() if key not in PAYLOAD_PARAMS}
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            UPDATE jobs
+            SET status = %s, params = %s, result = %s, error = %s,
+                progress = CASE WHEN %s THEN COALESCE(total, progress) ELSE progress END,
+                finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+            WHERE id = %s AND status = 'running' AND worker = %s
+        """, (status, Json(params), Json(result) if result is not None else None, error,
+              status == 'succeeded', job_id, _worker_name()))
+        finished = cur.rowcount > 0
+        if not finished:
+            # The poller failed it as stale meanwhile: keep that outcome, but
+            # still drop the uploaded data
+            cur.execute("UPDATE jobs SET params = %s WHERE id = %s", (Json(params), job_id))
+        cur.close()
+    if not finished:
+        logger.warning(f"Job {job_id} finished as {status} after it was marked failed as stale; "
+                       "outcome not stored")
+
+
+def _run(job_id=None):
+    global _active
+    try:
+        claimed = _claim(job_id)
+        if not claimed:
+            return
+        job_id, kind, params = claimed
+
+        handler = _handlers.get(kind)
+        if handler is None:
+            _finish(job_id, 'failed', params, error=f"Unknown job kind: {kind}")
+            return
+
+        logger.info(f"Running job {job_id} ({kind})")
+        try:
+            result = handler(JobContext(job_id), params)
+        except Exception as e:
+            logger.error(f"Job {job_id} ({kind}) failed: {e}", exc_info=True)
+            _finish(job_id, 'failed', params, error=str(e))
+        else:
+            _finish(job_id, 'succeeded', params, result=result)
+    except Exception as e:
+        logger.error(f"Job runner error: {e}", exc_info=True)
+    finally:
+        with _active_lock:
+            _active -= 1
+
+
+def _poll_once():
+    """Fail stale running jobs, delete old finished ones and pick up jobs nobody has started"""
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        cur.execute("""
+            UPDATE jobs
+            SET status = 'failed', error = 'Job stopped reporting progress (worker exited or timed out)',
+                finished_at = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+            WHERE status = 'running'
+              AND updated_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+        """, (STALE_AFTER,))
+        cur.execute("""
+            DELETE FROM jobs
+            WHERE finished_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+        """, (RETENTION_DAYS * 86400,))
+        # Jobs younger than one poll interval are left to the worker that queued them
+        cur.execute("""
+            SELECT COUNT(*) FROM jobs
+            WHERE status = 'queued'
+              AND created_at < CURRENT_TIMESTAMP - make_interval(secs => %s)
+        """, (POLL_INTERVAL,))
+        queued = cur.fetchone()[0]
+        cur.close()
+
+    with _active_lock:
+        free = WORKERS - _active
+    for _ in range(min(queued, free)):
+        _start()
+
+
+def _poll_loop():
+    while True:
+        time.sleep(POLL_INTERVAL)
+        try:
+            _poll_once()
+        except Exception as e:
+            logger.warning(f"Job poller error: {e}")
+
+
+def start_worker():
+    """Start this process's job thread pool and poller (idempotent)"""
+    global _executor, _worker_pid, _active
+    if _worker_pid == os.getpid():
+        return
+    with _worker_lock:
+        # Checked by PID so a forked worker starts its own pool
+        if _worker_pid == os.getpid():
+            return
+        _executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix='job')
+        _active = 0
+        _worker_pid = os.getpid()
+        threading.Thread(target=_poll_loop, name='job-poller', daemon=True).start()
@@ -0,0 +1,62 @@
+"""
+JSON provider for the admin API.
+
+Uses orjson when it is installed and the standard library otherwise. Both
+serialize datetime/date values as ISO 8601 (Flask's default provider emits
+HTTP dates), so views can return database timestamps as they are instead of
+calling .isoformat() per field. Keys are not sorted.
+
+API_JSON_PROVIDER=json forces the standard library encoder.
+"""
+import os
+import uuid
+import decimal
+from datetime import date
+
+from flask.json.provider import DefaultJSONProvider, JSONProvider
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+
+def _default(o):
+    """Serialize types neither encoder handles natively"""
+    if isinstance(o, date):
+        return o.isoformat()
+    if isinstance(o, (decimal.Decimal, uuid.UUID)):
+        return str(o)
+    if hasattr(o, '__html__'):
+        return str(o.__html__())
+    raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class StdlibJSONProvider(DefaultJSONProvider):
+    """Standard library encoder with ISO 8601 datetimes"""
+    default = staticmethod(_default)
+    sort_keys = False
+
+
+class OrjsonProvider(JSONProvider):
+    """orjson encoder; responses are built from bytes without a decode/encode round trip"""
+    OPTIONS = orjson.OPT_NON_STR_KEYS if orjson else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=_default, option=self.OPTIONS).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, default=_default, option=self.OPTIONS | orjson.OPT_APPEND_NEWLINE),
+            mimetype='application/json')
+
+
+def get_provider_class():
+    """Pick the JSON provider: orjson if installed, unless API_JSON_PROVIDER=json"""
+    if orjson is not None and os.getenv('API_JSON_PROVIDER', 'auto').lower() != 'json':
+        return OrjsonProvider
+    return StdlibJSONProvider
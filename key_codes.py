@@ -0,0 +1,72 @@
+"""
+Key code format and validation.
+
+New codes are PLATFORM-XXXX-XXXX-XXXX-XXXC: fifteen random characters from
+[0-9A-Z] and a Luhn mod 36 check character computed over everything before
+it (platform prefix included, dashes ignored). The check catches every
+single mistyped character and nearly every swap of two neighbouring ones,
+so typos and guessed codes are rejected in pure Python before the database
+is asked.
+
+Codes generated before the check character existed (PLATFORM-XXXX-XXXX-XXXX)
+stay redeemable: they are recognised by their three groups and only checked
+for shape and platform prefix.
+"""
+import re
+import secrets
+
+from db_helpers import PLATFORMS
+
+ALPHABET = '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+_VALUES = {char: value for value, char in enumerate(ALPHABET)}
+_BASE = len(ALPHABET)
+
+PREFIXES = frozenset(platform.upper() for platform in PLATFORMS)
+
+# PREFIX then three (legacy) or four (checked) groups of four characters
+_CODE = re.compile(r'^([A-Z0-9]+)((?:-[A-Z0-9]{4}){3,4})$')
+LEGACY_GROUPS = 3
+GROUPS = 4
+
+
+def _luhn_sum(chars, double_first):
+    total = 0
+    double = double_first
+    for char in reversed(chars):
+        addend = _VALUES[char] * (2 if double else 1)
+        total += addend // _BASE + addend % _BASE
+        double = not double
+    return total % _BASE
+
+
+def check_character(body):
+    """Get the Luhn mod 36 check character for a code body (dashes ignored)"""
+    chars = body.replace('-', '')
+    return ALPHABET[(_BASE - _luhn_sum(chars, True)) % _BASE]
+
+
+def generate_key_code(platform):
+    """Generate a random key code with a check character"""
+    random_chars = ''.join(secrets.choice(ALPHABET) for _ in range(GROUPS * 4 - 1))
+    body = f"{platform.upper()}-" + '-'.join(
+        random_chars[i:i + 4] for i in range(0, len(random_chars), 4))
+    return body + check_character(body)
+
+
+def validate(code):
+    """Get why a normalized (stripped, upper-case) code cannot exist, or None if it may"""
+    match = _CODE.match(code)
+    if not match:
+        return 'format'
+    if match.group(1) not in PREFIXES:
+        return 'platform'
+    if match.group(2).count('-') == LEGACY_GROUPS:
+        return None
+    if _luhn_sum(code.replace('-', ''), False) != 0:
+        return 'checksum'
+    return None
+
+
+def is_plausible(code):
+    """Check whether a normalized code is worth looking up"""
+    return validate(code) is None
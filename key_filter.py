@@ -0,0 +1,336 @@
+"""
+In-memory filter of redeemable key codes.
+
+A Bloom filter over every key_code with status 'active' and uses left,
+across all platform tables, answers "definitely not redeemable" without a
+database round trip, so unknown and used-up codes are turned away before
+get_key_by_code scans the tables. A "maybe" still goes to the database.
+
+The filter is built by a background thread when the bot starts and rebuilt
+every KEY_FILTER_REBUILD_SECONDS (which drops keys used up or deleted since).
+Between rebuilds it is kept current incrementally:
+
+    add_key                codes added in this process go in immediately
+    redeem_key             codes whose last use was taken are remembered as
+                           exhausted (a Bloom filter cannot remove entries)
+    other processes        keys inserted by the admin panel are picked up on
+                           the next miss once the keys:<platform> version
+                           counters move (checked at most every
+                           KEY_FILTER_CHECK_SECONDS), by reading rows with an
+                           id above the last one seen; exhausted codes that
+                           were given uses again or re-activated are found
+                           by the same check and stop being turned away
+
+Until the first build finishes every code is "maybe", so the filter never
+turns away a key the database would accept except within one check interval
+of another process creating it.
+"""
+import os
+import math
+import time
+import hashlib
+import logging
+import threading
+
+from db_setup import get_db_connection
+from metrics import REGISTRY
+from resource_versions import get_version, resource_names
+
+logger = logging.getLogger(__name__)
+
+ERROR_RATE = float(os.getenv('KEY_FILTER_ERROR_RATE', '0.001'))
+REBUILD_SECONDS = float(os.getenv('KEY_FILTER_REBUILD_SECONDS', '3600'))
+CHECK_SECONDS = float(os.getenv('KEY_FILTER_CHECK_SECONDS', '1'))
+RETRY_SECONDS = 60
+# Room for keys added between rebuilds before the error rate degrades
+MIN_CAPACITY = 100000
+GROWTH = 1.25
+# Rows read per query while building
+SCAN_PAGE = 50000
+# Ids re-read below the high-water mark on a sync: a transaction that took a
+# lower id may commit after a higher one was already seen
+SYNC_OVERLAP = 100
+
+LOOKUPS = REGISTRY.counter(
+    'key_filter_lookups_total',
+    'Key filter answers: absent and exhausted skip the database, maybe and unready do not',
+    ['result'])
+REBUILDS = REGISTRY.counter(
+    'key_filter_rebuilds_total',
+    'Key filter builds and incremental syncs, by kind and outcome',
+    ['kind', 'outcome'])
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter of strings"""
+
+    def __init__(self, capacity, error_rate=ERROR_RATE):
+        capacity = max(int(capacity), 1)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.size = max(int(-capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(int(round(self.size / capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, item):
+        # Double hashing: k positions from two 64-bit halves of one digest
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        size = self.size
+        return [(h1 + i * h2) % size for i in range(self.hashes)]
+
+    def add(self, item):
+        """Add an item; returns False if it was (probably) already present"""
+        bits = self.bits
+        new = False
+        for position in self._positions(item):
+            mask = 1 << (position & 7)
+            if not bits[position >> 3] & mask:
+                bits[position >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def __contains__(self, item):
+        bits = self.bits
+        for position in self._positions(item):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def memory_bytes(self):
+        """Get the size of the bit array"""
+        return len(self.bits)
+
+    def expected_error_rate(self):
+        """Get the false positive rate expected at the current fill"""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+
+def _platforms():
+    from db_helpers import PLATFORMS
+    return PLATFORMS
+
+
+def _redeemable(cur, platform, codes):
+    cur.execute(f"""
+        SELECT key_code FROM {platform}_keys
+        WHERE key_code = ANY(%s) AND status = 'active' AND remaining_uses > 0
+    """, (codes,))
+    return [row[0] for row in cur.fetchall()]
+
+
+def _scan(cur, platform, after_id, limit):
+    cur.execute(f"""
+        SELECT id, key_code FROM {platform}_keys
+        WHERE id > %s AND status = 'active' AND remaining_uses > 0
+        ORDER BY id
+        LIMIT %s
+    """, (after_id, limit))
+    return cur.fetchall()
+
+
+class KeyFilter:
+    """Process-wide filter of redeemable key codes, rebuilt in the background"""
+
+    def __init__(self):
+        self._bloom = None
+        self._exhausted = set()
+        self._high_water = {}
+        self._version = None
+        self._checked_at = 0.0
+        self._built_at = None
+        # Adds and exhaustions that happen while a build is scanning
+        self._during_build = None
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        """Build the filter in a background thread and rebuild it periodically"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._rebuild_loop, name='key-filter', daemon=True).start()
+
+    def _rebuild_loop(self):
+        while True:
+            try:
+                self.rebuild()
+                delay = REBUILD_SECONDS
+            except Exception as e:
+                REBUILDS.inc(kind='rebuild', outcome='error')
+                logger.error(f"Key filter build failed: {e}")
+                delay = RETRY_SECONDS
+            time.sleep(delay)
+
+    def rebuild(self):
+        """Load every redeemable key code into a new filter and swap it in"""
+        platforms = _platforms()
+        started = time.perf_counter()
+        with self._lock:
+            self._during_build = ([], set())
+        try:
+            # Read first: anything committed after it moves the version again
+            version = get_version(resource_names('keys', platforms))[0]
+            codes = []
+            high_water = {}
+            with get_db_connection() as conn:
+                cur = conn.cursor()
+                for platform in platforms:
+                    last_id = 0
+                    while True:
+                        rows = _scan(cur, platform, last_id, SCAN_PAGE)
+                        codes.extend(row[1] for row in rows)
+                        if rows:
+                            last_id = rows[-1][0]
+                        if len(rows) < SCAN_PAGE:
+                            break
+                    high_water[platform] = last_id
+                cur.close()
+
+            bloom = BloomFilter(max(len(codes) * GROWTH, MIN_CAPACITY))
+            for code in codes:
+                bloom.add(code)
+        except Exception:
+            with self._lock:
+                self._during_build = None
+            raise
+
+        with self._lock:
+            added, exhausted = self._during_build
+            self._during_build = None
+            for code in added:
+                bloom.add(code)
+            self._bloom = bloom
+            self._exhausted = exhausted
+            self._high_water = high_water
+            self._version = version
+            self._checked_at = time.monotonic()
+            self._built_at = time.time()
+        REBUILDS.inc(kind='rebuild', outcome='ok')
+        logger.info(f"Key filter built: {len(codes)} redeemable keys, {bloom.memory_bytes() / 1024:.0f} KiB, "
+                    f"{bloom.hashes} hashes, in {time.perf_counter() - started:.2f} s")
+
+    def add(self, code):
+        """Record a newly created key code"""
+        with self._lock:
+            if self._during_build is not None:
+                self._during_build[0].append(code)
+            self._exhausted.discard(code)
+            if self._bloom is not None:
+                self._bloom.add(code)
+
+    def discard(self, code):
+        """Record that a key code has no uses left"""
+        with self._lock:
+            if self._during_build is not None:
+                self._during_build[1].add(code)
+            if self._bloom is not None:
+                self._exhausted.add(code)
+
+    def might_contain(self, code):
+        """Check whether a key code may be redeemable (False means it certainly is not)"""
+        if self._bloom is None:
+            LOOKUPS.inc(result='unready')
+            return True
+        if code in self._exhausted:
+            # Another process may have given the key uses again
+            if not (self.sync() and code not in self._exhausted):
+                LOOKUPS.inc(result='exhausted')
+                return False
+            LOOKUPS.inc(result='maybe')
+            return True
+        if code in self._bloom:
+            LOOKUPS.inc(result='maybe')
+            return True
+        # Keys created by another process since the last sync
+        if self.sync() and code in self._bloom:
+            LOOKUPS.inc(result='maybe')
+            return True
+        LOOKUPS.inc(result='absent')
+        return False
+
+    def sync(self, force=False):
+        """Add keys inserted or made redeemable again elsewhere since the last sync;
+        returns whether any were found"""
+        if not force and time.monotonic() - self._checked_at < CHECK_SECONDS:
+            return False
+        if not self._sync_lock.acquire(blocking=False):
+            return False
+        try:
+            platforms = _platforms()
+            self._checked_at = time.monotonic()
+            try:
+                version = get_version(resource_names('keys', platforms))[0]
+                if version == self._version:
+                    return False
+                high_water = dict(self._high_water)
+                with self._lock:
+                    exhausted = list(self._exhausted)
+                codes = []
+                revived = []
+                with get_db_connection() as conn:
+                    cur = conn.cursor()
+                    for platform in platforms:
+                        if exhausted:
+                            revived.extend(_redeemable(cur, platform, exhausted))
+                        last_id = max(high_water.get(platform, 0) - SYNC_OVERLAP, 0)
+                        while True:
+                            rows = _scan(cur, platform, last_id, SCAN_PAGE)
+                            codes.extend(row[1] for row in rows)
+                            if rows:
+                                last_id = rows[-1][0]
+                                high_water[platform] = max(high_water.get(platform, 0), last_id)
+                            if len(rows) < SCAN_PAGE:
+                                break
+                    cur.close()
+            except Exception as e:
+                REBUILDS.inc(kind='sync', outcome='error')
+                logger.warning(f"Key filter sync failed: {e}")
+                return False
+
+            with self._lock:
+                if self._bloom is None:
+                    return False
+                for code in codes:
+                    self._bloom.add(code)
+                for code in revived:
+                    self._exhausted.discard(code)
+                    self._bloom.add(code)
+                if self._during_build is not None:
+                    self._during_build[0].extend(codes + revived)
+                    self._during_build[1].difference_update(revived)
+                self._high_water = high_water
+                self._version = version
+            REBUILDS.inc(kind='sync', outcome='ok')
+            return bool(codes or revived)
+        finally:
+            self._sync_lock.release()
+
+    def stats(self):
+        """Get the size and fill of the current filter, or None before the first build"""
+        bloom = self._bloom
+        if bloom is None:
+            return None
+        return {
+            'keys': bloom.count,
+            'capacity': bloom.capacity,
+            'exhausted': len(self._exhausted),
+            'memory_bytes': bloom.memory_bytes(),
+            'hashes': bloom.hashes,
+            'expected_error_rate': bloom.expected_error_rate(),
+            'built_at': self._built_at,
+        }
+
+
+FILTER = KeyFilter()
+
+
+def might_contain(code):
+    """Check the process-wide filter (False means the code is certainly not redeemable)"""
+    return FILTER.might_contain(code)
@@ -0,0 +1,292 @@
+"""
+Minimal metrics registry rendered in the Prometheus text format.
+
+Counters and histograms are created once at import time by the modules that
+record them (db_setup for query timings, the Flask app for request latency,
+the bot for handler and Bot API latency). The bot and every gunicorn worker
+are separate processes, so each one periodically writes a snapshot of its
+registry to METRICS_DIR and /api/metrics merges all live snapshots into a
+single scrape. A process's snapshot is removed when it exits (gunicorn's
+worker_exit hook, atexit), and snapshots of PIDs no longer running are
+skipped and removed on scrape.
+"""
+import os
+import json
+import time
+import atexit
+import tempfile
+import threading
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value):
+    """Escape a label value for the text exposition format"""
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    """Format a label set as {name="value",...}"""
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labelvalues)]
+    if extra:
+        pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_value(value):
+    """Format a sample value"""
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonically increasing value per label set"""
+
+    type_name = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), value] for key, value in self._values.items()]
+
+    def merge(self, values):
+        with self._lock:
+            for key, value in values:
+                key = tuple(key)
+                self._values[key] = self._values.get(key, 0) + value
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            yield self.name, _format_labels(self.labelnames, key), value
+
+
+class Histogram:
+    """Distribution of observed values in cumulative buckets per label set"""
+
+    type_name = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float('inf'),)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(name, '') for name in self.labelnames)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[0][i] += 1
+                    break
+            entry[1] += 1
+            entry[2] += value
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(key), [list(counts), count, total]]
+                    for key, (counts, count, total) in self._values.items()]
+
+    def merge(self, values):
+        with self._lock:
+            for key, (counts, count, total) in values:
+                key = tuple(key)
+                entry = self._values.get(key)
+                if entry is None:
+                    entry = self._values[key] = [[0] * len(self.buckets), 0, 0.0]
+                for i, bucket_count in enumerate(counts[:len(self.buckets)]):
+                    entry[0][i] += bucket_count
+                entry[1] += count
+                entry[2] += total
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(counts), count, total))
+                     for key, (counts, count, total) in self._values.items()]
+        for key, (counts, count, total) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, [('le', _format_value(float(bound)))])
+                yield f"{self.name}_bucket", labels, cumulative
+            labels = _format_labels(self.labelnames, key)
+            yield f"{self.name}_count", labels, count
+            yield f"{self.name}_sum", labels, total
+
+
+class MetricsRegistry:
+    """Collection of named metrics"""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, *args, **kwargs)
+            return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets)
+
+    def snapshot(self):
+        """Get the raw values of all metrics as JSON-serializable data"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: {
+            'type': metric.type_name,
+            'documentation': metric.documentation,
+            'labelnames': list(metric.labelnames),
+            'buckets': [b for b in getattr(metric, 'buckets', ()) if b != float('inf')],
+            'values': metric.snapshot()
+        } for metric in metrics}
+
+    def merge(self, snapshot):
+        """Add the values from a snapshot of another registry"""
+        for name, data in snapshot.items():
+            if data['type'] == 'histogram':
+                metric = self.histogram(name, data['documentation'],
+                                        data['labelnames'], data['buckets'])
+            else:
+                metric = self.counter(name, data['documentation'], data['labelnames'])
+            metric.merge(data['values'])
+
+    def render(self):
+        """Render all metrics in the Prometheus text format"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            for sample_name, labels, value in metric.samples():
+                lines.append(f"{sample_name}{labels} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = MetricsRegistry()
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# Snapshots of every process are written here and merged on scrape
+METRICS_DIR = os.getenv('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'premium-vault-metrics'))
+EXPORT_INTERVAL = float(os.getenv('METRICS_EXPORT_INTERVAL', '10'))
+
+# Snapshots not refreshed for this long belong to processes that have exited
+# (or to another host sharing METRICS_DIR, where the PID check cannot tell)
+STALE_AFTER = max(EXPORT_INTERVAL * 6, 60)
+
+_exporter_pid = None
+_exporter_lock = threading.Lock()
+
+
+def _snapshot_path(pid):
+    return os.path.join(METRICS_DIR, f"{pid}.json")
+
+
+def export_snapshot():
+    """Write this process's metrics snapshot to METRICS_DIR"""
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    path = _snapshot_path(os.getpid())
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(REGISTRY.snapshot(), f)
+    os.replace(tmp_path, path)
+
+
+def remove_snapshot(pid=None):
+    """Delete a process's snapshot (this process's by default)"""
+    try:
+        os.remove(_snapshot_path(pid or os.getpid()))
+    except OSError:
+        pass
+
+
+def _process_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        # Exists but belongs to another user
+        return True
+    return True
+
+
+def _export_loop():
+    while True:
+        time.sleep(EXPORT_INTERVAL)
+        try:
+            export_snapshot()
+        except OSError:
+            pass
+
+
+def start_exporter():
+    """Start the background snapshot writer for the current process (idempotent)"""
+    global _exporter_pid
+    if _exporter_pid == os.getpid():
+        return
+    with _exporter_lock:
+        # Checked by PID so a forked worker starts its own writer
+        if _exporter_pid == os.getpid():
+            return
+        _exporter_pid = os.getpid()
+        threading.Thread(target=_export_loop, name='metrics-exporter', daemon=True).start()
+        atexit.register(remove_snapshot, _exporter_pid)
+
+
+def render_all():
+    """Render this process's live metrics merged with the other processes' snapshots"""
+    combined = MetricsRegistry()
+    combined.merge(REGISTRY.snapshot())
+
+    own_path = _snapshot_path(os.getpid())
+    now = time.time()
+    try:
+        filenames = os.listdir(METRICS_DIR)
+    except OSError:
+        filenames = []
+
+    for filename in filenames:
+        path = os.path.join(METRICS_DIR, filename)
+        if not filename.endswith('.json') or path == own_path:
+            continue
+        pid = filename[:-len('.json')]
+        try:
+            if ((pid.isdigit() and not _process_running(int(pid)))
+                    or now - os.path.getmtime(path) > STALE_AFTER):
+                os.remove(path)
+                continue
+            with open(path) as f:
+                combined.merge(json.load(f))
+        except (OSError, ValueError):
+            continue
+
+    return combined.render()
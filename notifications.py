@@ -0,0 +1,272 @@
+"""
+Coalesced admin notifications for key redemptions and credential claims.
+
+Events are buffered for ADMIN_NOTIFY_WINDOW seconds and every admin then
+receives a single digest with per-platform rollups, instead of one message
+per admin per event. The admin recipient list is cached for
+ADMIN_RECIPIENTS_TTL seconds. Dropped and late notifications are counted in
+the shared metrics registry and logged.
+"""
+import os
+import html
+import time
+import asyncio
+import logging
+from collections import Counter as TallyCounter, deque
+from datetime import datetime
+
+from telegram.error import RetryAfter
+
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+STATIC_ADMIN_ID = 6562270244
+
+# Seconds to collect events before sending a digest (0 sends every event on its own)
+WINDOW = float(os.getenv('ADMIN_NOTIFY_WINDOW', '15'))
+# Most recent events listed individually in a digest; all events count in the rollups
+DIGEST_ITEMS = 10
+# Digests delivered later than this after their first event are reported as late
+LATE_AFTER = WINDOW + float(os.getenv('ADMIN_NOTIFY_LATE_SECONDS', '30'))
+RECIPIENTS_TTL = float(os.getenv('ADMIN_RECIPIENTS_TTL', '300'))
+
+# Telegram rejects messages longer than this
+MAX_MESSAGE_LENGTH = 4096
+
+EVENTS = REGISTRY.counter(
+    'admin_notification_events_total',
+    'Redemption and claim events queued for admin digests',
+    ['kind'])
+SENT = REGISTRY.counter(
+    'admin_notifications_sent_total',
+    'Admin digest messages delivered')
+DROPPED = REGISTRY.counter(
+    'admin_notifications_dropped_total',
+    'Admin notifications that were not delivered',
+    ['reason'])
+LATE = REGISTRY.counter(
+    'admin_notifications_late_total',
+    'Events delivered to admins later than the late threshold')
+DELAY = REGISTRY.histogram(
+    'admin_notification_delay_seconds',
+    'Time from the first event of a digest until it was delivered',
+    buckets=(1, 5, 10, 15, 30, 60, 120, 300, 600))
+
+KEY_REDEEMED = 'key_redeemed'
+CREDENTIAL_CLAIMED = 'credential_claimed'
+
+_recipients = None
+_recipients_loaded_at = 0.0
+
+
+def get_admin_recipients():
+    """Get the Telegram IDs of all admins, cached for RECIPIENTS_TTL seconds"""
+    global _recipients, _recipients_loaded_at
+    now = time.monotonic()
+    if _recipients is not None and now - _recipients_loaded_at < RECIPIENTS_TTL:
+        return _recipients
+
+    from db_helpers import get_all_admin_telegram_ids
+
+    # Admins from the database, the static admin and ADMIN_IDS
+    admin_ids = get_all_admin_telegram_ids()
+    if STATIC_ADMIN_ID not in admin_ids:
+        admin_ids.append(STATIC_ADMIN_ID)
+    for id_str in os.getenv('ADMIN_IDS', '').split(','):
+        id_str = id_str.strip()
+        if id_str.isdigit() and int(id_str) not in admin_ids:
+            admin_ids.append(int(id_str))
+
+    _recipients = admin_ids
+    _recipients_loaded_at = now
+    return admin_ids
+
+
+def invalidate_admin_recipients():
+    """Force the admin recipient list to be reloaded on the next digest"""
+    global _recipients
+    _recipients = None
+
+
+def _user_text(event):
+    """Format the user of an event as 'Name (@username, id)'"""
+    name = html.escape(event['full_name']) if event['full_name'] else "N/A"
+    username = event['username']
+    username = f"@{html.escape(username)}" if username and username != "N/A" else "N/A"
+    return f"{name} ({username}, <code>{event['user_id']}</code>)"
+
+
+def _render_single(event):
+    """Render the detailed message for a window with one event"""
+    username = event['username']
+    username_text = f"@{html.escape(username)}" if username and username != "N/A" else "N/A"
+    full_name_text = html.escape(event['full_name']) if event['full_name'] else "N/A"
+    timestamp = event['at'].strftime('%Y-%m-%d %H:%M:%S')
+
+    if event['kind'] == KEY_REDEEMED:
+        return (
+            f"🎉 <b>Key Redeemed Successfully!</b>\n\n"
+            f"🔑 <b>Key:</b> <code>{html.escape(event['detail'])}</code>\n"
+            f"🎮 <b>Platform:</b> {event['platform']}\n\n"
+            f"👤 <b>User Information:</b>\n"
+            f"├ <b>Name:</b> {full_name_text}\n"
+            f"├ <b>Username:</b> {username_text}\n"
+            f"└ <b>Chat ID:</b> <code>{event['user_id']}</code>\n\n"
+            f"⏰ <b>Redeemed At:</b> {timestamp}"
+        )
+    return (
+        f"📧 <b>Credential Claimed!</b>\n\n"
+        f"🎮 <b>Platform:</b> {event['platform']}\n"
+        f"📧 <b>Email:</b> <code>{html.escape(event['detail'])}</code>\n\n"
+        f"👤 <b>User Details:</b>\n"
+        f"├ <b>Name:</b> {full_name_text}\n"
+        f"├ <b>Chat ID:</b> <code>{event['user_id']}</code>\n"
+        f"└ <b>Username:</b> {username_text}\n\n"
+        f"⏰ <b>Time:</b> {timestamp}"
+    )
+
+
+def _render_rollup(title, tally):
+    """Render a per-platform rollup section"""
+    lines = [f"{title} {sum(tally.values())}"]
+    platforms = tally.most_common()
+    for i, (platform, count) in enumerate(platforms):
+        branch = "└" if i == len(platforms) - 1 else "├"
+        lines.append(f"{branch} {platform}: {count}")
+    return '\n'.join(lines)
+
+
+def render_digest(events, rollups, started_at):
+    """Render one digest message for a window of events"""
+    total = sum(sum(tally.values()) for tally in rollups.values())
+    if total == 1 and len(events) == 1:
+        return _render_single(events[0])
+
+    sections = [f"📬 <b>Activity Digest</b> ({total} events since "
+                f"{started_at.strftime('%H:%M:%S')})"]
+    if rollups.get(KEY_REDEEMED):
+        sections.append(_render_rollup("🔑 <b>Keys Redeemed:</b>", rollups[KEY_REDEEMED]))
+    if rollups.get(CREDENTIAL_CLAIMED):
+        sections.append(_render_rollup("📧 <b>Credentials Claimed:</b>",
+                                       rollups[CREDENTIAL_CLAIMED]))
+
+    # Itemize the most recent events, fewer if the message would be too long
+    for items in range(min(DIGEST_ITEMS, len(events)), -1, -1):
+        latest = events[len(events) - items:] if items else []
+        lines = ["🕒 <b>Latest:</b>"]
+        for event in reversed(latest):
+            icon = "🔑" if event['kind'] == KEY_REDEEMED else "📧"
+            lines.append(f"{icon} {event['at'].strftime('%H:%M:%S')} {event['platform']} "
+                         f"<code>{html.escape(event['detail'])}</code> — {_user_text(event)}")
+        if total > len(latest):
+            lines.append(f"… and {total - len(latest)} more")
+        message = '\n\n'.join(sections + ['\n'.join(lines)])
+        if len(message) <= MAX_MESSAGE_LENGTH:
+            break
+    return message
+
+
+class AdminNotifier:
+    """Buffers admin notification events and sends one digest per window"""
+
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self._events = deque(maxlen=DIGEST_ITEMS)
+        self._rollups = {}
+        self._started = None
+        self._flush_task = None
+
+    def add(self, bot, kind, platform, user_id, username, full_name, detail):
+        """Queue an event and schedule the digest for the current window"""
+        EVENTS.inc(kind=kind)
+        if self._started is None:
+            self._started = (time.monotonic(), datetime.now())
+
+        self._rollups.setdefault(kind, TallyCounter())[platform] += 1
+        self._events.append({
+            'kind': kind,
+            'platform': platform,
+            'user_id': user_id,
+            'username': username,
+            'full_name': full_name,
+            'detail': detail,
+            'at': datetime.now()
+        })
+
+        if self._flush_task is None:
+            self._flush_task = asyncio.get_running_loop().create_task(self._flush_later(bot))
+
+    async def _flush_later(self, bot):
+        if self.window > 0:
+            await asyncio.sleep(self.window)
+        # New events from here on start the next window
+        self._flush_task = None
+        await self.flush(bot)
+
+    async def flush(self, bot):
+        """Send the pending digest to every admin now"""
+        if self._started is None:
+            return
+        events, rollups = list(self._events), self._rollups
+        started_mono, started_at = self._started
+        self._events.clear()
+        self._rollups, self._started = {}, None
+
+        total = sum(sum(tally.values()) for tally in rollups.values())
+        try:
+            # A cache miss queries the database; keep it off the event loop
+            admin_ids = await asyncio.to_thread(get_admin_recipients)
+        except Exception as e:
+            logger.error(f"Failed to load admin recipients, dropping {total} events: {e}")
+            DROPPED.inc(total, reason='no_recipients')
+            return
+        if not admin_ids:
+            return
+
+        message = render_digest(events, rollups, started_at)
+        for admin_id in admin_ids:
+            if await self._send(bot, admin_id, message):
+                SENT.inc()
+            else:
+                DROPPED.inc(total, reason='send_failed')
+
+        delay = time.monotonic() - started_mono
+        DELAY.observe(delay)
+        if delay > LATE_AFTER:
+            LATE.inc(total)
+            logger.warning(f"Admin digest of {total} events delivered {delay:.1f}s after the first event")
+
+    async def close(self, bot):
+        """Cancel the pending window and send its digest immediately"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self.flush(bot)
+
+    async def _send(self, bot, admin_id, message):
+        """Send one digest, waiting out a single flood-control back-off"""
+        for attempt in range(2):
+            try:
+                await bot.send_message(chat_id=admin_id, text=message, parse_mode='HTML')
+                return True
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                if hasattr(retry_after, 'total_seconds'):
+                    retry_after = retry_after.total_seconds()
+                if attempt == 0:
+                    await asyncio.sleep(retry_after)
+                    continue
+                logger.warning(f"Flood control still active for admin {admin_id}")
+            except Exception as e:
+                logger.warning(f"Failed to notify admin {admin_id}: {e}")
+                break
+        return False
+
+
+NOTIFIER = AdminNotifier()
+
+
+async def flush_pending(application):
+    """Send any buffered digest before the bot stops (post_stop hook)"""
+    await NOTIFIER.close(application.bot)
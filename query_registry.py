@@ -0,0 +1,278 @@
+"""
+Query registry for the data layer.
+
+Every hot-path statement is registered here once by name. The SQL text for a
+(query, platform) pair is built a single time and cached, and on PostgreSQL
+each pooled connection sends a server-side PREPARE the first time it runs a
+statement, so later calls only pay for EXECUTE instead of a full parse/plan.
+Per-statement call counts and cumulative time are kept for /api/query-stats.
+"""
+import os
+import re
+import threading
+import time
+
+import psycopg2
+from psycopg2 import extensions
+
+from db_backends import BACKEND
+
+# Set DB_PREPARED_STATEMENTS=false when running behind a transaction-mode
+# pooler (e.g. PgBouncer) that does not keep session state between queries
+PREPARED_STATEMENTS_ENABLED = os.getenv(
+    'DB_PREPARED_STATEMENTS', 'true').lower() not in ('0', 'false', 'no')
+
+# Queries with a {platform} placeholder are built once per platform table
+QUERIES = {
+    # Redemption path
+    'key_by_code': """
+        SELECT id, key_code, uses, remaining_uses, account_text, status,
+               created_at, redeemed_at, giveaway_generated, giveaway_winner
+        FROM {platform}_keys
+        WHERE key_code = %s
+    """,
+    'key_code_by_id': "SELECT key_code FROM {platform}_keys WHERE id = %s",
+    'consume_key_use': """
+        UPDATE {platform}_keys
+        SET remaining_uses = remaining_uses - 1,
+            redeemed_at = CURRENT_TIMESTAMP,
+            status = CASE WHEN remaining_uses - 1 <= 0 THEN 'used' ELSE status END
+        WHERE id = %s
+        RETURNING remaining_uses
+    """,
+    'insert_redemption': """
+        INSERT INTO key_redemptions (platform, key_code, user_id, username, full_name)
+        VALUES (%s, %s, %s, %s, %s)
+    """,
+    'bump_user_stats': """
+        INSERT INTO user_stats (user_id, total_redemptions, platform_counts,
+                                first_redeemed_at, last_redeemed_at)
+        VALUES (%s, 1, jsonb_build_object(%s::text, 1), CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+        ON CONFLICT (user_id) DO UPDATE SET
+            total_redemptions = user_stats.total_redemptions + 1,
+            platform_counts = user_stats.platform_counts || jsonb_build_object(
+                %s::text, COALESCE((user_stats.platform_counts ->> %s)::int, 0) + 1),
+            last_redeemed_at = CURRENT_TIMESTAMP
+    """,
+    'active_credential': """
+        SELECT id, email, password
+        FROM {platform}_credentials
+        WHERE status = 'active'
+        ORDER BY created_at ASC
+        LIMIT 1
+    """,
+    'claim_credential': """
+        UPDATE {platform}_credentials
+        SET status = 'claimed',
+            claimed_by = %s,
+            claimed_by_username = %s,
+            claimed_by_name = %s,
+            claimed_at = CURRENT_TIMESTAMP
+        WHERE id = %s
+    """,
+    'last_redemption_time': """
+        SELECT redeemed_at FROM key_redemptions
+        WHERE user_id = %s
+        ORDER BY redeemed_at DESC
+        LIMIT 1
+    """,
+    'user_key_redemption_count': """
+        SELECT COUNT(*) FROM key_redemptions
+        WHERE key_code = %s AND user_id = %s
+    """,
+    'is_banned_by_id': """
+        SELECT COUNT(*) FROM banned_users
+        WHERE user_identifier = %s
+    """,
+    'is_banned_by_id_or_username': """
+        SELECT COUNT(*) FROM banned_users
+        WHERE user_identifier IN (%s, %s)
+    """,
+    'upsert_user': """
+        INSERT INTO users (user_id, username)
+        VALUES (%s, %s)
+        ON CONFLICT (user_id) DO UPDATE SET username = EXCLUDED.username
+        RETURNING id
+    """,
+
+    # Stats path
+    'credential_status_counts': """
+        SELECT
+            COUNT(*) as total,
+            COUNT(*) FILTER (WHERE status = 'active') as active,
+            COUNT(*) FILTER (WHERE status = 'claimed') as claimed,
+            COUNT(*) FILTER (WHERE status = 'inactive') as inactive
+        FROM {platform}_credentials
+    """,
+    'key_status_counts': """
+        SELECT
+            COUNT(*) as total,
+            COUNT(*) FILTER (WHERE status = 'active') as active,
+            COUNT(*) FILTER (WHERE status = 'used') as used,
+            COUNT(*) FILTER (WHERE status = 'expired') as expired
+        FROM {platform}_keys
+    """,
+    'total_users': "SELECT COUNT(*) FROM users",
+    'user_stats_summary': """
+        SELECT u.joined_at, s.total_redemptions, s.platform_counts,
+               s.first_redeemed_at, s.last_redeemed_at
+        FROM users u
+        LEFT JOIN user_stats s ON s.user_id = u.user_id
+        WHERE u.user_id = %s
+    """,
+    'user_recent_redemptions': """
+        SELECT key_code, platform, redeemed_at
+        FROM key_redemptions
+        WHERE user_id = %s
+        ORDER BY redeemed_at DESC
+        LIMIT %s
+    """,
+
+    # HTTP caching
+    'resource_version': """
+        WITH wanted AS (SELECT unnest(%s::varchar[]) AS resource),
+        counters AS (
+            SELECT COALESCE(SUM(version), 0) AS version, MAX(updated_at) AS updated_at
+            FROM resource_versions WHERE resource IN (SELECT resource FROM wanted)
+        ),
+        bumps AS (
+            SELECT COUNT(*) AS version, MAX(bumped_at) AS updated_at
+            FROM resource_version_bumps WHERE resource IN (SELECT resource FROM wanted)
+        )
+        SELECT counters.version + bumps.version, GREATEST(counters.updated_at, bumps.updated_at)
+        FROM counters, bumps
+    """,
+}
+
+# SQLite versions of statements db_backends.translate cannot rewrite
+# (JSONB operators, result types of expressions); same parameters
+SQLITE_QUERIES = {
+    'bump_user_stats': """
+        INSERT INTO user_stats (user_id, total_redemptions, platform_counts,
+                                first_redeemed_at, last_redeemed_at)
+        VALUES (%s, 1, json_object(%s, 1), CURRENT_TIMESTAMP, CURRENT_TIMESTAMP)
+        ON CONFLICT (user_id) DO UPDATE SET
+            total_redemptions = user_stats.total_redemptions + 1,
+            platform_counts = json_set(user_stats.platform_counts, '$.' || %s,
+                COALESCE(user_stats.platform_counts ->> %s, 0) + 1),
+            last_redeemed_at = CURRENT_TIMESTAMP
+    """,
+    'resource_version': """
+        SELECT COALESCE(SUM(version), 0), MAX(updated_at) AS "updated_at [TIMESTAMP]"
+        FROM resource_versions
+        WHERE resource = ANY(%s)
+    """,
+}
+
+_PLACEHOLDER = re.compile(r'%s')
+
+
+class Statement:
+    """A registered query bound to one platform table"""
+
+    def __init__(self, name, sql):
+        self.name = name
+        self.sql = sql
+
+        # Rewrite %s placeholders to $1..$n for the server-side PREPARE
+        counter = iter(range(1, sql.count('%s') + 1))
+        self.param_count = sql.count('%s')
+        self.prepare_sql = f"PREPARE {name} AS " + _PLACEHOLDER.sub(
+            lambda _: f"${next(counter)}", sql)
+        if self.param_count:
+            args = ', '.join(['%s'] * self.param_count)
+            self.execute_sql = f"EXECUTE {name} ({args})"
+        else:
+            self.execute_sql = f"EXECUTE {name}"
+
+
+_statements = {}
+_stats = {}
+_lock = threading.Lock()
+
+
+def get_statement(query, platform=None):
+    """Get the cached statement for a (query, platform) pair"""
+    key = (query, platform)
+    statement = _statements.get(key)
+    if statement is None:
+        template = QUERIES[query]
+        if BACKEND == 'sqlite':
+            template = SQLITE_QUERIES.get(query, template)
+        if platform:
+            name = f"vq_{query}_{platform}"
+            sql = template.format(platform=platform)
+        else:
+            name = f"vq_{query}"
+            sql = template
+        statement = Statement(name, sql)
+        with _lock:
+            statement = _statements.setdefault(key, statement)
+    return statement
+
+
+def execute(cur, query, params=(), platform=None):
+    """Execute a registered query on a cursor, preparing it on first use"""
+    statement = get_statement(query, platform)
+    prepared = getattr(cur.connection, 'prepared_statements', None)
+
+    start = time.perf_counter()
+    try:
+        if PREPARED_STATEMENTS_ENABLED and prepared is not None:
+            # Nothing else has run in this transaction yet, so it can be
+            # rolled back and retried if the EXECUTE fails
+            idle = cur.connection.get_transaction_status() == extensions.TRANSACTION_STATUS_IDLE
+            if statement.name not in prepared:
+                cur.execute(statement.prepare_sql)
+                prepared.add(statement.name)
+            try:
+                cur.execute(statement.execute_sql, params)
+            except psycopg2.errors.InvalidSqlStatementName:
+                # The session lost its prepared statements (e.g. DISCARD ALL
+                # from a pooler): forget all of them, then prepare and run
+                # this one again unless earlier statements of the aborted
+                # transaction would be lost with it
+                prepared.clear()
+                if not idle:
+                    raise
+                cur.connection.rollback()
+                cur.execute(statement.prepare_sql)
+                prepared.add(statement.name)
+                cur.execute(statement.execute_sql, params)
+        else:
+            cur.execute(statement.sql, params)
+    finally:
+        _record(statement.name, time.perf_counter() - start)
+    return cur
+
+
+def _record(name, elapsed):
+    """Accumulate call count and time for a statement"""
+    with _lock:
+        entry = _stats.get(name)
+        if entry is None:
+            _stats[name] = [1, elapsed]
+        else:
+            entry[0] += 1
+            entry[1] += elapsed
+
+
+def get_query_stats():
+    """Get per-statement call counts and cumulative time, slowest first"""
+    with _lock:
+        snapshot = {name: (calls, total) for name, (calls, total) in _stats.items()}
+
+    stats = [{
+        'query': name,
+        'calls': calls,
+        'total_ms': round(total * 1000, 3),
+        'avg_ms': round(total * 1000 / calls, 3) if calls else 0
+    } for name, (calls, total) in snapshot.items()]
+    stats.sort(key=lambda s: s['total_ms'], reverse=True)
+    return stats
+
+
+def reset_query_stats():
+    """Clear accumulated statement statistics"""
+    with _lock:
+        _stats.clear()
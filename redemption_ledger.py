@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+"""
+Partitioned key_redemptions ledger.
+
+key_redemptions is range-partitioned by month on redeemed_at. Indexes are
+declared on the parent so every partition gets them: (user_id, redeemed_at)
+for the cooldown and per-user stats queries, (redeemed_at, id) for the
+history pages, plus platform and (key_code, user_id). Partitions are created
+REDEMPTION_PARTITIONS_AHEAD months in advance by init_database and a daily
+bot job; a default partition catches anything outside them.
+
+Old months can be archived to gzipped CSV and dropped:
+
+    python redemption_ledger.py ensure
+    python redemption_ledger.py archive --older-than 12 --dir archive/
+"""
+import os
+import gzip
+import asyncio
+import argparse
+from datetime import date
+
+from db_setup import get_db_connection
+
+# Months of partitions kept ready beyond the current one
+PARTITIONS_AHEAD = int(os.getenv('REDEMPTION_PARTITIONS_AHEAD', '3'))
+# Months of redemptions kept by the archive command
+RETENTION_MONTHS = int(os.getenv('REDEMPTION_RETENTION_MONTHS', '12'))
+
+PARTITION_PREFIX = 'key_redemptions_p'
+DEFAULT_PARTITION = 'key_redemptions_default'
+
+COLUMNS = 'id, platform, key_code, user_id, username, full_name, redeemed_at'
+
+
+def _month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    """Get the partition table name for a month"""
+    return f"{PARTITION_PREFIX}{month.year:04d}_{month.month:02d}"
+
+
+def _table_exists(cur, name):
+    cur.execute("SELECT to_regclass(%s)", (name,))
+    return cur.fetchone()[0] is not None
+
+
+def _is_partitioned(cur):
+    cur.execute("""
+        SELECT c.relkind FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relname = 'key_redemptions' AND n.nspname = current_schema()
+    """)
+    row = cur.fetchone()
+    return row[0] == 'p' if row else None
+
+
+def _create_parent(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS key_redemptions (
+            id SERIAL,
+            platform VARCHAR(50) NOT NULL,
+            key_code VARCHAR(100) NOT NULL,
+            user_id BIGINT NOT NULL,
+            username VARCHAR(255),
+            full_name VARCHAR(255),
+            redeemed_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (id, redeemed_at)
+        ) PARTITION BY RANGE (redeemed_at)
+    """)
+    cur.execute(f"""
+        CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION}
+        PARTITION OF key_redemptions DEFAULT
+    """)
+
+    # Declared on the parent, so each partition gets its own copy
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_redemptions_user_time
+        ON key_redemptions(user_id, redeemed_at DESC)
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_redemptions_redeemed_at
+        ON key_redemptions(redeemed_at DESC, id DESC)
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_redemptions_platform
+        ON key_redemptions(platform)
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_redemptions_key_user
+        ON key_redemptions(key_code, user_id)
+    """)
+
+
+def create_partition(cur, month):
+    """Create the partition for a month if it does not exist yet"""
+    name = partition_name(month)
+    if _table_exists(cur, name):
+        return False
+
+    start, end = month, _add_months(month, 1)
+
+    # Rows for this month that landed in the default partition would block
+    # the new partition, so move them over
+    cur.execute(f"""
+        CREATE TEMP TABLE _moved_redemptions AS
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION}
+            WHERE redeemed_at >= %s AND redeemed_at < %s
+            RETURNING {COLUMNS}
+        )
+        SELECT * FROM moved
+    """, (start, end))
+    cur.execute(f"""
+        CREATE TABLE {name} PARTITION OF key_redemptions
+        FOR VALUES FROM (%s) TO (%s)
+    """, (start, end))
+    cur.execute(f"""
+        INSERT INTO key_redemptions ({COLUMNS})
+        SELECT {COLUMNS} FROM _moved_redemptions
+    """)
+    cur.execute("DROP TABLE _moved_redemptions")
+    return True
+
+
+def _migrate_legacy_table(cur):
+    """Copy an unpartitioned key_redemptions table into the partitioned layout"""
+    print("Migrating key_redemptions to a partitioned table...")
+    cur.execute("ALTER TABLE key_redemptions RENAME TO key_redemptions_legacy")
+    cur.execute("ALTER SEQUENCE IF EXISTS key_redemptions_id_seq RENAME TO key_redemptions_legacy_id_seq")
+    cur.execute("ALTER INDEX IF EXISTS key_redemptions_pkey RENAME TO key_redemptions_legacy_pkey")
+    for index in ('idx_redemptions_platform', 'idx_redemptions_user', 'idx_redemptions_redeemed_at'):
+        cur.execute(f"DROP INDEX IF EXISTS {index}")
+
+    _create_parent(cur)
+
+    cur.execute("SELECT MIN(redeemed_at), MAX(redeemed_at) FROM key_redemptions_legacy")
+    first, last = cur.fetchone()
+    if first is not None:
+        month = _month_start(first)
+        while month <= _month_start(last):
+            create_partition(cur, month)
+            month = _add_months(month, 1)
+
+    cur.execute(f"""
+        INSERT INTO key_redemptions ({COLUMNS})
+        SELECT id, platform, key_code, user_id::bigint, username, full_name,
+               COALESCE(redeemed_at, CURRENT_TIMESTAMP)
+        FROM key_redemptions_legacy
+    """)
+    migrated = cur.rowcount
+    cur.execute("""
+        SELECT setval(pg_get_serial_sequence('key_redemptions', 'id'),
+                      COALESCE((SELECT MAX(id) FROM key_redemptions), 0) + 1, false)
+    """)
+    cur.execute("DROP TABLE key_redemptions_legacy")
+    print(f"✓ Migrated {migrated} redemptions into monthly partitions")
+
+
+def create_redemption_ledger(cur):
+    """Create the partitioned key_redemptions table, migrating an existing one"""
+    if _is_partitioned(cur) is False:
+        _migrate_legacy_table(cur)
+    else:
+        _create_parent(cur)
+    ensure_partitions(cur)
+
+
+def ensure_partitions(cur, months_ahead=PARTITIONS_AHEAD, today=None):
+    """Create partitions for the current month and the next months_ahead months"""
+    month = _month_start(today or date.today())
+    created = []
+    for offset in range(months_ahead + 1):
+        target = _add_months(month, offset)
+        if create_partition(cur, target):
+            created.append(partition_name(target))
+    return created
+
+
+def ensure_redemption_partitions(months_ahead=PARTITIONS_AHEAD):
+    """Create upcoming monthly partitions in their own transaction"""
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        created = ensure_partitions(cur, months_ahead)
+        cur.close()
+    return created
+
+
+async def partition_maintenance_job(context):
+    """Bot job that keeps upcoming redemption partitions created"""
+    # The DDL takes ACCESS EXCLUSIVE locks and may move rows out of the
+    # default partition; run it off the event loop
+    await asyncio.to_thread(ensure_redemption_partitions)
+
+
+def list_partitions(cur):
+    """Get (name, month) for every monthly partition, oldest first"""
+    cur.execute("""
+        SELECT c.relname FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        JOIN pg_class p ON p.oid = i.inhparent
+        WHERE p.relname = 'key_redemptions' AND c.relname LIKE %s
+        ORDER BY c.relname
+    """, (PARTITION_PREFIX + '%',))
+    partitions = []
+    for (name,) in cur.fetchall():
+        year, month = name[len(PARTITION_PREFIX):].split('_')
+        partitions.append((name, date(int(year), int(month), 1)))
+    return partitions
+
+
+def archive_partitions(older_than=RETENTION_MONTHS, archive_dir=None, today=None):
+    """Detach monthly partitions older than `older_than` months, export them
+    to gzipped CSV in archive_dir (if given) and drop them"""
+    cutoff = _add_months(_month_start(today or date.today()), -older_than)
+    archived = []
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        for name, month in list_partitions(cur):
+            if month >= cutoff:
+                continue
+
+            cur.execute(f"ALTER TABLE key_redemptions DETACH PARTITION {name}")
+            if archive_dir:
+                os.makedirs(archive_dir, exist_ok=True)
+                path = os.path.join(archive_dir, f"{name}.csv.gz")
+                with gzip.open(path, 'wt', newline='') as f:
+                    cur.copy_expert(
+                        f"COPY (SELECT {COLUMNS} FROM {name} ORDER BY redeemed_at, id) "
+                        f"TO STDOUT WITH CSV HEADER", f)
+                print(f"  Archived {name} to {path}")
+            cur.execute(f"DROP TABLE {name}")
+            # Commit per partition so a failure keeps earlier months archived
+            conn.commit()
+            archived.append(name)
+        cur.close()
+    return archived
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain the partitioned key_redemptions ledger')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    ensure = sub.add_parser('ensure', help='create upcoming monthly partitions')
+    ensure.add_argument('--ahead', type=int, default=PARTITIONS_AHEAD,
+                        help='months to create beyond the current one')
+
+    archive = sub.add_parser('archive', help='archive and drop old monthly partitions')
+    archive.add_argument('--older-than', type=int, default=RETENTION_MONTHS,
+                         help='drop partitions older than this many months')
+    archive.add_argument('--dir', default=None,
+                         help='write each partition to <dir>/<partition>.csv.gz before dropping it')
+
+    args = parser.parse_args()
+    if args.command == 'ensure':
+        created = ensure_redemption_partitions(args.ahead)
+        print(f"✓ Created {len(created)} partitions" + (f": {', '.join(created)}" if created else ""))
+    else:
+        archived = archive_partitions(args.older_than, args.dir)
+        print(f"✓ Archived {len(archived)} partitions")
+
+
+if __name__ == "__main__":
+    main()
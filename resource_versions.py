@@ -0,0 +1,173 @@
+"""
+Version counters for HTTP caching of the admin panel's read endpoints.
+
+Every cached resource has a counter that writes bump in the same transaction
+as the write, so a version is only visible once the data it describes is
+committed:
+
+    keys:<platform>          any change to {platform}_keys
+    credentials:<platform>   any change to {platform}_credentials
+    redemptions:<platform>   a key_redemptions row for the platform
+
+On PostgreSQL the triggers do not update the counter row, which would hold
+its lock until commit and queue every redemption of a platform (the key and
+redemption triggers both fire in redeem_key's transaction) behind the one
+before it. Each bump inserts a row into the append-only
+`resource_version_bumps` instead, and a resource's version is its counter in
+`resource_versions` plus its committed bumps. A background thread in the bot
+and every API worker periodically folds bumps into the counters in one
+statement, so the sum stays the same across a compaction. SQLite serializes
+writers anyway and keeps updating the counters directly.
+
+Key and credential triggers are statement-level, so a bulk job bumps once.
+An endpoint's version is the sum of the counters it depends on (they only
+grow, so the sum changes whenever any of them does) and its Last-Modified is
+the latest of their update times: one indexed read instead of the query and
+serialization behind the response.
+"""
+import os
+import time
+import logging
+import threading
+
+import query_registry
+from db_setup import get_db_connection
+from db_backends import BACKEND
+
+logger = logging.getLogger(__name__)
+
+RESOURCE_KINDS = ('keys', 'credentials', 'redemptions')
+
+# Seconds between folds of the bumps into the counters
+COMPACT_INTERVAL = float(os.getenv('RESOURCE_VERSION_COMPACT_SECONDS', '30'))
+
+_compactor_pid = None
+_compactor_lock = threading.Lock()
+
+
+def resource_names(kind, platforms):
+    """Get the counter names of one resource kind for the given platforms"""
+    return [f"{kind}:{platform}" for platform in platforms]
+
+
+def create_version_triggers(cur, platforms):
+    """Create the resource_versions table and the triggers that bump it"""
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS resource_versions (
+            resource VARCHAR(100) PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0,
+            updated_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    for kind in RESOURCE_KINDS:
+        for resource in resource_names(kind, platforms):
+            cur.execute("""
+                INSERT INTO resource_versions (resource) VALUES (%s)
+                ON CONFLICT (resource) DO NOTHING
+            """, (resource,))
+
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS resource_version_bumps (
+            resource VARCHAR(100) NOT NULL,
+            bumped_at TIMESTAMPTZ NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cur.execute("""
+        CREATE INDEX IF NOT EXISTS idx_resource_version_bumps_resource
+        ON resource_version_bumps(resource)
+    """)
+
+    # Inserts take no lock another writer could wait on
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION bump_resource_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO resource_version_bumps (resource) VALUES (TG_ARGV[0]);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    cur.execute("""
+        CREATE OR REPLACE FUNCTION bump_redemption_version() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO resource_version_bumps (resource) VALUES ('redemptions:' || NEW.platform);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+
+    for platform in platforms:
+        for kind in ('keys', 'credentials'):
+            table = f"{platform}_{kind}"
+            cur.execute(f"DROP TRIGGER IF EXISTS {table}_version ON {table}")
+            cur.execute(f"""
+                CREATE TRIGGER {table}_version
+                AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON {table}
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_resource_version('{kind}:{platform}')
+            """)
+
+    cur.execute("DROP TRIGGER IF EXISTS key_redemptions_version ON key_redemptions")
+    cur.execute("""
+        CREATE TRIGGER key_redemptions_version
+        AFTER INSERT ON key_redemptions
+        FOR EACH ROW EXECUTE FUNCTION bump_redemption_version()
+    """)
+
+
+def get_version(resources):
+    """Get (version, last_modified) for a set of resource counters"""
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        query_registry.execute(cur, 'resource_version', (list(resources),))
+        version, last_modified = cur.fetchone()
+        cur.close()
+    return int(version), last_modified
+
+
+def compact_versions():
+    """Fold committed bumps into the counters; returns how many were folded"""
+    if BACKEND != 'postgres':
+        return 0
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        # Deleting and adding in one statement keeps every version the same
+        cur.execute("""
+            WITH moved AS (
+                DELETE FROM resource_version_bumps RETURNING resource, bumped_at
+            ), folded AS (
+                UPDATE resource_versions v
+                SET version = v.version + m.bumps,
+                    updated_at = GREATEST(v.updated_at, m.last_bumped_at)
+                FROM (
+                    SELECT resource, COUNT(*) AS bumps, MAX(bumped_at) AS last_bumped_at
+                    FROM moved GROUP BY resource
+                ) m
+                WHERE v.resource = m.resource
+                RETURNING m.bumps
+            )
+            SELECT COALESCE(SUM(bumps), 0) FROM folded
+        """)
+        folded = cur.fetchone()[0]
+        cur.close()
+    return int(folded)
+
+
+def _compact_loop():
+    while True:
+        time.sleep(COMPACT_INTERVAL)
+        try:
+            compact_versions()
+        except Exception as e:
+            logger.warning(f"Resource version compaction failed: {e}")
+
+
+def start_compactor():
+    """Start this process's background compaction of version bumps (idempotent)"""
+    global _compactor_pid
+    if BACKEND != 'postgres' or _compactor_pid == os.getpid():
+        return
+    with _compactor_lock:
+        # Checked by PID so a forked worker starts its own thread
+        if _compactor_pid == os.getpid():
+            return
+        _compactor_pid = os.getpid()
+        threading.Thread(target=_compact_loop, name='version-compactor', daemon=True).start()
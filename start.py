@@ -17,28 +17,32 @@ logging.basicConfig(
 logging.getLogger("httpx").setLevel(logging.WARNING)
 logger = logging.getLogger(__name__)
 
-def run_bot():
-    """Run the Telegram bot"""
+def _add_bot_path():
     import sys
-    import os
     
     # Add bot directory to Python path
-    bot_dir = os.path.join(os.path.dirname(__file__), 'bot')
+    bot_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'bot')
     if bot_dir not in sys.path:
         sys.path.insert(0, bot_dir)
+
+def build_application(bot_token, base_url=None):
+    """Build the bot Application with every update handler registered
+
+    `base_url` points the bot at another Bot API server (e.g. the fake one
+    of benchmarks/bench_bot.py) instead of api.telegram.org.
+    """
+    _add_bot_path()
     
     from telegram import Update
     from telegram.ext import Application, CommandHandler, CallbackQueryHandler, MessageHandler, filters
     
     # Import bot modules
-    from admin import (admin_start, handle_admin_callback, handle_admin_message,
-                      is_admin, ensure_data_files, check_and_process_giveaways)
+    from admin import (admin_start, handle_admin_callback, handle_admin_message, is_admin, ADMIN_IDS)
     from users import (user_start, handle_user_callback, handle_user_message,
                       redeem_command, participate_command)
-    
-    BOT_TOKEN = os.getenv('BOT_TOKEN')
-    if not BOT_TOKEN:
-        raise ValueError("BOT_TOKEN environment variable is required")
+    from instrumentation import InstrumentedRequest
+    import notifications
+    import rate_limit
     
     async def start_command(update: Update, context):
         if not update.effective_user:
@@ -72,11 +76,15 @@ def run_bot():
     async def error_handler(update: object, context):
         logger.error(f"Exception while handling an update: {context.error}")
     
-    # Ensure data files exist
-    ensure_data_files()
+    # Create application (Bot API calls are timed for /api/metrics; buffered
+    # admin digests are sent before the bot stops)
+    builder = Application.builder().token(bot_token).request(InstrumentedRequest())
+    if base_url:
+        builder = builder.base_url(base_url)
+    application = builder.post_stop(notifications.flush_pending).build()
     
-    # Create application
-    application = Application.builder().token(BOT_TOKEN).build()
+    # Floods are dropped per user before any handler runs
+    rate_limit.install(application, ADMIN_IDS)
     
     # Add handlers
     application.add_handler(CommandHandler("start", start_command))
@@ -85,11 +93,45 @@ def run_bot():
     application.add_handler(CallbackQueryHandler(handle_callback_query))
     application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_text_message))
     application.add_error_handler(error_handler)
+    return application
+
+def run_bot():
+    """Run the Telegram bot"""
+    _add_bot_path()
+    
+    from telegram import Update
+    from admin import ensure_data_files, check_and_process_giveaways
+    import metrics
+    from redemption_ledger import partition_maintenance_job
+    from db_backends import BACKEND
+    import key_filter
+    import user_registry
+    import resource_versions
+    
+    BOT_TOKEN = os.getenv('BOT_TOKEN')
+    if not BOT_TOKEN:
+        raise ValueError("BOT_TOKEN environment variable is required")
+    
+    # Ensure data files exist
+    ensure_data_files()
+    
+    application = build_application(BOT_TOKEN)
+    metrics.start_exporter()
+    # Redeemable key codes are loaded into memory in the background
+    key_filter.FILTER.start()
+    # New and changed users are written in batches
+    user_registry.USERS.start()
+    # Version bumps of the admin panel's ETags are folded into counters
+    resource_versions.start_compactor()
     
     # Add background job for giveaway checking
     job_queue = application.job_queue
     job_queue.run_repeating(check_and_process_giveaways, interval=30, first=10)
     logger.info("✅ Giveaway checker job scheduled (runs every 30 seconds)")
+    # Keep upcoming monthly key_redemptions partitions created (the SQLite
+    # backend's ledger is not partitioned)
+    if BACKEND == 'postgres':
+        job_queue.run_repeating(partition_maintenance_job, interval=86400, first=60)
     
     # Start bot
     logger.info("🎮 Premium Vault Bot is starting...")
@@ -103,15 +145,12 @@ def run_flask():
     port = os.getenv('PORT', '10000')
     logger.info(f"🌐 Admin Panel starting on port {port} with Gunicorn...")
     
-    # Run Gunicorn as a subprocess
+    # Run Gunicorn as a subprocess; workers, threads and preload come from
+    # the GUNICORN_PROFILE settings in gunicorn_config.py
+    config = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'gunicorn_config.py')
     subprocess.Popen([
         sys.executable, '-m', 'gunicorn',
-        '--bind', f'0.0.0.0:{port}',
-        '--workers', '2',
-        '--threads', '2',
-        '--timeout', '120',
-        '--access-logfile', '-',
-        '--error-logfile', '-',
+        '-c', config,
         'api_server:app'
     ])
 
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+In-memory serving of the built admin panel (admin-panel/dist).
+
+The bundle is read once into a manifest of path -> file (bytes, content
+type, ETag and gzip/brotli variants), so requests cost a dict lookup instead
+of filesystem calls. Vite's content-hashed files under assets/ are sent with
+`Cache-Control: immutable` for a year; everything else, index.html included,
+is revalidated by ETag. Unknown paths get index.html for client-side routing.
+
+Compressed variants are taken from .gz/.br files next to the originals when
+the build produced them, and otherwise generated when the manifest is built:
+
+    python static_assets.py admin-panel/dist    # precompress after npm run build
+"""
+import os
+import re
+import sys
+import gzip
+import hashlib
+import logging
+import mimetypes
+import threading
+
+from flask import Response
+
+from compression import brotli, parse_accept_encoding
+
+logger = logging.getLogger(__name__)
+
+DIST_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'admin-panel', 'dist')
+
+# Vite names bundled files assets/<name>-<8 char hash>.<ext>
+HASHED_ASSET = re.compile(r'^assets/.+-[A-Za-z0-9_-]{8}\.[A-Za-z0-9]+$')
+IMMUTABLE_CACHE = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE = 'no-cache'
+
+# Smaller files are not worth a compressed variant
+PRECOMPRESS_MIN_SIZE = 256
+PRECOMPRESS_TYPES = {
+    'application/javascript', 'application/json', 'application/manifest+json',
+    'image/svg+xml', 'text/css', 'text/html', 'text/javascript', 'text/plain'
+}
+
+# Served in this order of preference when the client accepts both
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class Asset:
+    """One file of the bundle with its precompressed variants"""
+
+    def __init__(self, path, data, content_type, immutable):
+        self.path = path
+        self.content_type = content_type
+        self.immutable = immutable
+        self.etag = hashlib.sha1(data).hexdigest()[:20]
+        # encoding -> body; None is the identity body
+        self.variants = {None: data}
+
+    def pick(self, accept_encoding):
+        """Get (encoding, body) for an Accept-Encoding header"""
+        accepted = parse_accept_encoding(accept_encoding)
+        for encoding, _ in ENCODINGS:
+            if encoding in self.variants and (encoding in accepted or '*' in accepted):
+                return encoding, self.variants[encoding]
+        return None, self.variants[None]
+
+
+def _content_type(path):
+    content_type = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    if content_type.startswith('text/') or content_type in ('application/javascript', 'application/json'):
+        content_type += '; charset=utf-8'
+    return content_type
+
+
+def _compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=11)
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _compressible(path, size):
+    mimetype = mimetypes.guess_type(path)[0]
+    return mimetype in PRECOMPRESS_TYPES and size >= PRECOMPRESS_MIN_SIZE
+
+
+def _walk(root):
+    """Yield (relative path, absolute path) for every file except compressed variants"""
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            if filename.endswith(('.gz', '.br')):
+                continue
+            full = os.path.join(dirpath, filename)
+            yield os.path.relpath(full, root).replace(os.sep, '/'), full
+
+
+def build_manifest(root):
+    """Read a built bundle into {path: Asset}"""
+    manifest = {}
+    for path, full in _walk(root):
+        with open(full, 'rb') as f:
+            data = f.read()
+        asset = Asset(path, data, _content_type(path), bool(HASHED_ASSET.match(path)))
+
+        if _compressible(path, len(data)):
+            for encoding, suffix in ENCODINGS:
+                if encoding == 'br' and brotli is None:
+                    continue
+                if os.path.exists(full + suffix):
+                    with open(full + suffix, 'rb') as f:
+                        body = f.read()
+                else:
+                    body = _compress(data, encoding)
+                if len(body) < len(data):
+                    asset.variants[encoding] = body
+        manifest[path] = asset
+    return manifest
+
+
+def precompress(root):
+    """Write .gz/.br files next to the compressible files of a built bundle"""
+    written = 0
+    for path, full in _walk(root):
+        size = os.path.getsize(full)
+        if not _compressible(path, size):
+            continue
+        with open(full, 'rb') as f:
+            data = f.read()
+        for encoding, suffix in ENCODINGS:
+            if encoding == 'br' and brotli is None:
+                continue
+            body = _compress(data, encoding)
+            if len(body) < size:
+                with open(full + suffix, 'wb') as f:
+                    f.write(body)
+                written += 1
+    return written
+
+
+class StaticBundle:
+    """Serves a built bundle from memory, loading it on first use"""
+
+    def __init__(self, root=DIST_DIR):
+        self.root = root
+        self._manifest = None
+        self._lock = threading.Lock()
+
+    def manifest(self):
+        """Get the manifest, building it if the bundle has not been loaded yet"""
+        if self._manifest is None:
+            with self._lock:
+                if self._manifest is None:
+                    if not os.path.isfile(os.path.join(self.root, 'index.html')):
+                        # Not built yet; try again on the next request
+                        return {}
+                    self._manifest = build_manifest(self.root)
+                    size = sum(len(body) for asset in self._manifest.values()
+                               for body in asset.variants.values())
+                    logger.info(f"Loaded admin panel bundle: {len(self._manifest)} files, "
+                                f"{size / 1024:.0f} KiB with compressed variants")
+        return self._manifest
+
+    def response(self, path, request):
+        """Build the response for a path of the panel (index.html if unknown)"""
+        manifest = self.manifest()
+        asset = manifest.get(path)
+        if asset is None:
+            if path.startswith('assets/'):
+                # A bundle file from another build; index.html would not parse as it
+                return Response('Not found', status=404, mimetype='text/plain')
+            asset = manifest.get('index.html')
+        if asset is None:
+            return Response('Admin panel has not been built', status=404, mimetype='text/plain')
+
+        encoding, body = asset.pick(request.headers.get('Accept-Encoding'))
+        etag = f"{asset.etag}-{encoding}" if encoding else asset.etag
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, content_type=asset.content_type)
+            if encoding:
+                response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE if asset.immutable else REVALIDATE_CACHE
+        if len(asset.variants) > 1:
+            response.vary.add('Accept-Encoding')
+        return response
+
+
+def main():
+    root = sys.argv[1] if len(sys.argv) > 1 else DIST_DIR
+    written = precompress(root)
+    print(f"✓ Wrote {written} precompressed files under {root}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Telegram user IDs as BIGINT.
+
+User IDs used to be stored as VARCHAR(50); these columns are BIGINT now and
+the data layer passes ints:
+
+    users.user_id, user_stats.user_id, key_redemptions.user_id,
+    giveaway_participants.user_id, {platform}_credentials.claimed_by,
+    {platform}_keys.giveaway_winner
+
+Databases created before keep those columns as VARCHAR until `migrate`
+converts them in place with ALTER COLUMN ... TYPE BIGINT, which rewrites the
+table and rebuilds every index on the column (the key_redemptions partitions
+included); run it with the bot and the API stopped. A value that is not an
+integer stops the migration before anything is changed; `check` lists them.
+init_database never rewrites tables: it refuses to start, before anything
+that casts user IDs, while a column is still text.
+banned_users.user_identifier stays text, as it also holds @usernames.
+
+SQLite cannot change a column's type: databases of the sqlite backend
+created before keep their text columns, where integer parameters still
+compare equal through column affinity; new ones are created with BIGINT.
+
+    python user_ids.py check
+    python user_ids.py migrate
+"""
+import time
+import argparse
+
+from db_setup import get_db_connection
+
+NUMERIC = r'^-?[0-9]{1,18}$'
+
+
+def user_id_columns(platforms):
+    """Get the (table, column) pairs that hold Telegram user IDs"""
+    columns = [('users', 'user_id'), ('user_stats', 'user_id'),
+               ('key_redemptions', 'user_id'), ('giveaway_participants', 'user_id')]
+    for platform in platforms:
+        columns.append((f"{platform}_credentials", 'claimed_by'))
+        columns.append((f"{platform}_keys", 'giveaway_winner'))
+    return columns
+
+
+def column_type(cur, table, column):
+    """Get a column's data type, or None if it does not exist"""
+    cur.execute("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s
+    """, (table, column))
+    row = cur.fetchone()
+    return row[0] if row else None
+
+
+def pending_columns(cur, platforms):
+    """Get the user ID columns not yet converted to BIGINT"""
+    return [(table, column) for table, column in user_id_columns(platforms)
+            if column_type(cur, table, column) in ('character varying', 'text')]
+
+
+def invalid_values(cur, table, column, limit=5):
+    """Get (count, examples) of values of a text column that are not integers"""
+    cur.execute(f"SELECT COUNT(*) FROM {table} WHERE {column} !~ %s", (NUMERIC,))
+    count = cur.fetchone()[0]
+    examples = []
+    if count:
+        cur.execute(f"SELECT DISTINCT {column} FROM {table} WHERE {column} !~ %s LIMIT %s",
+                    (NUMERIC, limit))
+        examples = [row[0] for row in cur.fetchall()]
+    return count, examples
+
+
+def index_sizes(cur, tables):
+    """Get {index: bytes} of every index on the given tables (partitions included)"""
+    cur.execute("""
+        SELECT i.indexrelid::regclass::text, pg_relation_size(i.indexrelid)
+        FROM pg_index i
+        JOIN pg_class t ON t.oid = i.indrelid
+        LEFT JOIN pg_inherits h ON h.inhrelid = t.oid
+        LEFT JOIN pg_class parent ON parent.oid = h.inhparent
+        WHERE t.relname = ANY(%s) OR parent.relname = ANY(%s)
+        ORDER BY 1
+    """, (list(tables), list(tables)))
+    return dict(cur.fetchall())
+
+
+def _invalid_report(cur, pending):
+    problems = []
+    for table, column in pending:
+        count, examples = invalid_values(cur, table, column)
+        if count:
+            problems.append(f"{table}.{column}: {count} ({', '.join(map(repr, examples))})")
+    return problems
+
+
+def check_user_ids(cur, platforms):
+    """Raise unless every user ID column has been converted to BIGINT"""
+    pending = pending_columns(cur, platforms)
+    if not pending:
+        return
+    message = (f"{len(pending)} user ID columns are still stored as text "
+               f"({', '.join(f'{t}.{c}' for t, c in pending)}). Stop the bot and the API and "
+               "run `python user_ids.py migrate` (it rewrites those tables) before starting them.")
+    problems = _invalid_report(cur, pending)
+    if problems:
+        message += ("\nValues that are not integers block the migration; fix or delete them "
+                    "first:\n  " + '\n  '.join(problems))
+    raise RuntimeError(message)
+
+
+def migrate_user_ids(cur, platforms):
+    """Convert the user ID columns still stored as text to BIGINT
+
+    Returns the seconds taken per column.
+    """
+    pending = pending_columns(cur, platforms)
+    if not pending:
+        return {}
+    problems = _invalid_report(cur, pending)
+    if problems:
+        raise RuntimeError("User IDs that are not integers block the BIGINT migration; fix or "
+                           "delete them first:\n  " + '\n  '.join(problems))
+
+    print(f"Migrating {len(pending)} user ID columns to BIGINT...")
+    timings = {}
+    for table, column in pending:
+        start = time.perf_counter()
+        cur.execute(f"ALTER TABLE {table} ALTER COLUMN {column} TYPE BIGINT USING {column}::bigint")
+        timings[f"{table}.{column}"] = time.perf_counter() - start
+    print(f"✓ Migrated {', '.join(timings)} in {sum(timings.values()):.1f}s")
+    return timings
+
+
+def main():
+    from db_helpers import PLATFORMS
+
+    parser = argparse.ArgumentParser(description='Check or run the BIGINT user ID migration')
+    parser.add_argument('command', choices=('check', 'migrate'))
+    args = parser.parse_args()
+
+    tables = sorted({table for table, _ in user_id_columns(PLATFORMS)})
+    with get_db_connection() as conn:
+        cur = conn.cursor()
+        pending = pending_columns(cur, PLATFORMS)
+        print(f"{len(pending)} user ID columns still stored as text"
+              + (f": {', '.join(f'{t}.{c}' for t, c in pending)}" if pending else ""))
+        for table, column in pending:
+            count, examples = invalid_values(cur, table, column)
+            if count:
+                print(f"  {table}.{column}: {count} values are not integers, e.g. {examples}")
+
+        if args.command == 'migrate' and pending:
+            before = index_sizes(cur, tables)
+            migrate_user_ids(cur, PLATFORMS)
+            after = index_sizes(cur, tables)
+            print(f"\n{'index':<50}{'before':>12}{'after':>12}")
+            for name in sorted(set(before) | set(after)):
+                print(f"{name:<50}{before.get(name, 0):>12}{after.get(name, 0):>12}")
+            print(f"{'total':<50}{sum(before.values()):>12}{sum(after.values()):>12}")
+        cur.close()
+
+
+if __name__ == "__main__":
+    main()
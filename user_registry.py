@@ -0,0 +1,138 @@
+"""
+Write-behind registry of the bot's users.
+
+Handlers call `record_user` instead of upserting `users` on every update.
+The registry remembers the users it has written (a bounded LRU of
+USER_REGISTRY_MAX_USERS IDs with their usernames and when last_seen_at was
+last written) and queues a user only when they are new to this process,
+changed username, or their last_seen_at is more than
+USER_LAST_SEEN_RESOLUTION seconds old. A background thread writes the queue
+every USER_REGISTRY_FLUSH_MS milliseconds as multi-row upserts, so a burst of
+/start presses becomes a few statements instead of a write per update.
+
+Queued users are lost if the process is killed before a flush (at exit the
+queue is flushed); a failed flush is queued again for the next one.
+"""
+import os
+import time
+import atexit
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from db_setup import get_db_connection
+from db_backends import insert_many
+from metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+FLUSH_SECONDS = float(os.getenv('USER_REGISTRY_FLUSH_MS', '250')) / 1000
+LAST_SEEN_RESOLUTION = float(os.getenv('USER_LAST_SEEN_RESOLUTION', '300'))
+MAX_USERS = int(os.getenv('USER_REGISTRY_MAX_USERS', '200000'))
+PAGE_SIZE = 500
+
+UPSERT_USERS = """
+    INSERT INTO users (user_id, username, last_seen_at) VALUES %s
+    ON CONFLICT (user_id) DO UPDATE
+    SET username = EXCLUDED.username, last_seen_at = EXCLUDED.last_seen_at
+"""
+
+SIGHTINGS = REGISTRY.counter(
+    'user_registry_sightings_total',
+    'Users recorded by bot handlers, by whether a database write was queued',
+    ['result'])
+FLUSHES = REGISTRY.counter(
+    'user_registry_flushes_total',
+    'Batched user upserts, by outcome',
+    ['outcome'])
+FLUSHED_USERS = REGISTRY.counter(
+    'user_registry_flushed_users_total',
+    'User rows written by batched upserts')
+
+
+class UserRegistry:
+    """Known users in memory, new and changed ones written in batches"""
+
+    def __init__(self, flush_seconds=FLUSH_SECONDS, max_users=MAX_USERS):
+        self.flush_seconds = flush_seconds
+        self.max_users = max_users
+        # user_id -> (username, monotonic time last_seen_at was written)
+        self._known = OrderedDict()
+        # user_id -> (username, last_seen_at)
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._started = False
+
+    def start(self):
+        """Start the background flush thread (and flush once more at exit)"""
+        with self._lock:
+            if self._started:
+                return
+            self._started = True
+        threading.Thread(target=self._flush_loop, name='user-registry', daemon=True).start()
+        atexit.register(self.flush)
+
+    def record(self, user_id, username):
+        """Note that a user was seen; queues a write only if the database is out of date"""
+        now = time.monotonic()
+        with self._lock:
+            known = self._known.get(user_id)
+            if known is not None:
+                self._known.move_to_end(user_id)
+                if known[0] == username and now - known[1] < LAST_SEEN_RESOLUTION:
+                    SIGHTINGS.inc(result='known')
+                    return
+            self._known[user_id] = (username, now)
+            if len(self._known) > self.max_users:
+                self._known.popitem(last=False)
+            self._pending[user_id] = (username, datetime.now())
+        SIGHTINGS.inc(result='queued')
+        if not self._started:
+            # No flush thread in this process: write through
+            self.flush()
+
+    def pending_count(self):
+        """Get the number of users waiting to be written"""
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self):
+        """Write every queued user now; returns how many were written"""
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+            rows = [(user_id, username, seen_at)
+                    for user_id, (username, seen_at) in sorted(pending.items())]
+            try:
+                with get_db_connection() as conn:
+                    cur = conn.cursor()
+                    insert_many(cur, UPSERT_USERS, rows, page_size=PAGE_SIZE)
+                    cur.close()
+            except Exception as e:
+                FLUSHES.inc(outcome='error')
+                logger.error(f"Failed to write {len(rows)} users, retrying with the next flush: {e}")
+                with self._lock:
+                    # Sightings queued meanwhile are newer
+                    for user_id, entry in pending.items():
+                        self._pending.setdefault(user_id, entry)
+                return 0
+            FLUSHES.inc(outcome='ok')
+            FLUSHED_USERS.inc(len(rows))
+            return len(rows)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_seconds)
+            self.flush()
+
+
+USERS = UserRegistry()
+
+
+def record_user(user_id, username):
+    """Record a sighting of a user in the process-wide registry"""
+    USERS.record(user_id, username)